@@ -61,6 +61,33 @@ export const handleReflectEvents = (dataEvent: string, chunkData: any, dispatch:
 	}
 }
 
+export const handleFfmpegProgress = (chunkData: any, dispatch: any) => {
+	const {task, percent, speed} = chunkData || {}
+	if (!task) {
+		return
+	}
+
+	const prefix = `Running => ${task}`
+	const details = [percent != null ? `${Math.round(percent)}%` : null, speed != null ? `${speed}x` : null].filter(Boolean).join(', ')
+	dispatch({
+		type: ActionType.UPSERT_STATUS_MESSAGE,
+		payload: {prefix, message: details ? `${prefix} (${details})` : prefix},
+	})
+}
+
+export const handleFullRenderReady = (chunkData: any, dispatch: any) => {
+	const {preview_path, output_path, error} = chunkData || {}
+	if (!preview_path) {
+		return
+	}
+
+	const prefix = `Full render => ${preview_path}`
+	dispatch({
+		type: ActionType.UPSERT_STATUS_MESSAGE,
+		payload: {prefix, message: output_path ? `${prefix} is ready: ${output_path}` : `${prefix} failed: ${error}`},
+	})
+}
+
 const dispatchStreamToken = (token: string, dispatch: any, inputBox: string) => {
 	dispatch({
 		type: ActionType.STREAM_TOKEN,
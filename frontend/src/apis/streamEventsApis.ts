@@ -1,5 +1,5 @@
 import {StreamEvent} from '@langchain/core/dist/tracers/event_stream'
-import {parseSearchResults, parseSearchParams, handleReflectEvents, handleStreamError} from './helpersStream/helpersStream'
+import {parseSearchResults, parseSearchParams, handleReflectEvents, handleStreamError, handleFfmpegProgress, handleFullRenderReady} from './helpersStream/helpersStream'
 import {client, initialize} from './initConfig'
 import {BaseMessage} from '@langchain/core/messages'
 import {MessageFieldWithRole} from '@langchain/core/messages'
@@ -21,7 +21,14 @@ export interface Clip {
 
 export interface PlannerResponse {
 	route_to_node: 'planner' | 'video-search' | 'video-text-generation' | 'video-editing' | 'reflect'
-	tool_call: 'simple-video-search' | 'combine-clips' | 'none'
+	tool_call:
+		| 'simple-video-search'
+		| 'batched-video-search'
+		| 'combine-clips'
+		| 'multi-gist-text-generation'
+		| 'multi-summarize-text-generation'
+		| 'multi-freeform-text-generation'
+		| 'none'
 	plan: string
 	index_id: string
 	clip_keys: string[]
@@ -83,6 +90,10 @@ export const streamEvents = async (ActionType: any, dispatch: any, inputBox: any
 					parseSearchParams(data as StreamEvent, dispatch)
 				} else if (dataEvent === 'on_tool_end') {
 					parseSearchResults(data as StreamEvent, dispatch, inputBox)
+				} else if (dataEvent === 'on_custom_event' && data?.name === 'ffmpeg_progress') {
+					handleFfmpegProgress(chunkData, dispatch)
+				} else if (dataEvent === 'on_custom_event' && data?.name === 'full_render_ready') {
+					handleFullRenderReady(chunkData, dispatch)
 				} else if (event === 'events' && metadata?.langgraph_node === 'reflect') {
 					handleReflectEvents(dataEvent, chunkData, dispatch, inputBox)
 				}
@@ -71,6 +71,19 @@ function reducer(state: State, action: Action): State {
 			return {...state, statusMessages: []}
 		case ActionType.SET_STATUS_MESSAGES:
 			return {...state, statusMessages: [...state.statusMessages, ...action.payload]}
+		case ActionType.UPSERT_STATUS_MESSAGE: {
+			// Replace the status message with the same prefix, e.g. the previous progress update for a task
+			const {prefix, message} = action.payload
+			const statusMessages = [...state.statusMessages]
+			const index = statusMessages.findIndex((statusMessage: string) => statusMessage.startsWith(prefix))
+
+			if (index >= 0) {
+				statusMessages[index] = message
+			} else {
+				statusMessages.push(message)
+			}
+			return {...state, statusMessages}
+		}
 		case ActionType.SET_LAST_AI_MESSAGE_STREAMING: {
 			const messages = [...state.arrayMessages]
 			const lastMessageIndex = messages.length - 1
@@ -14,6 +14,7 @@ export enum ActionType {
 	ADD_TOOLS_DATA_TO_LAST_ELEMENT = 'ADD_TOOLS_DATA_TO_LAST_ELEMENT',
 	SET_STATUS_MESSAGES = 'SET_STATUS_MESSAGES',
 	CLEAR_STATUS_MESSAGES = 'CLEAR_STATUS_MESSAGES',
+	UPSERT_STATUS_MESSAGE = 'UPSERT_STATUS_MESSAGE',
 	REMOVE_INITIAL_MESSAGE = 'REMOVE_INITIAL_MESSAGE',
 	SET_CHOOSED_ELEMENT = 'SET_CHOOSED_ELEMENT',
 	SET_AUTOFILL_API = 'SET_AUTOFILL_API',
@@ -0,0 +1,4 @@
+"""End-to-end turn latency benchmarks for the compiled Jockey graph, run against stubbed LLMs and the local TwelveLabs stand-in.
+
+Run with `python -m jockey.benchmarks`.
+"""
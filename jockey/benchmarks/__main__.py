@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import uvicorn
+from jockey.stand_in import create_app
+
+# Seconds to wait for the stand-in to start listening before giving up.
+STAND_IN_STARTUP_TIMEOUT = 10.0
+
+
+def start_stand_in(latency: float, error_rate: float) -> str:
+    """Serve the TwelveLabs stand-in on a free local port in a background thread and return its base url."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(create_app(latency=latency, error_rate=error_rate), host="127.0.0.1", port=port, log_level="warning"))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+
+    deadline = time.monotonic() + STAND_IN_STARTUP_TIMEOUT
+    while not server.started:
+        # uvicorn exits the thread instead of raising when it can't bind the port.
+        if not server_thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError(f"The TwelveLabs stand-in didn't start on port {port}")
+        time.sleep(0.01)
+
+    return f"http://127.0.0.1:{port}/v1.2/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end Jockey turn latency with stubbed LLMs and TwelveLabs")
+    parser.add_argument("--scenarios", nargs="+", default=["search", "search-edit", "text-generation"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds every stubbed structured output call takes")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds before each token streamed by the stubbed reflect LLM")
+    parser.add_argument("--tl-latency", type=float, default=0.0, help="Seconds added to every stand-in response")
+    parser.add_argument("--tl-error-rate", type=float, default=0.0, help="Fraction of stand-in requests that fail")
+    parser.add_argument("--warm", action="store_true", help="Keep search, metadata, clip, render and HLS caches between runs")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    # The TwelveLabs urls are resolved on import, so the stand-in has to be configured before Jockey is imported.
+    os.environ["TWELVE_LABS_BASE_URL"] = start_stand_in(args.tl_latency, args.tl_error_rate)
+    os.environ.setdefault("TWELVE_LABS_API_KEY", "benchmark")
+    os.environ.setdefault("HOST_PUBLIC_DIR", tempfile.mkdtemp(prefix="jockey-benchmark-"))
+    # Cold runs clear the clip, render and HLS segment caches, so they must never be the ones real clips use.
+    cache_dir = tempfile.mkdtemp(prefix="jockey-benchmark-")
+    os.environ["JOCKEY_CLIP_CACHE_INDEX"] = os.path.join(cache_dir, "clips.sqlite3")
+    os.environ["JOCKEY_RENDER_CACHE_INDEX"] = os.path.join(cache_dir, "renders.sqlite3")
+    os.environ["JOCKEY_HLS_SEGMENT_CACHE_DIR"] = os.path.join(cache_dir, "hls_segments")
+
+    from jockey.benchmarks.runner import run_benchmarks
+
+    results = asyncio.run(run_benchmarks(args.scenarios, args.repeats, args.llm_latency, args.token_delay, args.warm))
+
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    for name, scenario in results["scenarios"].items():
+        for turn_number, summary in enumerate(scenario["summary"], start=1):
+            total = summary["total"]
+            nodes = ", ".join(f"{role} {stats['p50'] * 1000:.0f}ms" for role, stats in summary["nodes"].items())
+            total_text = f"p50 {total['p50'] * 1000:.0f}ms, p95 {total['p95'] * 1000:.0f}ms" if total else "no successful runs"
+            print(f"{name} turn {turn_number}: {total_text} ({nodes}), errors: {summary['errors']}")
+
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
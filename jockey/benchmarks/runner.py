@@ -0,0 +1,175 @@
+import os
+import time
+import uuid
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Union
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+from langgraph.graph.state import CompiledStateGraph
+from jockey import hls
+from jockey.benchmarks.scenarios import SCENARIOS
+from jockey.benchmarks.stubs import ScriptedOpenAI, build_reflect_llm
+from jockey.clip_cache import clip_cache
+from jockey.jockey_graph import build_jockey_graph
+from jockey.model_config import OPENAI_MODELS
+from jockey.render_cache import render_cache
+from jockey.stirrups.video_search import search_cache
+from jockey.video_utils import video_metadata_cache
+
+# Worker nodes are reported together so turns that use different workers can be compared.
+NODE_ROLES = {"video-search": "worker", "video-text-generation": "worker", "video-editing": "worker"}
+
+
+def build_benchmark_graph(openai_client: ScriptedOpenAI, reflect_llm: FakeListChatModel) -> CompiledStateGraph:
+    """Build Jockey the same way app.py does, but with stubbed LLMs."""
+    prompts_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
+    prompts = {}
+    for name in ["supervisor", "planner", "instructor", "reflect"]:
+        with open(os.path.join(prompts_dir, f"{name}.md")) as f:
+            prompts[f"{name}_prompt"] = f.read()
+
+    # These are only used to build the workers and are never called, so they don't need a real API key.
+    planner_llm = ChatOpenAI(model=OPENAI_MODELS["planner"], api_key="benchmark", tags=["planner"])
+    supervisor_llm = ChatOpenAI(model=OPENAI_MODELS["supervisor"], api_key="benchmark", tags=["supervisor"])
+    worker_llm = ChatOpenAI(model=OPENAI_MODELS["worker"], api_key="benchmark", tags=["worker"])
+
+    return build_jockey_graph(
+        planner_llm=planner_llm,
+        supervisor_llm=supervisor_llm,
+        worker_llm=worker_llm,
+        reflect_llm=reflect_llm,
+        openai_client=openai_client,
+        save_graph_image=False,
+        **prompts,
+    )
+
+
+async def run_turn(jockey: CompiledStateGraph, openai_client: ScriptedOpenAI, reflect_llm: FakeListChatModel, turn: Dict, thread: Dict) -> Dict:
+    """Run one scripted turn through `jockey.astream_events` and time it.
+
+    Returns:
+        Dict: Total latency, time to the first streamed token and wall time per node, all in seconds.
+    """
+    openai_client.script(turn["responses"])
+    reflect_llm.responses = [turn["reflect"]]
+    reflect_llm.i = 0
+
+    jockey_input = {
+        "chat_history": [HumanMessage(content=turn["user_message"], name="user")],
+        "made_plan": False,
+        "next_worker": None,
+        "active_plan": None,
+        "tool_call": None,
+        "relevant_clip_keys": [],
+        "index_id": None,
+    }
+
+    node_starts: Dict[str, float] = {}
+    nodes: Dict[str, float] = {}
+    time_to_first_token = None
+    start = time.perf_counter()
+
+    async for event in jockey.astream_events(input=jockey_input, config=thread, version="v2"):
+        elapsed = time.perf_counter() - start
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if event["event"] == "on_chain_start" and event["name"] == node and not node.startswith("__"):
+            node_starts[event["run_id"]] = elapsed
+        elif event["event"] == "on_chain_end" and event["run_id"] in node_starts:
+            role = NODE_ROLES.get(node, node)
+            nodes[role] = nodes.get(role, 0.0) + elapsed - node_starts.pop(event["run_id"])
+        elif event["event"] == "on_chat_model_stream" and time_to_first_token is None and event["data"]["chunk"].content:
+            time_to_first_token = elapsed
+
+    return {"total": time.perf_counter() - start, "time_to_first_token": time_to_first_token, "nodes": nodes}
+
+
+async def run_scenario(name: str, repeats: int, llm_latency: float, token_delay: float, warm: bool = False) -> Dict:
+    """Run a scripted conversation `repeats` times, each in a fresh thread.
+
+    Returns:
+        Dict: Every timed turn per run and a summary per turn position in the conversation.
+    """
+    openai_client = ScriptedOpenAI(latency=llm_latency)
+    reflect_llm = build_reflect_llm(token_delay)
+    jockey = build_benchmark_graph(openai_client, reflect_llm)
+    runs: List[List[Dict]] = []
+
+    for _ in range(repeats):
+        if not warm:
+            search_cache.clear()
+            video_metadata_cache.clear()
+            clip_cache.clear()
+            render_cache.clear()
+            hls.playlist_cache.clear()
+            hls.segment_cache.clear()
+
+        thread = {"configurable": {"thread_id": uuid.uuid4()}, "tags": ["benchmark"]}
+        run = []
+        for turn in SCENARIOS[name]:
+            try:
+                run.append(await run_turn(jockey, openai_client, reflect_llm, turn, thread))
+            except Exception as error:
+                # Later turns depend on this one, so the rest of the conversation is skipped.
+                run.append({"error": f"{type(error).__name__}: {error}"})
+                break
+        runs.append(run)
+
+    return {"runs": runs, "summary": [summarize_turns([run[i] for run in runs if i < len(run)]) for i in range(len(SCENARIOS[name]))]}
+
+
+def summarize(values: List[float]) -> Union[Dict[str, float], None]:
+    if not values:
+        return None
+
+    values = sorted(values)
+    return {
+        "mean": statistics.fmean(values),
+        "p50": statistics.median(values),
+        "p95": values[min(len(values) - 1, round(0.95 * (len(values) - 1)))],
+        "min": values[0],
+        "max": values[-1],
+    }
+
+
+def summarize_turns(turns: List[Dict]) -> Dict:
+    timed_turns = [turn for turn in turns if "error" not in turn]
+    roles = sorted({role for turn in timed_turns for role in turn["nodes"]})
+
+    return {
+        "errors": len(turns) - len(timed_turns),
+        "total": summarize([turn["total"] for turn in timed_turns]),
+        "time_to_first_token": summarize([turn["time_to_first_token"] for turn in timed_turns if turn["time_to_first_token"] is not None]),
+        "nodes": {role: summarize([turn["nodes"][role] for turn in timed_turns if role in turn["nodes"]]) for role in roles},
+    }
+
+
+def get_commit() -> Union[str, None]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmarks(scenarios: List[str], repeats: int, llm_latency: float = 0.0, token_delay: float = 0.0, warm: bool = False) -> Dict:
+    """Run the benchmark suite.
+
+    Args:
+        scenarios (List[str]): Names of scripted conversations from `SCENARIOS` to run.
+        repeats (int): How many times each conversation is run.
+        llm_latency (float, optional): Seconds every stubbed structured output call takes. Defaults to 0.0.
+        token_delay (float, optional): Seconds before each streamed token of the stubbed reflect LLM. Defaults to 0.0.
+        warm (bool, optional): Keep search, metadata, clip, render and HLS caches between runs. Defaults to False.
+
+    Returns:
+        Dict: JSON serializable results, tagged with the current commit so runs can be compared.
+    """
+    return {
+        "commit": get_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {"repeats": repeats, "llm_latency": llm_latency, "token_delay": token_delay, "warm": warm},
+        "scenarios": {name: await run_scenario(name, repeats, llm_latency, token_delay, warm) for name in scenarios},
+    }
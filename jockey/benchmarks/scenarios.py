@@ -0,0 +1,82 @@
+from typing import Dict, List, Type, get_args
+from pydantic import BaseModel
+from jockey.jockey_graph import PlannerResponse, SupervisorResponse
+from jockey.stirrups.video_search import MarengoSearchInput
+from jockey.stirrups.video_editing import SimplifiedCombineClipsInput
+from jockey.stirrups.video_text_generation import PegasusMultiGistInput
+
+# Any index works with the stand-in server, the videos come from its fixtures.
+INDEX_ID = "6753ec5f1e1aa3e42b2a3f00"
+
+
+def latest_clip_keys(response_format: Type[BaseModel]) -> List[str]:
+    """The planner narrows `clip_keys` to the keys of the clips found so far before asking for a plan.
+    The scripted plan picks the most recent one, like the planner is instructed to."""
+    clip_keys = get_args(get_args(response_format.model_fields["clip_keys"].annotation)[0])
+    return list(clip_keys[-1:])
+
+
+def search_turn(query: str, top_n: int = 3) -> Dict:
+    return {
+        "user_message": f"Use index {INDEX_ID}. Find {top_n} clips of {query}.",
+        "responses": {
+            SupervisorResponse: SupervisorResponse(route_to_node="planner"),
+            PlannerResponse: lambda response_format: PlannerResponse(
+                route_to_node="video-search",
+                tool_call="simple-video-search",
+                plan=f"**video-search**: Find {top_n} clips of {query} in index {INDEX_ID}",
+                index_id=INDEX_ID,
+                clip_keys=[],
+            ),
+            MarengoSearchInput: MarengoSearchInput(
+                query=query, index_id=INDEX_ID, top_n=top_n, group_by="clip", search_options=["visual", "conversation"], video_filter=None
+            ),
+        },
+        "reflect": f"I found {top_n} clips of {query}. Would you like me to combine them into a single video?",
+    }
+
+
+def edit_turn(output_filename: str) -> Dict:
+    return {
+        "user_message": "Combine those clips into a single video.",
+        "responses": {
+            SupervisorResponse: SupervisorResponse(route_to_node="planner"),
+            PlannerResponse: lambda response_format: PlannerResponse(
+                route_to_node="video-editing",
+                tool_call="combine-clips",
+                plan="**video-editing**: Combine the clips",
+                index_id=INDEX_ID,
+                clip_keys=latest_clip_keys(response_format),
+            ),
+            SimplifiedCombineClipsInput: SimplifiedCombineClipsInput(output_filename=output_filename),
+        },
+        "reflect": "I combined the clips into a single video. Let me know if you would like any changes.",
+    }
+
+
+def gist_turn(video_ids: List[str]) -> Dict:
+    return {
+        "user_message": f"Use index {INDEX_ID}. Generate a title, topics and hashtags for videos {', '.join(video_ids)}.",
+        "responses": {
+            SupervisorResponse: SupervisorResponse(route_to_node="planner"),
+            PlannerResponse: lambda response_format: PlannerResponse(
+                route_to_node="video-text-generation",
+                tool_call="multi-gist-text-generation",
+                plan=f"**video-text-generation**: Generate a title, topics and hashtags for {', '.join(video_ids)} in index {INDEX_ID}",
+                index_id=INDEX_ID,
+                clip_keys=[],
+            ),
+            # Bypass the persistent cache so every run measures the text generation request itself.
+            PegasusMultiGistInput: PegasusMultiGistInput(
+                video_ids=video_ids, index_id=INDEX_ID, endpoint_options=["title", "topic", "hashtag"], bypass_cache=True
+            ),
+        },
+        "reflect": "Here are the titles, topics and hashtags for each video.",
+    }
+
+
+SCENARIOS: Dict[str, List[Dict]] = {
+    "search": [search_turn("dunks")],
+    "search-edit": [search_turn("dunks"), edit_turn("dunks_highlights")],
+    "text-generation": [gist_turn(["6753ec5f1e1aa3e42b2a3f10", "6753ec5f1e1aa3e42b2a3f11", "6753ec5f1e1aa3e42b2a3f12"])],
+}
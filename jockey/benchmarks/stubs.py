@@ -0,0 +1,43 @@
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Type, Union
+from pydantic import BaseModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+# A scripted response is either a ready made structured output or a callable that builds one from the requested schema.
+ScriptedResponse = Union[BaseModel, Callable[[Type[BaseModel]], BaseModel]]
+
+
+class ScriptedOpenAI:
+    """Stands in for `openai.OpenAI` in the supervisor, planner and worker nodes.
+
+    `beta.chat.completions.parse` answers with the scripted response for the requested `response_format`
+    after sleeping for `latency` seconds. The sleep blocks like the real synchronous client does.
+
+    Args:
+        latency (float): Seconds every structured output call takes.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: List[str] = []
+        self.responses: Dict[Type[BaseModel], ScriptedResponse] = {}
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self.parse)))
+
+    def script(self, responses: Dict[Type[BaseModel], ScriptedResponse]) -> None:
+        self.responses = responses
+
+    def parse(self, model: str, messages: List[Dict], response_format: Type[BaseModel], **kwargs: Any) -> SimpleNamespace:
+        self.calls.append(response_format.__name__)
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        response = self.responses[response_format]
+        parsed = response(response_format) if callable(response) and not isinstance(response, BaseModel) else response
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))])
+
+
+def build_reflect_llm(token_delay: float = 0.0) -> FakeListChatModel:
+    """A streaming chat model for the reflect node. Scripted replies are streamed a character at a time,
+    waiting `token_delay` seconds before each one."""
+    return FakeListChatModel(responses=[""], sleep=token_delay or None, tags=["reflect"])
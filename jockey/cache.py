@@ -0,0 +1,179 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Union
+
+# Persistent caches live here unless a deployment points them somewhere else.
+DEFAULT_CACHE_DIR = os.environ.get("JOCKEY_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "jockey")
+
+
+class TTLCache:
+    """Process-wide, size-bounded LRU cache whose entries expire after a time-to-live.
+
+    Args:
+        max_size (int): Maximum number of entries kept before the least recently used entry is evicted.
+
+        ttl (float): Default time-to-live for an entry in seconds.
+
+    Note:
+        Values are returned as stored, so callers should treat them as read-only.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (value, stored_at, expires_at)
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None, max_age: Union[float, None] = None) -> Any:
+        """Get a cached value, counting the lookup as a hit or a miss.
+
+        Args:
+            key (Hashable): Cache key.
+            default (Any, optional): Returned when the key is missing or expired. Defaults to None.
+            max_age (Union[float, None], optional): Treat entries older than this many seconds as expired,
+                even if their own TTL hasn't elapsed. Useful when part of a value goes stale sooner than the rest.
+
+        Returns:
+            Any: The cached value or `default`.
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, stored_at, expires_at = entry
+        if now >= expires_at or (max_age is not None and now - stored_at > max_age):
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Union[float, None] = None) -> None:
+        """Store a value, evicting least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to store.
+            ttl (Union[float, None], optional): Time-to-live for this entry in seconds. Defaults to the cache TTL.
+        """
+        now = time.monotonic()
+        self._entries[key] = (value, now, now + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches `predicate`.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """Persistent string cache stored in a single SQLite file, shared across processes and surviving restarts.
+
+    Args:
+        path (str): Path to the SQLite file. Parent directories are created on first use.
+
+        max_bytes (int): Total size of stored values before the least recently accessed entries are evicted.
+
+    Note:
+        Operations are small local SQLite queries, so they are run synchronously.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connect lazily so importing a module that defines a cache never touches the filesystem.
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def get(self, key: str) -> Union[str, None]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)", (key, value, size, time.time()))
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.evictions += 1
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size, total_bytes = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"size": size, "bytes": total_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
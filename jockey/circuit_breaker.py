@@ -0,0 +1,164 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Tuple
+
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+CIRCUIT_BREAKER_MIN_REQUESTS = int(os.environ.get("CIRCUIT_BREAKER_MIN_REQUESTS", 5))
+CIRCUIT_BREAKER_WINDOW = float(os.environ.get("CIRCUIT_BREAKER_WINDOW", 60))
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = float(os.environ.get("CIRCUIT_BREAKER_RECOVERY_TIMEOUT", 30))
+CIRCUIT_BREAKER_HALF_OPEN_REQUESTS = int(os.environ.get("CIRCUIT_BREAKER_HALF_OPEN_REQUESTS", 1))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+    def __init__(self, backend: str, retry_in: float) -> None:
+        super().__init__(f"{backend} is unavailable after repeated failures, retry in {retry_in:.0f}s")
+        self.backend = backend
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Fails fast once a backend's recent error rate crosses a threshold, then lets a few probe requests
+    through after a cool-down to find out whether it has recovered.
+
+    Args:
+        name (str): Name of the backend, used in error messages.
+
+        failure_rate (float): Fraction of failed requests within `window` seconds that opens the circuit.
+
+        min_requests (int): Requests needed within the window before the failure rate is considered.
+
+        window (float): Length of the sliding window in seconds.
+
+        recovery_timeout (float): Seconds the circuit stays open before probing the backend again.
+
+        half_open_requests (int): Probe requests allowed at once while half-open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+        min_requests: int = CIRCUIT_BREAKER_MIN_REQUESTS,
+        window: float = CIRCUIT_BREAKER_WINDOW,
+        recovery_timeout: float = CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+        half_open_requests: int = CIRCUIT_BREAKER_HALF_OPEN_REQUESTS,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.half_open_requests = half_open_requests
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probes = 0
+        # (finished_at, failed)
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+
+    def allow(self) -> None:
+        """Reserve a request against the backend. Every call must be followed by `record_success`,
+        `record_failure` or `release`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with every probe slot taken.
+        """
+        if self.state == OPEN:
+            retry_in = self.opened_at + self.recovery_timeout - time.monotonic()
+            if retry_in > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, retry_in)
+            self.state = HALF_OPEN
+            self._probes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_requests:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.recovery_timeout)
+            self._probes += 1
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            # A successful probe closes the circuit with a clean slate.
+            self.state = CLOSED
+            self._outcomes.clear()
+            return
+
+        self._record(failed=False)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+
+        self._record(failed=True)
+
+        failures = sum(failed for _, failed in self._outcomes)
+        if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def release(self) -> None:
+        """Give back a reservation without an outcome, e.g. when the caller was cancelled."""
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[BaseException], bool] = lambda error: True) -> Iterator[None]:
+        """Run the body as a request against the backend. Exceptions count as failures when `is_failure` says so.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        self.allow()
+        try:
+            yield
+        except Exception as error:
+            if is_failure(error):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "requests": len(self._outcomes),
+            "failures": sum(failed for _, failed in self._outcomes),
+            "rejected": self.rejected,
+        }
+
+    def _record(self, failed: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _open(self) -> None:
+        print(f"[WARNING] Circuit opened for {self.name}, failing fast for {self.recovery_timeout:.0f}s")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probes = 0
+        self._outcomes.clear()
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(backend: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker for a backend, e.g. "search", "generate", "hls" or "llm:planner"."""
+    if backend not in _circuit_breakers:
+        _circuit_breakers[backend] = CircuitBreaker(backend)
+    return _circuit_breakers[backend]
@@ -0,0 +1,167 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import contextlib
+from typing import Dict, Union
+from jockey.cache import DEFAULT_CACHE_DIR
+
+CLIP_CACHE_MAX_BYTES = int(os.environ.get("JOCKEY_CLIP_CACHE_MAX_BYTES", 10 * 1024 * 1024 * 1024))
+CLIP_CACHE_INDEX_PATH = os.environ.get("JOCKEY_CLIP_CACHE_INDEX") or os.path.join(DEFAULT_CACHE_DIR, "clips.sqlite3")
+# Clips used this recently are never evicted, since a combine may still be reading them.
+CLIP_CACHE_GRACE_PERIOD = float(os.environ.get("JOCKEY_CLIP_CACHE_GRACE_PERIOD", 600))
+# Bump when the way clips are cut changes so stale clips aren't served.
+CLIP_FORMAT_VERSION = 3
+# Clip times are compared at millisecond precision, so 10, 10.0 and 10.0001 are the same clip.
+CLIP_TIME_PRECISION = 3
+
+
+def format_clip_time(seconds: float) -> str:
+    return f"{round(float(seconds), CLIP_TIME_PRECISION):.{CLIP_TIME_PRECISION}f}"
+
+
+def get_clip_key(index_id: str, video_id: str, start: float, end: float) -> str:
+    """Content address of a clip: a digest of everything that decides what ends up in the file. Clips are cut the same
+    way for every encode profile, so switching profiles reuses them."""
+    canonical = "/".join([str(CLIP_FORMAT_VERSION), index_id, video_id, format_clip_time(start), format_clip_time(end)])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ClipCache:
+    """Bounded cache of clips cut from indexed videos, kept under `HOST_PUBLIC_DIR` so they can be served directly.
+
+    An SQLite index records the size and last access of every clip. Once the clips add up to more than `max_bytes`
+    the least recently accessed ones are deleted. Leftovers from interrupted cuts are cleaned up the first time the
+    cache is used in a process.
+
+    Args:
+        index_path (str): Path to the SQLite index. Parent directories are created on first use.
+
+        max_bytes (int): Total size of cached clips before the least recently accessed ones are evicted.
+
+        grace_period (float): Clips accessed within this many seconds are never evicted.
+
+    Note:
+        Clips must be written to their path atomically (e.g. temp file and rename), since an existing file is
+        taken to be complete.
+    """
+
+    def __init__(self, index_path: str, max_bytes: int, grace_period: float = CLIP_CACHE_GRACE_PERIOD) -> None:
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.grace_period = grace_period
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS clips (key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._cleanup(self._connection)
+        return self._connection
+
+    def get_path(self, index_id: str, video_id: str, start: float, end: float) -> str:
+        """Where the clip is, or will be, stored."""
+        key = get_clip_key(index_id, video_id, start, end)
+        return os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, f"{video_id}_{key[:16]}.mp4")
+
+    def get(self, index_id: str, video_id: str, start: float, end: float) -> Union[str, None]:
+        """Get the path of a cached clip and mark it as recently used.
+
+        Returns:
+            Union[str, None]: The clip's path, or None if it isn't cached.
+        """
+        key = get_clip_key(index_id, video_id, start, end)
+        path = self.get_path(index_id, video_id, start, end)
+
+        with self._lock:
+            connection = self._connect()
+            if not os.path.isfile(path):
+                connection.execute("DELETE FROM clips WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            # Clips written by another process, or before the index was lost, are adopted rather than cut again.
+            connection.execute(
+                "INSERT OR REPLACE INTO clips (key, path, size, accessed_at) VALUES (?, ?, ?, ?)", (key, path, os.path.getsize(path), time.time())
+            )
+            self.hits += 1
+            return path
+
+    def add(self, index_id: str, video_id: str, start: float, end: float) -> None:
+        """Record a clip that was just written to `get_path`, evicting old clips if the cache is over quota."""
+        key = get_clip_key(index_id, video_id, start, end)
+        path = self.get_path(index_id, video_id, start, end)
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO clips (key, path, size, accessed_at) VALUES (?, ?, ?, ?)", (key, path, os.path.getsize(path), time.time())
+            )
+            self._evict(connection, keep=key)
+
+    def _evict(self, connection: sqlite3.Connection, keep: str) -> None:
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM clips").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        evictable = connection.execute(
+            "SELECT key, path, size FROM clips WHERE key != ? AND accessed_at < ? ORDER BY accessed_at ASC", (keep, time.time() - self.grace_period)
+        ).fetchall()
+        for key, path, size in evictable:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            connection.execute("DELETE FROM clips WHERE key = ?", (key,))
+            self.evictions += 1
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
+
+    def _cleanup(self, connection: sqlite3.Connection) -> None:
+        """Forget clips that were deleted from disk and remove leftovers from interrupted cuts."""
+        for key, path in connection.execute("SELECT key, path FROM clips").fetchall():
+            if not os.path.isfile(path):
+                connection.execute("DELETE FROM clips WHERE key = ?", (key,))
+
+        public_dir = os.environ.get("HOST_PUBLIC_DIR")
+        if not public_dir or not os.path.isdir(public_dir):
+            return
+
+        # Other processes may be cutting clips right now, so only leftovers older than the grace period are removed.
+        stale_before = time.time() - self.grace_period
+        for index_dir in os.scandir(public_dir):
+            if not index_dir.is_dir():
+                continue
+            for entry in os.scandir(index_dir.path):
+                if entry.stat().st_mtime >= stale_before:
+                    continue
+                if entry.is_dir() and entry.name.startswith(".cut_"):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                elif entry.is_file() and entry.name.endswith("_trimmed.mp4"):
+                    os.remove(entry.path)
+
+    def clear(self) -> None:
+        """Delete every cached clip."""
+        with self._lock:
+            connection = self._connect()
+            for (path,) in connection.execute("SELECT path FROM clips").fetchall():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+            connection.execute("DELETE FROM clips")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size, total_bytes = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM clips").fetchone()
+        return {"size": size, "bytes": total_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+clip_cache = ClipCache(index_path=CLIP_CACHE_INDEX_PATH, max_bytes=CLIP_CACHE_MAX_BYTES)
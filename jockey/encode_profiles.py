@@ -0,0 +1,66 @@
+import os
+from typing import Dict, Union
+
+# Named libx264/AAC settings for combined reels. "draft" is for quick previews, "balanced" keeps the old hard-coded
+# 1M bitrate and "archival" is for final exports. Clips are stream copied into the output when they can be, since that
+# is cheaper than any encode, unless they are taller than the profile's `max_height`. "clip" is for the few GOPs at
+# the edges of cut clips that have to be re-encoded: a low crf keeps them close to the copied source GOPs they are
+# joined with, and a fast preset keeps cutting quick.
+# Audio is always AAC, including "balanced" which used MP3 before profiles existed: HLS sources carry AAC, so AAC is
+# what stream copied clips contain and re-encoded parts have to match it for them to be joined.
+ENCODE_PROFILES: Dict[str, Dict] = {
+    "draft": {"preset": "ultrafast", "crf": 30, "max_height": 480, "audio_bitrate": "96k"},
+    "balanced": {"preset": "medium", "video_bitrate": "1M", "audio_bitrate": "192k"},
+    "archival": {"preset": "slow", "crf": 18, "audio_bitrate": "256k"},
+    "clip": {"preset": "veryfast", "crf": 16, "audio_bitrate": "256k"},
+}
+
+DEFAULT_ENCODE_PROFILE = os.environ.get("JOCKEY_ENCODE_PROFILE", "balanced").lower()
+# Cut clips are cached and shared by every profile, so the parts of them that have to be re-encoded always use this one.
+CLIP_ENCODE_PROFILE = os.environ.get("JOCKEY_CLIP_ENCODE_PROFILE", "clip").lower()
+# Threads per ffmpeg encode. 0 lets ffmpeg decide, which is usually one per core.
+ENCODE_THREADS = int(os.environ.get("JOCKEY_ENCODE_THREADS", 0))
+
+
+def get_encode_profile(name: Union[str, None] = None) -> Dict:
+    """Look up an encode profile, falling back to `JOCKEY_ENCODE_PROFILE` when no name is given.
+
+    Raises:
+        ValueError: If there is no profile with that name.
+    """
+    name = (name or DEFAULT_ENCODE_PROFILE).lower()
+    if name not in ENCODE_PROFILES:
+        raise ValueError(f"Unknown encode profile: {name}. Expected one of {', '.join(ENCODE_PROFILES)}.")
+    return {"name": name, "threads": ENCODE_THREADS, **ENCODE_PROFILES[name]}
+
+
+def video_encode_kwargs(name: Union[str, None] = None) -> Dict:
+    """ffmpeg-python output kwargs for encoding video with a profile. Doesn't include scaling, see `scale_video`."""
+    profile = get_encode_profile(name)
+    kwargs = {"vcodec": "libx264", "preset": profile["preset"]}
+    if profile.get("crf") is not None:
+        kwargs["crf"] = profile["crf"]
+    else:
+        kwargs["video_bitrate"] = profile["video_bitrate"]
+    if profile["threads"]:
+        kwargs["threads"] = profile["threads"]
+    return kwargs
+
+
+def audio_encode_kwargs(name: Union[str, None] = None) -> Dict:
+    return {"acodec": "aac", "audio_bitrate": get_encode_profile(name)["audio_bitrate"]}
+
+
+def get_max_height(name: Union[str, None] = None) -> Union[int, None]:
+    """Tallest video a profile outputs, or None if it keeps the source's resolution."""
+    return get_encode_profile(name).get("max_height")
+
+
+def scale_video(stream, name: Union[str, None] = None):
+    """Scale an ffmpeg-python video stream down to the profile's `max_height`, keeping its aspect ratio. Shorter
+    video and profiles without a `max_height` are left alone."""
+    max_height = get_max_height(name)
+    if not max_height:
+        return stream
+    # Width -2 keeps the aspect ratio while rounding to the even width libx264 needs.
+    return stream.filter("scale", -2, f"min(ih,{max_height})")
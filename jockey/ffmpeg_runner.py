@@ -0,0 +1,118 @@
+import json
+import time
+import asyncio
+import contextlib
+import ffmpeg
+from typing import Dict, List, Union
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+FFMPEG_PROGRESS_EVENT = "ffmpeg_progress"
+# ffmpeg reports progress about twice a second. Events are sent at most this often per run.
+FFMPEG_PROGRESS_INTERVAL = 1.0
+
+
+def parse_progress_block(lines: List[str], duration: Union[float, None] = None) -> Dict:
+    """Turn one block of ffmpeg `-progress` output (key=value lines ending in `progress=...`) into event data."""
+    values = dict(line.split("=", 1) for line in lines if "=" in line)
+
+    out_time = None
+    # Despite the name, out_time_ms is in microseconds too.
+    raw_out_time = values.get("out_time_us") or values.get("out_time_ms")
+    if raw_out_time and raw_out_time.lstrip("-").isdigit():
+        out_time = max(0.0, int(raw_out_time) / 1_000_000)
+
+    percent = None
+    if values.get("progress") == "end":
+        percent = 100.0
+    elif out_time is not None and duration:
+        percent = min(100.0, 100.0 * out_time / duration)
+
+    def to_float(value: Union[str, None]) -> Union[float, None]:
+        try:
+            return float(value.rstrip("x"))
+        except (AttributeError, ValueError):
+            return None
+
+    return {"percent": percent, "out_time": out_time, "fps": to_float(values.get("fps")), "speed": to_float(values.get("speed"))}
+
+
+async def _dispatch_progress(task: str, progress: Dict) -> None:
+    # Outside of a LangChain runnable, e.g. when called from a script, there is nobody to tell.
+    with contextlib.suppress(RuntimeError):
+        await adispatch_custom_event(FFMPEG_PROGRESS_EVENT, {"task": task, **progress})
+
+
+async def run_ffmpeg(stream_spec, task: str, duration: Union[float, None] = None) -> None:
+    """Run an ffmpeg-python graph as an asyncio subprocess, reporting progress as `ffmpeg_progress` custom events.
+
+    Unlike `.run()`, this doesn't block the event loop. If the awaiting task is cancelled, ffmpeg is killed.
+
+    Args:
+        stream_spec: Output stream from ffmpeg-python, e.g. `ffmpeg.input(...).output(...)`.
+        task (str): Short description of the work, included in every progress event.
+        duration (Union[float, None], optional): Expected output duration in seconds, used to compute `percent`.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non-zero status. `stderr` holds ffmpeg's log.
+    """
+    args = ffmpeg.compile(stream_spec, overwrite_output=True)
+    args = [args[0], "-nostats", "-progress", "pipe:1", *args[1:]]
+    process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+    async def read_progress() -> None:
+        block: List[str] = []
+        last_sent = 0.0
+        async for raw_line in process.stdout:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            block.append(line)
+            if not line.startswith("progress="):
+                continue
+
+            progress = parse_progress_block(block, duration)
+            block = []
+            now = time.monotonic()
+            if now - last_sent >= FFMPEG_PROGRESS_INTERVAL or progress["percent"] == 100.0:
+                last_sent = now
+                await _dispatch_progress(task, progress)
+
+    try:
+        _, stderr = await asyncio.gather(read_progress(), process.stderr.read())
+        await process.wait()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", b"", stderr)
+
+
+async def probe(filename: str, cmd: str = "ffprobe", **kwargs) -> Dict:
+    """`ffmpeg.probe` without blocking the event loop. If the awaiting task is cancelled, ffprobe is killed.
+
+    Args:
+        filename (str): Path or url of the media to probe.
+        cmd (str, optional): ffprobe executable. Defaults to "ffprobe".
+        **kwargs: Extra ffprobe options, e.g. `select_streams="v:0"` for `-select_streams v:0`. A value of None passes
+            the option without a value.
+
+    Raises:
+        ffmpeg.Error: If ffprobe exits with a non-zero status. `stderr` holds ffprobe's log.
+    """
+    args = [cmd, "-show_format", "-show_streams", "-of", "json"]
+    for key, value in kwargs.items():
+        args += [f"-{key}"] if value is None else [f"-{key}", str(value)]
+    process = await asyncio.create_subprocess_exec(*args, filename, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+    try:
+        stdout, stderr = await process.communicate()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffprobe", stdout, stderr)
+    return json.loads(stdout.decode("utf-8"))
@@ -0,0 +1,362 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import urllib.parse
+from typing import Dict, List, Tuple, Union
+from pydantic import BaseModel
+from jockey import tl_client
+from jockey.cache import DEFAULT_CACHE_DIR, TTLCache
+from jockey.single_flight import SingleFlight
+
+# Fetch HLS segments ourselves and hand ffmpeg local files. Set to false to let ffmpeg read the HLS url directly.
+HLS_SEGMENT_FETCH = os.environ.get("JOCKEY_HLS_SEGMENT_FETCH", "true").lower() != "false"
+HLS_SEGMENT_CONCURRENCY = int(os.environ.get("JOCKEY_HLS_SEGMENT_CONCURRENCY", 8))
+HLS_SEGMENT_CACHE_DIR = os.environ.get("JOCKEY_HLS_SEGMENT_CACHE_DIR") or os.path.join(DEFAULT_CACHE_DIR, "hls_segments")
+HLS_SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("JOCKEY_HLS_SEGMENT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+# Segments used this recently are never evicted, since ffmpeg may still be reading them.
+HLS_SEGMENT_CACHE_GRACE_PERIOD = float(os.environ.get("JOCKEY_HLS_SEGMENT_CACHE_GRACE_PERIOD", 600))
+# Tallest rendition to fetch when a master playlist offers several. 0 picks the highest bitrate.
+HLS_MAX_HEIGHT = int(os.environ.get("JOCKEY_HLS_MAX_HEIGHT", 0))
+HLS_PLAYLIST_TTL = float(os.environ.get("JOCKEY_HLS_PLAYLIST_TTL", 600))
+
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# Keyed by playlist url without its query string, since signed urls change while the content doesn't.
+playlist_cache = TTLCache(max_size=256, ttl=HLS_PLAYLIST_TTL)
+playlist_flight = SingleFlight()
+segment_flight = SingleFlight()
+
+
+class UnsupportedPlaylistError(Exception):
+    """Raised for playlists that can't be fetched segment by segment, e.g. encrypted or byte-range playlists.
+    Callers should fall back to handing the HLS url to ffmpeg."""
+
+
+class Rendition(BaseModel):
+    uri: str
+    bandwidth: int = 0
+    width: Union[int, None] = None
+    height: Union[int, None] = None
+    # Renditions with separate audio tracks can't be cut from their video segments alone.
+    audio_group: Union[str, None] = None
+
+
+class Segment(BaseModel):
+    uri: str
+    start: float
+    duration: float
+    discontinuity: bool = False
+
+
+class MediaPlaylist(BaseModel):
+    uri: str
+    target_duration: float
+    segments: List[Segment]
+    init_uri: Union[str, None] = None
+
+
+def parse_attributes(value: str) -> Dict[str, str]:
+    return {key: raw.strip('"') for key, raw in ATTRIBUTE_PATTERN.findall(value)}
+
+
+def is_master_playlist(text: str) -> bool:
+    return "#EXT-X-STREAM-INF" in text
+
+
+def parse_master_playlist(text: str, base_url: str) -> List[Rendition]:
+    renditions = []
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    for i, line in enumerate(lines):
+        if not line.startswith("#EXT-X-STREAM-INF:") or i + 1 >= len(lines):
+            continue
+
+        attributes = parse_attributes(line.split(":", 1)[1])
+        width, height = None, None
+        if "RESOLUTION" in attributes:
+            width, height = (int(value) for value in attributes["RESOLUTION"].lower().split("x"))
+
+        renditions.append(
+            Rendition(
+                uri=urllib.parse.urljoin(base_url, lines[i + 1]),
+                bandwidth=int(attributes.get("BANDWIDTH", 0)),
+                width=width,
+                height=height,
+                audio_group=attributes.get("AUDIO"),
+            )
+        )
+
+    return renditions
+
+
+def parse_media_playlist(text: str, base_url: str) -> MediaPlaylist:
+    """Parse a media playlist into segments with their start times relative to the first segment.
+
+    Raises:
+        UnsupportedPlaylistError: If the playlist is encrypted or uses byte ranges.
+    """
+    segments = []
+    target_duration = 0.0
+    init_uri = None
+    position = 0.0
+    duration = None
+    discontinuity = False
+
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        if line.startswith("#EXT-X-TARGETDURATION:"):
+            target_duration = float(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-KEY:"):
+            if parse_attributes(line.split(":", 1)[1]).get("METHOD", "NONE") != "NONE":
+                raise UnsupportedPlaylistError("Encrypted HLS playlists are not supported")
+        elif line.startswith("#EXT-X-BYTERANGE") or (line.startswith("#EXT-X-MAP:") and "BYTERANGE" in line):
+            raise UnsupportedPlaylistError("Byte-range HLS playlists are not supported")
+        elif line.startswith("#EXT-X-MAP:"):
+            init_uri = urllib.parse.urljoin(base_url, parse_attributes(line.split(":", 1)[1])["URI"])
+        elif line.startswith("#EXTINF:"):
+            duration = float(line.split(":", 1)[1].split(",", 1)[0])
+        elif line.startswith("#EXT-X-DISCONTINUITY") and not line.startswith("#EXT-X-DISCONTINUITY-SEQUENCE"):
+            discontinuity = True
+        elif not line.startswith("#") and duration is not None:
+            segments.append(Segment(uri=urllib.parse.urljoin(base_url, line), start=position, duration=duration, discontinuity=discontinuity))
+            position += duration
+            duration = None
+            discontinuity = False
+
+    return MediaPlaylist(uri=base_url, target_duration=target_duration, segments=segments, init_uri=init_uri)
+
+
+def select_rendition(renditions: List[Rendition], max_height: int = HLS_MAX_HEIGHT) -> Rendition:
+    """Pick the highest bitrate rendition no taller than `max_height`, or the smallest one if they're all taller.
+
+    Args:
+        renditions (List[Rendition]): Renditions from a master playlist.
+        max_height (int, optional): Tallest acceptable rendition. 0 means no limit. Defaults to `HLS_MAX_HEIGHT`.
+    """
+    candidates = renditions
+    if max_height:
+        candidates = [rendition for rendition in renditions if rendition.height is None or rendition.height <= max_height]
+        if not candidates:
+            return min(renditions, key=lambda rendition: (rendition.height, rendition.bandwidth))
+    return max(candidates, key=lambda rendition: rendition.bandwidth)
+
+
+def segments_for_range(playlist: MediaPlaylist, start: float, end: float) -> List[Segment]:
+    """The smallest run of segments that covers `start`-`end`, in seconds from the start of the playlist."""
+    return [segment for segment in playlist.segments if segment.start < end and segment.start + segment.duration > start]
+
+
+def _strip_query(url: str) -> str:
+    return urllib.parse.urlsplit(url)._replace(query="", fragment="").geturl()
+
+
+async def _get(url: str) -> bytes:
+    # HLS is served from a CDN rather than the API, so it skips the API's rate limiter but shares its connection pool.
+    response = await tl_client.get_client().get(url)
+    response.raise_for_status()
+    return response.content
+
+
+async def get_media_playlist(hls_url: str, max_height: int = HLS_MAX_HEIGHT) -> MediaPlaylist:
+    """Fetch and parse the media playlist for the rendition of `hls_url` that fits `max_height`.
+
+    Raises:
+        UnsupportedPlaylistError: If the playlist can't be fetched segment by segment.
+    """
+    cache_key = (_strip_query(hls_url), max_height)
+    playlist = playlist_cache.get(cache_key)
+    if playlist is not None:
+        return playlist
+
+    async def fetch() -> MediaPlaylist:
+        text = (await _get(hls_url)).decode("utf-8")
+        url = hls_url
+
+        if is_master_playlist(text):
+            rendition = select_rendition(parse_master_playlist(text, hls_url), max_height)
+            if rendition.audio_group:
+                raise UnsupportedPlaylistError("HLS renditions with separate audio tracks are not supported")
+            url = rendition.uri
+            text = (await _get(url)).decode("utf-8")
+
+        media_playlist = parse_media_playlist(text, url)
+        playlist_cache.set(cache_key, media_playlist)
+        return media_playlist
+
+    return await playlist_flight.do(cache_key, fetch)
+
+
+class SegmentCache:
+    """Directory of downloaded HLS segments shared by every clip, bounded to `max_bytes` by evicting the least
+    recently used segments.
+
+    Args:
+        directory (str): Where segments are stored. Created on first use.
+
+        max_bytes (int): Total size of stored segments before the least recently used are deleted.
+
+        grace_period (float): Segments used within this many seconds are never evicted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, grace_period: float = HLS_SEGMENT_CACHE_GRACE_PERIOD) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.grace_period = grace_period
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_path(self, url: str) -> str:
+        extension = os.path.splitext(urllib.parse.urlsplit(url).path)[1] or ".ts"
+        return os.path.join(self.directory, hashlib.sha256(_strip_query(url).encode("utf-8")).hexdigest() + extension)
+
+    async def fetch(self, url: str) -> str:
+        """Get the local path of a segment, downloading it unless it is already cached."""
+        path = self.get_path(url)
+        if os.path.isfile(path):
+            os.utime(path)
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        return await segment_flight.do(path, lambda: self._download(url, path))
+
+    async def _download(self, url: str, path: str) -> str:
+        content = await _get(url)
+        os.makedirs(self.directory, exist_ok=True)
+        partial_path = f"{path}.{os.getpid()}.partial"
+        with open(partial_path, "wb") as partial_file:
+            partial_file.write(content)
+        os.replace(partial_path, path)
+        return path
+
+    def evict(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        total_bytes = sum(entry.stat().st_size for entry in entries)
+        stale_before = time.time() - self.grace_period
+
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total_bytes <= self.max_bytes or entry.stat().st_mtime >= stale_before:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            total_bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                os.remove(entry.path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+segment_cache = SegmentCache(directory=HLS_SEGMENT_CACHE_DIR, max_bytes=HLS_SEGMENT_CACHE_MAX_BYTES)
+
+
+async def fetch_range(hls_url: str, start: float, end: float, max_height: int = HLS_MAX_HEIGHT) -> Tuple[str, float]:
+    """Download the segments covering `start`-`end` of an HLS video and write a local playlist for them.
+
+    Args:
+        hls_url (str): Master or media playlist url.
+        start (float): Start of the range in seconds.
+        end (float): End of the range in seconds.
+        max_height (int, optional): Tallest rendition to fetch. 0 picks the highest bitrate. Defaults to `HLS_MAX_HEIGHT`.
+
+    Raises:
+        UnsupportedPlaylistError: If the playlist can't be fetched segment by segment.
+
+    Returns:
+        Tuple[str, float]: Path of the local playlist, and the time in the video where it starts. Subtract the latter
+            from times in the video to get times in the local playlist.
+    """
+    playlist = await get_media_playlist(hls_url, max_height)
+    segments = segments_for_range(playlist, start, end)
+    if not segments:
+        raise ValueError(f"No HLS segments cover {start}s to {end}s")
+
+    semaphore = asyncio.Semaphore(HLS_SEGMENT_CONCURRENCY)
+
+    async def fetch_segment(url: str) -> str:
+        async with semaphore:
+            return await segment_cache.fetch(url)
+
+    init_path = await segment_cache.fetch(playlist.init_uri) if playlist.init_uri else None
+    segment_paths = await asyncio.gather(*[fetch_segment(segment.uri) for segment in segments])
+
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", f"#EXT-X-TARGETDURATION:{int(playlist.target_duration + 0.999)}", "#EXT-X-PLAYLIST-TYPE:VOD"]
+    if init_path:
+        lines.append(f'#EXT-X-MAP:URI="{init_path}"')
+    for segment, segment_path in zip(segments, segment_paths):
+        if segment.discontinuity:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines += [f"#EXTINF:{segment.duration:.6f},", segment_path]
+    lines.append("#EXT-X-ENDLIST")
+
+    range_key = f"{_strip_query(playlist.uri)}:{segments[0].start}:{segments[-1].start}"
+    local_playlist_path = os.path.join(segment_cache.directory, hashlib.sha256(range_key.encode("utf-8")).hexdigest() + ".m3u8")
+    partial_path = f"{local_playlist_path}.{os.getpid()}.partial"
+    with open(partial_path, "w") as local_playlist:
+        local_playlist.write("\n".join(lines) + "\n")
+    os.replace(partial_path, local_playlist_path)
+
+    segment_cache.evict()
+    return local_playlist_path, segments[0].start
+
+
+class PlaylistWriter:
+    """Writes an HLS event playlist that grows as segments are appended, so players can start before it is complete.
+
+    Args:
+        path (str): Where the playlist is written. Segment uris are written as given, so relative uris resolve
+            against this directory.
+
+        target_duration (float): Longest expected segment in seconds. Raised if a longer segment is appended.
+    """
+
+    def __init__(self, path: str, target_duration: float) -> None:
+        self.path = path
+        self.target_duration = target_duration
+        self.segments: List[Segment] = []
+        self.ended = False
+        self._write()
+
+    def append(self, segments: List[Segment], discontinuity: bool = False) -> None:
+        """Append segments, e.g. those of the next clip. Pass `discontinuity` when their timestamps or encoding
+        don't continue from the previous segment."""
+        for i, segment in enumerate(segments):
+            self.segments.append(segment.model_copy(update={"discontinuity": segment.discontinuity or (discontinuity and i == 0)}))
+            self.target_duration = max(self.target_duration, segment.duration)
+        self._write()
+
+    def end(self) -> None:
+        self.ended = True
+        self._write()
+
+    def _write(self) -> None:
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{int(self.target_duration + 0.999)}", "#EXT-X-MEDIA-SEQUENCE:0"]
+        lines.append("#EXT-X-PLAYLIST-TYPE:EVENT")
+        for segment in self.segments:
+            if segment.discontinuity:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines += [f"#EXTINF:{segment.duration:.6f},", segment.uri]
+        if self.ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Players poll the playlist while it grows, so it must never be seen half written.
+        partial_path = f"{self.path}.partial"
+        with open(partial_path, "w") as playlist:
+            playlist.write("\n".join(lines) + "\n")
+        os.replace(partial_path, self.path)
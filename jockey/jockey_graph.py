@@ -6,7 +6,7 @@ from typing_extensions import TypedDict
 from langchain_openai.chat_models.base import ChatOpenAI
 from langchain_openai.chat_models.azure import AzureChatOpenAI
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.agents import AgentExecutor
 from langgraph.graph import StateGraph, END, add_messages
@@ -18,14 +18,37 @@ from langgraph.prebuilt import ToolNode
 from jockey.stirrups import collect_all_tools
 from langgraph.graph.state import CompiledStateGraph
 from textwrap import dedent
-from openai import OpenAI
+from contextlib import contextmanager
+from openai import OpenAI, APIConnectionError, InternalServerError, RateLimitError
+from jockey.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from jockey.stirrups.errors import ErrorType, JockeyError, NodeType
 from .model_config import OPENAI_MODELS
 from pydantic import BaseModel, Field
-from jockey.stirrups.video_search import MarengoSearchInput
-from jockey.stirrups.video_editing import SimplifiedCombineClipsInput, Clip
+from jockey.stirrups.video_search import MarengoSearchInput, MarengoBatchSearchInput
+from jockey.stirrups.video_editing import SimplifiedCombineClipsInput, Clip, finish_turn, pop_finished_renders, start_turn
+from jockey.stirrups.video_text_generation import PegasusMultiGistInput, PegasusMultiSummarizeInput, PegasusMultiFreeformInput
 import copy
 
 
+def _is_llm_outage(error: BaseException) -> bool:
+    """Only errors that say the LLM endpoint itself is struggling count towards opening its circuit."""
+    return isinstance(error, (APIConnectionError, InternalServerError, RateLimitError))
+
+
+@contextmanager
+def llm_circuit(role: str, node: NodeType, error_type: ErrorType):
+    """Guard an LLM call for one of the roles in `OPENAI_MODELS` with that role's circuit breaker.
+
+    Raises:
+        JockeyError: A retryable CIRCUIT_OPEN error if the circuit is open, instead of waiting on a failing endpoint.
+    """
+    try:
+        with get_circuit_breaker(f"llm:{role}").guard(is_failure=_is_llm_outage):
+            yield
+    except CircuitOpenError as error:
+        raise JockeyError.from_exception(error, node=node, error_type=error_type) from error
+
+
 def add_clips(left: Dict[str, List[Clip]], right: Dict[str, List[Clip]]) -> Dict[str, List[Clip]]:
     """Merges two dictionaries of clips, maintaining unique tool_call_ids and preventing duplicates.
 
@@ -80,10 +103,16 @@ class PlannerResponse(BaseModel):
     route_to_node: Literal["planner", "video-search", "video-text-generation", "video-editing", "reflect"] = Field(
         description="""
         Available workers:
-        <worker name="video-search", tools="simple-video-search">
+        <worker name="video-search", tools="simple-video-search, batched-video-search">
             Purpose: Search for N clips/videos matching a natural language query
             Input: Index ID, search query, number of clips needed
             Output: List of clips with video IDs and timestamps (start/end in seconds)
+            Use batched-video-search when the user asks for several different searches in one request
+        </worker>
+        <worker name="video-text-generation", tools="multi-gist-text-generation, multi-summarize-text-generation, multi-freeform-text-generation">
+            Purpose: Generate titles, topics, hashtags, summaries, highlights, chapters or answers for one or more videos
+            Input: Index ID, Video IDs (or the clip_keys of clips from a previous search), what to generate
+            Output: Generated text per Video ID
         </worker>
         <worker name="video-editing", tools="combine-clips">
             Purpose: Edit and combine video clips
@@ -92,7 +121,15 @@ class PlannerResponse(BaseModel):
         </worker>
         """
     )
-    tool_call: Literal["simple-video-search", "combine-clips", "none"] = Field(
+    tool_call: Literal[
+        "simple-video-search",
+        "batched-video-search",
+        "combine-clips",
+        "multi-gist-text-generation",
+        "multi-summarize-text-generation",
+        "multi-freeform-text-generation",
+        "none",
+    ] = Field(
         description="""
         Define the tool required by the route_to_node. If no tool is required, use 'none'.
         """
@@ -162,6 +199,7 @@ class Jockey(StateGraph):
         worker_llm: Union[ChatOpenAI, AzureChatOpenAI],
         reflect_llm: Union[ChatOpenAI, AzureChatOpenAI],
         reflect_prompt: str,
+        openai_client: Union[OpenAI, None] = None,
     ) -> None:
         """Constructs and compiles Jockey as a StateGraph instance.
 
@@ -180,10 +218,13 @@ class Jockey(StateGraph):
 
             worker_llm (Union[ChatOpenAI  |  AzureChatOpenAI]):
                 The LLM used for the worker nodes. It is recommended this be a GPT-4 class LLM or better.
+
+            openai_client (Union[OpenAI, None], optional):
+                Client used for the structured outputs of the supervisor, planner and worker nodes. Defaults to a new `OpenAI()`.
         """
 
         super().__init__(state_schema=JockeyState)
-        self.openai_client = OpenAI()
+        self.openai_client = openai_client or OpenAI()
         self.reflect_llm = reflect_llm
         self.reflect_prompt = dedent(reflect_prompt)
         self.planner_prompt = planner_prompt
@@ -249,7 +290,7 @@ class Jockey(StateGraph):
         worker_instructor = worker_instructor.with_config({"tags": ["instructor"]})
         return worker_instructor
 
-    def _supervisor_node(self, state: JockeyState) -> Dict:
+    def _supervisor_node(self, state: JockeyState, config: RunnableConfig = None) -> Dict:
         """Builds the supervisor which acts as the routing agent.
 
         Raises:
@@ -258,16 +299,34 @@ class Jockey(StateGraph):
         Returns:
             Runnable: The supervisor of the Jockey instance.
         """
-        completion = self.openai_client.beta.chat.completions.parse(
-            model=OPENAI_MODELS["supervisor"],
-            messages=[
-                {"role": "system", "content": dedent(self.supervisor_prompt)},
-                {"role": "user", "content": dedent(f"<chat_history>{state['chat_history']}</chat_history>")},
-            ],
-            response_format=SupervisorResponse,
-            temperature=0,
-        )
+        # Full quality renders that finished after their preview was returned are added to the conversation here.
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        if thread_id:
+            start_turn(str(thread_id))
+        finished_renders = [
+            AIMessage(
+                content=f"The full quality render of {render['preview_path']} is ready: {render['output_path']}"
+                if "output_path" in render
+                else f"The full quality render of {render['preview_path']} failed: {render['error']}",
+                name="video-editing",
+            )
+            for render in (pop_finished_renders(str(thread_id)) if thread_id else [])
+        ]
+        chat_history = [*state["chat_history"], *finished_renders]
+
+        with llm_circuit("supervisor", node=NodeType.SUPERVISOR, error_type=ErrorType.API):
+            completion = self.openai_client.beta.chat.completions.parse(
+                model=OPENAI_MODELS["supervisor"],
+                messages=[
+                    {"role": "system", "content": dedent(self.supervisor_prompt)},
+                    {"role": "user", "content": dedent(f"<chat_history>{chat_history}</chat_history>")},
+                ],
+                response_format=SupervisorResponse,
+                temperature=0,
+            )
         supervisor_response: SupervisorResponse = completion.choices[0].message.parsed
+        if finished_renders:
+            return {"next_worker": supervisor_response.route_to_node, "chat_history": finished_renders}
         return {"next_worker": supervisor_response.route_to_node}
 
     async def _planner_node(self, state: JockeyState) -> Dict:
@@ -294,18 +353,19 @@ class Jockey(StateGraph):
         if available_tool_call_ids:
             PlannerResponse.model_fields["clip_keys"].annotation = List[Literal.__getitem__(tuple(available_tool_call_ids))]
 
-        completion = self.openai_client.beta.chat.completions.parse(
-            model=OPENAI_MODELS["planner"],
-            messages=[
-                {"role": "system", "content": dedent(self.planner_prompt)},
-                {"role": "user", "content": dedent(f"<chat_history>{state['chat_history']}</chat_history>")},
-                {"role": "user", "content": dedent(f"<active_plan>{state['active_plan']}</active_plan>")},
-                {"role": "user", "content": dedent(f"<latest_user_message>{latest_user_message}</latest_user_message>")},
-                {"role": "user", "content": dedent(f"<clips_from_search>{clips_from_search_copy}</clips_from_search>")},
-            ],
-            temperature=0.7,
-            response_format=PlannerResponse,
-        )
+        with llm_circuit("planner", node=NodeType.PLANNER, error_type=ErrorType.PLANNING):
+            completion = self.openai_client.beta.chat.completions.parse(
+                model=OPENAI_MODELS["planner"],
+                messages=[
+                    {"role": "system", "content": dedent(self.planner_prompt)},
+                    {"role": "user", "content": dedent(f"<chat_history>{state['chat_history']}</chat_history>")},
+                    {"role": "user", "content": dedent(f"<active_plan>{state['active_plan']}</active_plan>")},
+                    {"role": "user", "content": dedent(f"<latest_user_message>{latest_user_message}</latest_user_message>")},
+                    {"role": "user", "content": dedent(f"<clips_from_search>{clips_from_search_copy}</clips_from_search>")},
+                ],
+                temperature=0.7,
+                response_format=PlannerResponse,
+            )
         planner_response: PlannerResponse = completion.choices[0].message.parsed
 
         # let's replace the planner_response.plan with the actual clips to prevent the LLM from hallucinating
@@ -346,7 +406,14 @@ class Jockey(StateGraph):
         Returns:
             Dict: Updated state of the graph.
         """
-        worker_schemas = {"video-search": MarengoSearchInput, "video-editing": SimplifiedCombineClipsInput}
+        tool_schemas = {
+            "simple-video-search": MarengoSearchInput,
+            "batched-video-search": MarengoBatchSearchInput,
+            "combine-clips": SimplifiedCombineClipsInput,
+            "multi-gist-text-generation": PegasusMultiGistInput,
+            "multi-summarize-text-generation": PegasusMultiSummarizeInput,
+            "multi-freeform-text-generation": PegasusMultiFreeformInput,
+        }
 
         worker_to_stirrup = {
             "video-search": VideoSearchWorker,
@@ -354,26 +421,32 @@ class Jockey(StateGraph):
             "video-editing": VideoEditingWorker,
         }
 
-        try:
-            completion = self.openai_client.beta.chat.completions.parse(
-                model=OPENAI_MODELS["worker"],
-                messages=[
-                    {"role": "system", "content": dedent(self.instructor_prompt)},
-                    {"role": "user", "content": dedent(f"<active_plan>{state['active_plan']}</active_plan>")},
-                    {"role": "user", "content": dedent(f"<tool_call>{state['tool_call']}</tool_call>")},
-                ],
-                response_format=worker_schemas[state["next_worker"]],
-                temperature=0.7,
-            )
+        # The planner may answer "none" for the tool, in which case each worker falls back to its default tool.
+        worker_default_tools = {
+            "video-search": "simple-video-search",
+            "video-text-generation": "multi-gist-text-generation",
+            "video-editing": "combine-clips",
+        }
+        tool_call = state["tool_call"] or worker_default_tools[state["next_worker"]]
 
-            worker_inputs: Union[MarengoSearchInput, SimplifiedCombineClipsInput] = completion.choices[0].message.parsed
+        try:
+            with llm_circuit("worker", node=NodeType.WORKER, error_type=ErrorType.API):
+                completion = self.openai_client.beta.chat.completions.parse(
+                    model=OPENAI_MODELS["worker"],
+                    messages=[
+                        {"role": "system", "content": dedent(self.instructor_prompt)},
+                        {"role": "user", "content": dedent(f"<active_plan>{state['active_plan']}</active_plan>")},
+                        {"role": "user", "content": dedent(f"<tool_call>{tool_call}</tool_call>")},
+                    ],
+                    response_format=tool_schemas[tool_call],
+                    temperature=0.7,
+                )
+
+            worker_inputs: Union[MarengoSearchInput, MarengoBatchSearchInput, SimplifiedCombineClipsInput] = completion.choices[0].message.parsed
             # print(f"[DEBUG] Worker inputs: {worker_inputs}")
         except Exception as error:
             raise error
 
-        # let's make a call to the stirrup to execute the tool call
-        ai_message = None
-
         # get the id of the chat_history
         tool_call_id = state["chat_history"][-1].id
 
@@ -381,23 +454,30 @@ class Jockey(StateGraph):
         args = {}
         if state["next_worker"] == "video-search":
             args = worker_inputs.model_dump()
-        elif state["next_worker"] == "video-editing" and state["tool_call"] == "combine-clips":
+        elif state["next_worker"] == "video-editing" and tool_call == "combine-clips":
             args = worker_inputs.model_dump()
             args["clips"] = [clip for key in state["relevant_clip_keys"] for clip in state["clips_from_search"][key]]
             args["index_id"] = state["index_id"]
+        elif state["next_worker"] == "video-text-generation":
+            args = worker_inputs.model_dump()
+            # Fan out over the videos behind the relevant clips from search when no Video IDs were given explicitly.
+            if not args["video_ids"] and state["relevant_clip_keys"]:
+                clips = [clip for key in state["relevant_clip_keys"] for clip in state["clips_from_search"][key]]
+                args["video_ids"] = list(dict.fromkeys(clip.video_id for clip in clips))
+            args["index_id"] = args["index_id"] or state["index_id"]
 
-        if state["tool_call"]:
-            ai_message = AIMessage(
-                content="",
-                tool_calls=[
-                    {
-                        "name": state["tool_call"],
-                        "args": args,
-                        "id": tool_call_id,
-                        "type": "tool_call",
-                    }
-                ],
-            )
+        # let's make a call to the stirrup to execute the tool call
+        ai_message = AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": tool_call,
+                    "args": args,
+                    "id": tool_call_id,
+                    "type": "tool_call",
+                }
+            ],
+        )
         try:
             worker_response = await worker_to_stirrup[state["next_worker"]]._call_tools(ai_message)
         except Exception as error:
@@ -417,7 +497,11 @@ class Jockey(StateGraph):
 
         # add clips to state['clips_from_search']
         clips_from_search = state.get("clips_from_search", {})
-        if state["next_worker"] == "video-search":
+        if tool_call == "batched-video-search":
+            # Each query's clips get their own key so the planner can pick them individually for later steps.
+            for query, clips in json.loads(worker_response[0]["output"])["results"].items():
+                clips_from_search[f"{tool_call_id}:{query}"] = [Clip(**clip) for clip in clips]
+        elif state["next_worker"] == "video-search":
             clips_from_search[tool_call_id] = [Clip(**clip) for clip in json.loads(worker_response[0]["output"])]
 
         # convert worker_response_str to a BaseMessage
@@ -430,11 +514,12 @@ class Jockey(StateGraph):
             "clips_from_search": clips_from_search,
         }
 
-    async def _reflect_node(self, state: JockeyState) -> Dict:
+    async def _reflect_node(self, state: JockeyState, config: RunnableConfig = None) -> Dict:
         """The reflect node in the graph. This node reviews all the context for a given user input before generating a final output.
 
         Args:
             state (JockeyState): Current state of the graph.
+            config (RunnableConfig, optional): Config of the graph run. Its thread ID identifies the session.
 
         Returns:
             Dict: Updated state of the graph.
@@ -443,13 +528,18 @@ class Jockey(StateGraph):
             ("system", self.reflect_prompt),
         ])
         reflect_chain = reflect_prompt | self.reflect_llm
-        reflect_response = await reflect_chain.ainvoke(
-            {
-                "active_plan": state["active_plan"] if state["active_plan"] else state["chat_history"][-1].content,
-                "tool_call": state["tool_call"],
-                "chat_history": state["chat_history"],
-            },
-        )
+        with llm_circuit("reflect", node=NodeType.REFLECT, error_type=ErrorType.API):
+            reflect_response = await reflect_chain.ainvoke(
+                {
+                    "active_plan": state["active_plan"] if state["active_plan"] else state["chat_history"][-1].content,
+                    "tool_call": state["tool_call"],
+                    "chat_history": state["chat_history"],
+                },
+            )
+        # Reflect is the last node of a turn.
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        if thread_id:
+            finish_turn(str(thread_id))
         return {
             "chat_history": [reflect_response],
             "active_plan": None,
@@ -504,6 +594,8 @@ def build_jockey_graph(
     instructor_prompt: str,
     reflect_llm: Union[ChatOpenAI, AzureChatOpenAI],
     reflect_prompt: str,
+    openai_client: Union[OpenAI, None] = None,
+    save_graph_image: bool = True,
 ) -> CompiledStateGraph:
     """Convenience function for creating an instance of Jockey.
 
@@ -523,6 +615,12 @@ def build_jockey_graph(
         worker_llm (Union[ChatOpenAI  |  AzureChatOpenAI]):
             The LLM used for the planner node. It is recommended this be a GPT-4 class LLM or better.
 
+        openai_client (Union[OpenAI, None], optional):
+            Client used for the structured outputs of the supervisor, planner and worker nodes. Defaults to a new `OpenAI()`.
+
+        save_graph_image (bool, optional):
+            Save a visualization of the graph to graph.png. This renders the image remotely, so it needs network access. Defaults to True.
+
     Returns:
         Jockey: An instance of Jockey a video agent.
     """
@@ -537,13 +635,15 @@ def build_jockey_graph(
         instructor_prompt=instructor_prompt,
         reflect_llm=reflect_llm,
         reflect_prompt=reflect_prompt,
+        openai_client=openai_client,
     )
 
     memory = MemorySaver()
     jockey = jockey_graph.compile(checkpointer=memory)
 
     # Save the graph visualization to a PNG file
-    with open("graph.png", "wb") as f:
-        f.write(jockey.get_graph().draw_mermaid_png())
+    if save_graph_image:
+        with open("graph.png", "wb") as f:
+            f.write(jockey.get_graph().draw_mermaid_png())
 
     return jockey
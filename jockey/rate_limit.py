@@ -0,0 +1,184 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Deque, Dict, Union
+
+TL_RATE_LIMIT_PER_SECOND = float(os.environ.get("TL_RATE_LIMIT_PER_SECOND", 10))
+TL_RATE_LIMIT_BURST = float(os.environ.get("TL_RATE_LIMIT_BURST", 20))
+TL_MAX_CONCURRENCY = int(os.environ.get("TL_MAX_CONCURRENCY", 16))
+TL_MIN_CONCURRENCY = int(os.environ.get("TL_MIN_CONCURRENCY", 1))
+TL_MAX_RETRIES = int(os.environ.get("TL_MAX_RETRIES", 3))
+TL_RETRY_BASE_DELAY = float(os.environ.get("TL_RETRY_BASE_DELAY", 0.5))
+TL_RETRY_MAX_DELAY = float(os.environ.get("TL_RETRY_MAX_DELAY", 30))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Smooths request rate to `rate` requests per second while allowing bursts of up to `capacity` requests.
+
+    Args:
+        rate (float): Tokens added per second.
+
+        capacity (float): Maximum number of tokens that can accumulate.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return
+            else:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold back every request for `seconds`, e.g. when the API responds with a `Retry-After` header."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits in-flight requests with an AIMD policy: the limit grows additively while requests succeed
+    and is cut multiplicatively whenever the API throttles us.
+
+    Args:
+        initial_limit (int): Starting number of concurrent requests.
+
+        min_limit (int): The limit never drops below this.
+
+        max_limit (int): The limit never grows above this.
+
+        decrease_factor (float, optional): Multiplier applied to the limit when throttled. Defaults to 0.5.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, decrease_factor: float = 0.5) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # We were woken up but won't use the slot, so pass it on.
+                    self._wake_waiters()
+                raise
+
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake_waiters()
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def _wake_waiters(self) -> None:
+        free_slots = int(self.limit) - self.in_flight
+        while free_slots > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+
+class RateLimiter:
+    """Rate and concurrency limits shared by every request made with one API key."""
+
+    def __init__(self) -> None:
+        self.bucket = TokenBucket(rate=TL_RATE_LIMIT_PER_SECOND, capacity=TL_RATE_LIMIT_BURST)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_limit=TL_MAX_CONCURRENCY, min_limit=TL_MIN_CONCURRENCY, max_limit=TL_MAX_CONCURRENCY)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a token and a concurrency slot before sending a request."""
+        await self.concurrency.acquire()
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            self.concurrency.release()
+
+    def record(self, status_code: int, retry_after: Union[float, None] = None) -> None:
+        """Adapt the limits to a response."""
+        if status_code == 429:
+            self.concurrency.on_throttle()
+            if retry_after is not None:
+                self.bucket.block_for(retry_after)
+        elif status_code < 500:
+            self.concurrency.on_success()
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(api_key: str) -> RateLimiter:
+    """Get the process-wide rate limiter for an API key, since quotas are enforced per key."""
+    if api_key not in _rate_limiters:
+        _rate_limiters[api_key] = RateLimiter()
+    return _rate_limiters[api_key]
+
+
+def parse_retry_after(value: Union[str, None]) -> Union[float, None]:
+    """Parse a `Retry-After` header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_retry_delay(attempt: int, retry_after: Union[float, None] = None) -> float:
+    """Exponential backoff with full jitter, deferring to the server's `Retry-After` when it gives one.
+
+    Args:
+        attempt (int): Zero-based number of the attempt that just failed.
+        retry_after (Union[float, None], optional): Seconds the server asked us to wait. Defaults to None.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, TL_RETRY_BASE_DELAY)
+
+    return random.uniform(0, min(TL_RETRY_MAX_DELAY, TL_RETRY_BASE_DELAY * 2**attempt))
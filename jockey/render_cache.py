@@ -0,0 +1,185 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import contextlib
+from typing import Dict, List, Tuple, Union
+from jockey.cache import DEFAULT_CACHE_DIR
+from jockey.clip_cache import format_clip_time
+
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("JOCKEY_RENDER_CACHE_MAX_BYTES", 5 * 1024 * 1024 * 1024))
+RENDER_CACHE_INDEX_PATH = os.environ.get("JOCKEY_RENDER_CACHE_INDEX") or os.path.join(DEFAULT_CACHE_DIR, "renders.sqlite3")
+# Renders used this recently are never evicted, since they may still be being served.
+RENDER_CACHE_GRACE_PERIOD = float(os.environ.get("JOCKEY_RENDER_CACHE_GRACE_PERIOD", 600))
+# A session that was handed a render keeps it from being evicted for this many seconds after it last asked for it.
+RENDER_REFERENCE_TTL = float(os.environ.get("JOCKEY_RENDER_REFERENCE_TTL", 24 * 60 * 60))
+# Bump when the way clips are combined changes so stale renders aren't served.
+RENDER_FORMAT_VERSION = 1
+
+
+def get_render_key(
+    index_id: str, clip_keys: List[Tuple[str, float, float]], encode_profile: str, source_versions: Dict[str, str], output_mode: str
+) -> str:
+    """Content address of a combined reel: a digest of the ordered clips, how they are encoded and the version of
+    every source video, so re-indexed videos aren't served from old renders."""
+    parts = [str(RENDER_FORMAT_VERSION), index_id, encode_profile, output_mode]
+    for video_id, start, end in clip_keys:
+        parts.append(f"{video_id}@{source_versions.get(video_id, '')}:{format_clip_time(start)}-{format_clip_time(end)}")
+    return hashlib.sha256("/".join(parts).encode("utf-8")).hexdigest()
+
+
+def _output_size(path: str) -> int:
+    # HLS renders are a playlist in a directory of segments, which belong to the render too.
+    if path.endswith(".m3u8"):
+        return sum(entry.stat().st_size for entry in os.scandir(os.path.dirname(path)) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def _remove_output(path: str) -> None:
+    if path.endswith(".m3u8"):
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        return
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+class RenderCache:
+    """Bounded cache of combined reels under `HOST_PUBLIC_DIR`, so asking for the same reel again returns the
+    existing file instead of rendering it from scratch.
+
+    Every session that is handed a render holds a reference to it. Once renders add up to more than `max_bytes`
+    the least recently accessed ones that no session referenced within `reference_ttl` are deleted.
+
+    Args:
+        index_path (str): Path to the SQLite index. Parent directories are created on first use.
+
+        max_bytes (int): Total size of cached renders before unreferenced ones are evicted.
+
+        grace_period (float): Renders accessed within this many seconds are never evicted.
+
+        reference_ttl (float): How long a session's reference keeps a render from being evicted.
+
+    Note:
+        Renders must be complete when they are added, since a render that exists is served as is.
+    """
+
+    def __init__(
+        self, index_path: str, max_bytes: int, grace_period: float = RENDER_CACHE_GRACE_PERIOD, reference_ttl: float = RENDER_REFERENCE_TTL
+    ) -> None:
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self.grace_period = grace_period
+        self.reference_ttl = reference_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection: Union[sqlite3.Connection, None] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS render_references "
+                "(key TEXT NOT NULL, session_id TEXT NOT NULL, referenced_at REAL NOT NULL, PRIMARY KEY (key, session_id))"
+            )
+            self._cleanup(self._connection)
+        return self._connection
+
+    def get(self, key: str) -> Union[str, None]:
+        """Get the path of a cached render and mark it as recently used.
+
+        Returns:
+            Union[str, None]: The render's path, or None if it isn't cached.
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT path FROM renders WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.isfile(row[0]):
+                connection.execute("DELETE FROM renders WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            connection.execute("UPDATE renders SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def add(self, key: str, path: str) -> None:
+        """Record a finished render, evicting old renders if the cache is over quota."""
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO renders (key, path, size, accessed_at) VALUES (?, ?, ?, ?)", (key, path, _output_size(path), time.time())
+            )
+            self._evict(connection, keep=key)
+
+    def reference(self, key: str, session_id: str) -> None:
+        """Record that a session was handed a render, so it isn't evicted while the session may still use it."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO render_references (key, session_id, referenced_at) VALUES (?, ?, ?)", (key, session_id, time.time())
+            )
+
+    def _evict(self, connection: sqlite3.Connection, keep: str) -> None:
+        now = time.time()
+        connection.execute("DELETE FROM render_references WHERE referenced_at < ?", (now - self.reference_ttl,))
+
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        evictable = connection.execute(
+            "SELECT key, path, size FROM renders WHERE key != ? AND accessed_at < ? "
+            "AND key NOT IN (SELECT key FROM render_references) ORDER BY accessed_at ASC",
+            (keep, now - self.grace_period),
+        ).fetchall()
+        for key, path, size in evictable:
+            _remove_output(path)
+            connection.execute("DELETE FROM renders WHERE key = ?", (key,))
+            self.evictions += 1
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
+
+    def _cleanup(self, connection: sqlite3.Connection) -> None:
+        """Forget renders that were deleted from disk and remove leftovers from interrupted renders."""
+        for key, path in connection.execute("SELECT key, path FROM renders").fetchall():
+            if not os.path.isfile(path):
+                connection.execute("DELETE FROM renders WHERE key = ?", (key,))
+
+        public_dir = os.environ.get("HOST_PUBLIC_DIR")
+        if not public_dir or not os.path.isdir(public_dir):
+            return
+
+        # Other processes may be rendering right now, so only leftovers older than the grace period are removed.
+        stale_before = time.time() - self.grace_period
+        for index_dir in os.scandir(public_dir):
+            if not index_dir.is_dir():
+                continue
+            for entry in os.scandir(index_dir.path):
+                if entry.is_dir() and entry.name.startswith(".render_") and entry.stat().st_mtime < stale_before:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+    def clear(self) -> None:
+        """Delete every cached render, referenced or not."""
+        with self._lock:
+            connection = self._connect()
+            for (path,) in connection.execute("SELECT path FROM renders").fetchall():
+                _remove_output(path)
+            connection.execute("DELETE FROM renders")
+            connection.execute("DELETE FROM render_references")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size, total_bytes = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders").fetchone()
+        return {"size": size, "bytes": total_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+render_cache = RenderCache(index_path=RENDER_CACHE_INDEX_PATH, max_bytes=RENDER_CACHE_MAX_BYTES)
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces identical in-flight async calls so concurrent callers with the same key share one result.
+
+    The first caller for a key starts the work and every caller that arrives before it finishes awaits the same task.
+    Results (and exceptions) are shared, so callers should treat returned values as read-only.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn` unless a call with the same key is already in flight, in which case wait for that call instead.
+
+        Args:
+            key (Hashable): Identifies calls that are interchangeable.
+            fn (Callable[[], Awaitable[T]]): Starts the work. Only called when no matching call is in flight.
+
+        Returns:
+            T: The shared result.
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+
+        # Tasks can't be awaited from another event loop, e.g. when the CLI and tests run separate loops.
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done_task: self._forget(key, done_task))
+
+        # Shield the shared task so one caller being cancelled doesn't cancel the work for everyone else.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # Mark the exception as retrieved in case every caller was cancelled before the task finished.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
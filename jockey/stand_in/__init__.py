@@ -0,0 +1,3 @@
+from jockey.stand_in.server import TwelveLabsStandIn, create_app
+
+__all__ = ["TwelveLabsStandIn", "create_app"]
@@ -0,0 +1,36 @@
+import argparse
+import uvicorn
+from jockey.stand_in.server import FIXTURES_DIR, HLS_DIR, create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local TwelveLabs stand-in server for offline testing and benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR, help="Directory with recorded API responses")
+    parser.add_argument("--media-dir", default=None, help="Directory with <video_id>.mp4 files to serve as HLS")
+    parser.add_argument("--hls-dir", default=HLS_DIR, help="Where generated HLS playlists are kept")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Up to this many extra seconds added at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(
+        fixtures_dir=args.fixtures_dir,
+        media_dir=args.media_dir,
+        hls_dir=args.hls_dir,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+    print(f"Point Jockey at the stand-in with: TWELVE_LABS_BASE_URL=http://{args.host}:{args.port}/v1.2/")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import copy
+import json
+import uuid
+import random
+import shutil
+import asyncio
+import ffmpeg
+from typing import Dict, List, Union
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+from jockey.cache import DEFAULT_CACHE_DIR
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+HLS_DIR = os.path.join(DEFAULT_CACHE_DIR, "stand_in_hls")
+HLS_SEGMENT_SECONDS = 4
+
+HLS_MEDIA_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t", ".jpg": "image/jpeg"}
+
+
+class TwelveLabsStandIn:
+    """Local stand-in for the parts of the TwelveLabs v1.2 API that Jockey uses.
+
+    Search, video metadata and text generation responses are replayed from recorded fixtures. HLS playlists are
+    generated on first request from local test media, or from a synthetic test pattern when there is none.
+
+    Args:
+        fixtures_dir (str): Directory with `videos.json`, `search.json` and `text_generation.json`.
+
+        media_dir (Union[str, None]): Directory with `<video_id>.mp4` files to serve as HLS. Defaults to None.
+
+        hls_dir (str): Where generated HLS playlists and segments are kept between runs.
+
+        latency (float): Seconds added to every response.
+
+        latency_jitter (float): Up to this many extra seconds are added at random to every response.
+
+        error_rate (float): Fraction of requests answered with `error_status` instead.
+
+        error_status (int): Status code used for injected errors, e.g. 503 or 429.
+
+        seed (Union[int, None]): Seed for latency jitter and error injection so load tests are repeatable.
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: str = FIXTURES_DIR,
+        media_dir: Union[str, None] = None,
+        hls_dir: str = HLS_DIR,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Union[int, None] = None,
+    ) -> None:
+        self.media_dir = media_dir
+        self.hls_dir = hls_dir
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.injected_errors = 0
+
+        with open(os.path.join(fixtures_dir, "videos.json"), "r") as videos_file:
+            self.videos: Dict[str, Dict] = json.load(videos_file)
+        with open(os.path.join(fixtures_dir, "search.json"), "r") as search_file:
+            self.search_results: Dict[str, List[Dict]] = json.load(search_file)
+        with open(os.path.join(fixtures_dir, "text_generation.json"), "r") as text_generation_file:
+            self.text_generation: Dict[str, Dict] = json.load(text_generation_file)
+
+        # next_page_token -> (remaining results, page_limit)
+        self._pages: Dict[str, tuple] = {}
+        self._hls_locks: Dict[str, asyncio.Lock] = {}
+
+    def build_app(self) -> Starlette:
+        routes = [
+            Route("/v1.2/search", self.search, methods=["POST"]),
+            Route("/v1.2/search/{page_token}", self.search_page, methods=["GET"]),
+            Route("/v1.2/indexes/{index_id}/videos/{video_id}", self.video_metadata, methods=["GET"]),
+            Route("/hls/{video_id}/{filename}", self.hls, methods=["GET"]),
+        ]
+        # Jockey's urls for the text generation endpoints end in a slash, so both forms are served.
+        for endpoint in ["gist", "summarize", "generate"]:
+            for path in [f"/v1.2/{endpoint}", f"/v1.2/{endpoint}/"]:
+                routes.append(Route(path, self.generate_text, methods=["POST"], name=f"{endpoint}:{path}"))
+
+        app = Starlette(routes=routes, middleware=[Middleware(BaseHTTPMiddleware, dispatch=self.inject_faults)])
+        app.state.stand_in = self
+        return app
+
+    async def inject_faults(self, request: Request, call_next) -> Response:
+        self.request_count += 1
+
+        delay = self.latency + self.random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if request.url.path.startswith("/v1.2/") and not request.headers.get("x-api-key"):
+            return JSONResponse({"code": "api_key_invalid", "message": "No API key was provided."}, status_code=401)
+
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            headers = {"Retry-After": "1"} if self.error_status == 429 else None
+            return JSONResponse({"code": "injected_error", "message": "Error injected by the stand-in server."}, self.error_status, headers)
+
+        return await call_next(request)
+
+    async def search(self, request: Request) -> Response:
+        payload = await request.json()
+        query = " ".join(str(payload.get("query", "")).lower().split())
+
+        base_url = str(request.base_url).rstrip("/")
+        results = [
+            {**result, "thumbnail_url": f"{base_url}/hls/{result['video_id']}/thumbnail.jpg"}
+            for result in self.search_results.get(query, self.search_results["*"])
+        ]
+        video_filter = (payload.get("filter") or {}).get("id")
+        if video_filter:
+            results = [result for result in results if result["video_id"] in video_filter]
+        results.sort(key=lambda result: result["score"], reverse=True)
+
+        if payload.get("group_by") == "video":
+            clips_by_video: Dict[str, List[Dict]] = {}
+            for result in results:
+                clips_by_video.setdefault(result["video_id"], []).append(result)
+            results = [{"id": video_id, "clips": clips} for video_id, clips in clips_by_video.items()]
+
+        return self._search_page_response(results, int(payload.get("page_limit", 10)))
+
+    async def search_page(self, request: Request) -> Response:
+        page = self._pages.pop(request.path_params["page_token"], None)
+        if page is None:
+            return JSONResponse({"code": "token_expired", "message": "The page token has expired or does not exist."}, status_code=400)
+        return self._search_page_response(*page)
+
+    def _search_page_response(self, results: List[Dict], page_limit: int) -> Response:
+        page, remaining = results[:page_limit], results[page_limit:]
+
+        next_page_token = None
+        if remaining:
+            next_page_token = uuid.uuid4().hex
+            self._pages[next_page_token] = (remaining, page_limit)
+
+        page_info = {"limit_per_page": page_limit, "total_results": len(results), "next_page_token": next_page_token}
+        return JSONResponse({"data": page, "page_info": page_info})
+
+    async def video_metadata(self, request: Request) -> Response:
+        video_id = request.path_params["video_id"]
+        if video_id not in self.videos:
+            return JSONResponse({"code": "resource_not_exists", "message": f"Video {video_id} does not exist."}, status_code=404)
+
+        video = copy.deepcopy(self.videos[video_id])
+        base_url = str(request.base_url).rstrip("/")
+        video["hls"]["video_url"] = f"{base_url}/hls/{video_id}/index.m3u8"
+        video["hls"]["thumbnail_urls"] = [f"{base_url}/hls/{video_id}/thumbnail.jpg"]
+        return JSONResponse(video)
+
+    async def generate_text(self, request: Request) -> Response:
+        payload = await request.json()
+        video_id = payload.get("video_id")
+        if video_id not in self.videos:
+            return JSONResponse({"code": "parameter_invalid", "message": f"Video {video_id} does not exist."}, status_code=400)
+
+        endpoint = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+        responses = self.text_generation[endpoint]
+        if endpoint == "summarize":
+            response = responses.get(payload.get("type"))
+        else:
+            response = responses.get(video_id, responses.get("*"))
+
+        if response is None:
+            return JSONResponse({"code": "parameter_invalid", "message": "No recorded response for this request."}, status_code=400)
+        return JSONResponse(response)
+
+    async def hls(self, request: Request) -> Response:
+        video_id = request.path_params["video_id"]
+        filename = request.path_params["filename"]
+        if video_id not in self.videos or os.path.basename(filename) != filename:
+            return Response(status_code=404)
+
+        lock = self._hls_locks.setdefault(video_id, asyncio.Lock())
+        async with lock:
+            await asyncio.to_thread(self._generate_hls, video_id)
+
+        file_path = os.path.join(self.hls_dir, video_id, filename)
+        if not os.path.isfile(file_path):
+            return Response(status_code=404)
+        return FileResponse(file_path, media_type=HLS_MEDIA_TYPES.get(os.path.splitext(filename)[1]))
+
+    def _generate_hls(self, video_id: str) -> None:
+        """Segment the test media for a video into an HLS playlist and a thumbnail, unless that was already done."""
+        output_dir = os.path.join(self.hls_dir, video_id)
+        playlist_path = os.path.join(output_dir, "index.m3u8")
+        if os.path.isfile(playlist_path):
+            return
+
+        # Generate into a scratch directory first so an interrupted run never leaves a partial playlist behind.
+        partial_dir = f"{output_dir}.partial"
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        os.makedirs(partial_dir)
+        media_path = os.path.join(self.media_dir, f"{video_id}.mp4") if self.media_dir else None
+
+        if media_path and os.path.isfile(media_path):
+            source = ffmpeg.input(media_path)
+            video_stream, audio_stream = source.video, source.audio
+        else:
+            duration = self.videos[video_id]["metadata"]["duration"]
+            video_stream = ffmpeg.input(f"testsrc2=size=1280x720:rate=30:duration={duration}", f="lavfi")
+            audio_stream = ffmpeg.input(f"sine=frequency=440:duration={duration}", f="lavfi")
+
+        ffmpeg.output(
+            video_stream,
+            audio_stream,
+            os.path.join(partial_dir, "index.m3u8"),
+            vcodec="libx264",
+            acodec="aac",
+            preset="ultrafast",
+            f="hls",
+            hls_time=HLS_SEGMENT_SECONDS,
+            hls_playlist_type="vod",
+            hls_segment_filename=os.path.join(partial_dir, "segment_%03d.ts"),
+            loglevel="error",
+        ).overwrite_output().run()
+
+        ffmpeg.input(os.path.join(partial_dir, "index.m3u8")).output(
+            os.path.join(partial_dir, "thumbnail.jpg"), vframes=1, loglevel="error"
+        ).overwrite_output().run()
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(partial_dir, output_dir)
+
+
+def create_app(**kwargs) -> Starlette:
+    """Build the stand-in server app. Keyword arguments are passed on to `TwelveLabsStandIn`."""
+    return TwelveLabsStandIn(**kwargs).build_app()
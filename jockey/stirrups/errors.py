@@ -1,6 +1,7 @@
 from enum import Enum
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from jockey.circuit_breaker import CircuitOpenError
 from langgraph.errors import (
     GraphRecursionError,
     InvalidUpdateError,
@@ -42,6 +43,7 @@ class WorkerFunction(str, Enum):
     """Specific functions within the worker node"""
 
     VIDEO_SEARCH = "video_search"
+    BATCHED_VIDEO_SEARCH = "batched_video_search"
     VIDEO_EDITING = "video_editing"
     VIDEO_TEXT_GENERATION = "video_text_generation"
     REMOVE_SEGMENT = "remove_segment"
@@ -50,6 +52,7 @@ class WorkerFunction(str, Enum):
     GIST_TEXT_GENERATION = "gist_text_generation"
     SUMMARIZE_TEXT_GENERATION = "summarize_text_generation"
     FREEFORM_TEXT_GENERATION = "freeform_text_generation"
+    MULTI_VIDEO_TEXT_GENERATION = "multi_video_text_generation"
 
 
 class ErrorType(str, Enum):
@@ -64,6 +67,7 @@ class ErrorType(str, Enum):
     INSTRUCTION = "INSTRUCTION"
     PLANNING = "PLANNING"
     TEXT_GENERATION = "text_generation"
+    CIRCUIT_OPEN = "CIRCUIT_OPEN"
     UNEXPECTED = "UNEXPECTED"
 
 
@@ -74,6 +78,8 @@ class JockeyErrorData(BaseModel):
     error_type: ErrorType
     function_name: Optional[WorkerFunction] = None
     details: Optional[str] = None
+    # Whether the same request may succeed if tried again later, e.g. once a backend recovers.
+    retryable: bool = False
 
     @property
     def error_message(self) -> str:
@@ -92,10 +98,24 @@ class JockeyError(Exception):
         self.error_data = error_data
 
     @classmethod
-    def create(cls, node: NodeType, error_type: ErrorType, function_name: Optional[WorkerFunction] = None, details: Optional[str] = None):
-        error_data = JockeyErrorData(node=node, error_type=error_type, function_name=function_name, details=details)
+    def create(
+        cls,
+        node: NodeType,
+        error_type: ErrorType,
+        function_name: Optional[WorkerFunction] = None,
+        details: Optional[str] = None,
+        retryable: bool = False,
+    ):
+        error_data = JockeyErrorData(node=node, error_type=error_type, function_name=function_name, details=details, retryable=retryable)
         return cls(error_data)
 
+    @classmethod
+    def from_exception(cls, error: Exception, node: NodeType, error_type: ErrorType, function_name: Optional[WorkerFunction] = None):
+        """Wrap an exception as `error_type`, except for open circuits which are reported as retryable CIRCUIT_OPEN errors."""
+        if isinstance(error, CircuitOpenError):
+            return cls.create(node=node, error_type=ErrorType.CIRCUIT_OPEN, function_name=function_name, details=str(error), retryable=True)
+        return cls.create(node=node, error_type=error_type, function_name=function_name, details=f"Error: {str(error)}")
+
 
 def create_interrupt_event(run_id: str | None = None, last_event: Dict[str, Any] = None) -> Dict[str, Any]:
     """Create an interrupt event dictionary matching LangChain's event structure."""
@@ -152,6 +172,7 @@ def create_jockey_error_event(run_id: str | None = None, last_event: Dict[str, A
                 "function_name": error.error_data.function_name.value if error.error_data and error.error_data.function_name else None,
                 "details": error.error_data.details if error.error_data else None,
                 "error_message": error.error_data.error_message if error.error_data else None,
+                "retryable": error.error_data.retryable if error.error_data else False,
             },
         },
         "tags": last_event.get("tags", []) if last_event else [],
@@ -1,21 +1,52 @@
 import os
+import asyncio
+import contextlib
+import functools
 import ffmpeg
 from langchain.tools import tool
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
-from typing import List, Dict, Union
-from jockey.video_utils import download_video
+from typing import List, Dict, Literal, Optional, Set, Tuple, Union
+from jockey import encode_profiles, ffmpeg_runner, hls
+from jockey.cache import TTLCache
+from jockey.circuit_breaker import CircuitOpenError
+from jockey.render_cache import RENDER_REFERENCE_TTL, get_render_key, render_cache
+from jockey.single_flight import SingleFlight
+from jockey.thread import session_id
+from jockey.video_utils import HLS_URL_TTL, download_clips, get_preview_source, get_video_metadata, start_clip_downloads
 from jockey.prompts import DEFAULT_VIDEO_EDITING_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 from jockey.stirrups.errors import JockeyError, NodeType, WorkerFunction, ErrorType
 import uuid
+import tempfile
 
 CODEC_FAMILIES = {"mpeg": {"h264", "hevc", "mpeg4"}, "vp": {"vp8", "vp9"}, "av1": {"av1"}}
 
-CODEC_FAMILIES = {
-    'mpeg': {'h264', 'hevc', 'mpeg4'},
-    'vp': {'vp8', 'vp9'},
-    'av1': {'av1'}
-}
+# "mp4" returns the reel once it is fully rendered. "hls" returns a playlist straight away that grows as each clip is ready.
+COMBINE_OUTPUT_MODE = os.environ.get("JOCKEY_COMBINE_OUTPUT", "mp4").lower()
+HLS_OUTPUT_SEGMENT_SECONDS = 4
+_render_tasks: Set[asyncio.Task] = set()
+# Render key -> playlist path of progressive renders that are still running, so asking again joins the running render.
+_progressive_renders: Dict[str, str] = {}
+# Concurrent requests for the same reel share one render.
+render_flight = SingleFlight()
+
+# Previews are letterboxed to this size at this frame rate so clips of any shape can be joined.
+PREVIEW_WIDTH, PREVIEW_HEIGHT = 640, 360
+PREVIEW_FPS = int(os.environ.get("JOCKEY_PREVIEW_FPS", 12))
+# Start the full quality render in the background after returning a preview.
+PREVIEW_FULL_RENDER = os.environ.get("JOCKEY_PREVIEW_FULL_RENDER", "true").lower() != "false"
+FULL_RENDER_EVENT = "full_render_ready"
+# Keyed by thread ID. (render, sent as an event) of full quality renders that finished after their preview was returned,
+# until the session's next turn or the end of the turn they were sent in.
+finished_renders = TTLCache(max_size=1024, ttl=RENDER_REFERENCE_TTL)
+# Thread IDs of sessions whose turn is still streaming, so custom events dispatched for them still reach the client.
+streaming_turns: Set[str] = set()
+
+# Stream properties that have to match across clips for them to be joined without re-encoding.
+VIDEO_LAYOUT_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt", "time_base", "r_frame_rate")
+AUDIO_LAYOUT_KEYS = ("codec_name", "sample_rate", "channels", "channel_layout", "time_base")
 
 class Clip(BaseModel):
     """Define what constitutes a clip in the context of the video-editing worker."""
@@ -35,9 +66,22 @@ class Clip(BaseModel):
         return self.model_dump()
 
 
+EncodeProfileName = Literal["draft", "balanced", "archival"]
+ENCODE_PROFILE_DESCRIPTION = (
+    "How the combined clips are encoded: draft for a fast, low resolution encode, balanced for everyday use "
+    "and archival for a high quality final export. Leave empty to use the configured default."
+)
+PREVIEW_DESCRIPTION = (
+    "Set to true to first return a quick, low resolution preview of the combined clips when the user wants a quick look. "
+    "The full quality video is rendered in the background and delivered when it is ready. Leave empty otherwise."
+)
+
+
 # sent to openai tool call
 class SimplifiedCombineClipsInput(BaseModel):
     output_filename: str = Field(description="The output filename of the combined clips. Must be in the form: [filename].mp4")
+    encode_profile: Optional[EncodeProfileName] = Field(default=None, description=ENCODE_PROFILE_DESCRIPTION)
+    preview: Optional[bool] = Field(default=None, description=PREVIEW_DESCRIPTION)
 
 
 # used by the worker
@@ -47,6 +91,8 @@ class CombineClipsInput(BaseModel):
     clips: List[Clip] = Field(description="List of clips to be edited together. Each clip must have start and end times and a Video ID.")
     output_filename: str = Field(description="The output filename of the combined clips. Must be in the form: [filename].mp4")
     index_id: str = Field(description="Index ID the clips belong to.")
+    encode_profile: Optional[EncodeProfileName] = Field(default=None, description=ENCODE_PROFILE_DESCRIPTION)
+    preview: Optional[bool] = Field(default=None, description=PREVIEW_DESCRIPTION)
 
 
 class RemoveSegmentInput(BaseModel):
@@ -62,62 +108,407 @@ def are_codecs_compatible(codecs):
             return True
     return False
 
-def check_video_codecs(video_filepaths):
-    codecs = set()
-    for filepath in video_filepaths:
-        probe = ffmpeg.probe(filepath)
-        video_stream = next((stream for stream in probe['streams'] if stream['codec_type'] == 'video'), None)
-        if video_stream:
-            codecs.add(video_stream['codec_name'])
-    return codecs
+async def get_stream_layout(video_filepath: str) -> Dict:
+    """Probe the properties of a file's first video and audio streams that decide whether it can be stream copied."""
+    probe = await ffmpeg_runner.probe(video_filepath)
+    video_stream = next((stream for stream in probe["streams"] if stream["codec_type"] == "video"), None)
+    audio_stream = next((stream for stream in probe["streams"] if stream["codec_type"] == "audio"), None)
+    return {
+        "video": {key: video_stream.get(key) for key in VIDEO_LAYOUT_KEYS} if video_stream else None,
+        "audio": {key: audio_stream.get(key) for key in AUDIO_LAYOUT_KEYS} if audio_stream else None,
+    }
+
+
+async def can_stream_copy(video_filepaths: List[str], max_height: Union[int, None] = None) -> bool:
+    """Whether the files can be joined with the concat demuxer and `-c copy`, i.e. they share codecs,
+    resolution, timebase and audio layout, and are no taller than `max_height`."""
+    layouts = await asyncio.gather(*[get_stream_layout(filepath) for filepath in video_filepaths])
+    if layouts[0]["video"] is None or layouts[0]["audio"] is None:
+        return False
+    if max_height and (layouts[0]["video"]["height"] or 0) > max_height:
+        return False
+    if any(layout != layouts[0] for layout in layouts[1:]):
+        return False
+    return are_codecs_compatible({layouts[0]["video"]["codec_name"]})
+
+
+async def concat_stream_copy(video_filepaths: List[str], output_filepath: str, duration: Union[float, None] = None) -> None:
+    """Join files with the concat demuxer without re-encoding them."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        concat_list_path = os.path.join(work_dir, "concat.txt")
+        with open(concat_list_path, "w") as concat_list:
+            concat_list.writelines(f"file '{os.path.abspath(filepath)}'\n" for filepath in video_filepaths)
+
+        stream = ffmpeg.input(concat_list_path, f="concat", safe=0, loglevel="error").output(output_filepath, c="copy", movflags="+faststart")
+        await ffmpeg_runner.run_ffmpeg(stream, task=f"Joining {os.path.basename(output_filepath)}", duration=duration)
+
+
+async def concat_reencode(
+    video_filepaths: List[str], output_filepath: str, duration: Union[float, None] = None, encode_profile: Union[str, None] = None
+) -> None:
+    """Join files through the concat filter, re-encoding them with an encode profile."""
+    input_streams = []
+
+    for video_filepath in video_filepaths:
+        clip_input = ffmpeg.input(filename=video_filepath, loglevel="error")
+        clip_video_input_stream = clip_input.video.filter("setpts", "PTS-STARTPTS")
+        clip_audio_input_stream = clip_input.audio.filter("asetpts", "PTS-STARTPTS")
+
+        input_streams.extend([clip_video_input_stream, clip_audio_input_stream])
+
+    joined = ffmpeg.concat(*input_streams, v=1, a=1).node
+    stream = ffmpeg.output(
+        encode_profiles.scale_video(joined[0], encode_profile),
+        joined[1],
+        output_filepath,
+        movflags="+faststart",
+        **encode_profiles.video_encode_kwargs(encode_profile),
+        **encode_profiles.audio_encode_kwargs(encode_profile),
+    )
+    await ffmpeg_runner.run_ffmpeg(stream, task=f"Rendering {os.path.basename(output_filepath)}", duration=duration)
+
+
+async def segment_clip(
+    clip_path: str, output_dir: str, prefix: str, duration: Union[float, None] = None, encode_profile: Union[str, None] = None
+) -> List[hls.Segment]:
+    """Split a clip into HLS segments named `{prefix}_000.ts` and so on, stream copying it when possible and
+    re-encoding it with the encode profile otherwise, e.g. when it is taller than the profile allows.
+
+    Returns:
+        List[hls.Segment]: The clip's segments, with uris relative to `output_dir`.
+    """
+    clip_playlist_path = os.path.join(output_dir, f"{prefix}.m3u8")
+    hls_kwargs = {
+        "f": "hls",
+        "hls_time": HLS_OUTPUT_SEGMENT_SECONDS,
+        "hls_playlist_type": "vod",
+        "hls_segment_filename": os.path.join(output_dir, f"{prefix}_%03d.ts"),
+    }
+
+    task = f"Segmenting {os.path.basename(clip_path)}"
+    stream_copied = False
+    # Clips taller than the profile allows have to be scaled down, which means re-encoding them.
+    if await can_stream_copy([clip_path], encode_profiles.get_max_height(encode_profile)):
+        try:
+            stream = ffmpeg.input(clip_path, loglevel="error").output(clip_playlist_path, c="copy", **hls_kwargs)
+            await ffmpeg_runner.run_ffmpeg(stream, task=task, duration=duration)
+            stream_copied = True
+        except ffmpeg.Error as error:
+            print(f"[WARNING] Stream copy segmenting failed, re-encoding {clip_path} instead: {error}")
+
+    if not stream_copied:
+        clip_input = ffmpeg.input(clip_path, loglevel="error")
+        stream = ffmpeg.output(
+            encode_profiles.scale_video(clip_input.video, encode_profile),
+            clip_input.audio,
+            clip_playlist_path,
+            **encode_profiles.video_encode_kwargs(encode_profile),
+            **encode_profiles.audio_encode_kwargs(encode_profile),
+            **hls_kwargs,
+        )
+        await ffmpeg_runner.run_ffmpeg(stream, task=task, duration=duration)
+
+    with open(clip_playlist_path) as clip_playlist:
+        segments = hls.parse_media_playlist(clip_playlist.read(), "").segments
+    os.remove(clip_playlist_path)
+    return segments
+
+
+async def render_progressive(
+    clip_downloads: Dict[Tuple[str, float, float], asyncio.Future],
+    clip_keys: List[Tuple[str, float, float]],
+    playlist: hls.PlaylistWriter,
+    encode_profile: Union[str, None] = None,
+    render_key: Union[str, None] = None,
+) -> None:
+    """Append each clip to the playlist, in order, as soon as it has been downloaded. Clips that fail are skipped,
+    since the playlist has already been handed out. The playlist is added to the render cache under `render_key`
+    only if no clip was skipped."""
+    output_dir = os.path.dirname(playlist.path)
+    skipped = 0
+
+    try:
+        for i, clip_key in enumerate(clip_keys):
+            try:
+                video_filepath = await clip_downloads[clip_key]
+                if isinstance(video_filepath, dict):
+                    raise RuntimeError(video_filepath["error"])
+                segments = await segment_clip(video_filepath, output_dir, f"clip_{i:03d}", clip_key[2] - clip_key[1], encode_profile)
+            except (CircuitOpenError, RuntimeError, ffmpeg.Error, OSError) as error:
+                video_id, start, end = clip_key
+                print(f"[ERROR] Skipping Video ID {video_id} from {start}s to {end}s in {playlist.path}: {error}")
+                skipped += 1
+                continue
+
+            # Every clip starts its own timeline.
+            playlist.append(segments, discontinuity=bool(playlist.segments))
+    finally:
+        playlist.end()
+
+    if render_key is not None and not skipped:
+        render_cache.add(render_key, playlist.path)
+
+
+def start_progressive_render(
+    index_id: str,
+    output_filename: str,
+    clip_keys: List[Tuple[str, float, float]],
+    encode_profile: Union[str, None] = None,
+    render_key: Union[str, None] = None,
+) -> str:
+    """Start rendering clips into an HLS playlist in the background. While it runs, `_progressive_renders` maps
+    `render_key` to the playlist.
+
+    Returns:
+        str: Path of the playlist. It exists straight away and grows as clips are appended.
+    """
+    output_dir = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, os.path.splitext(output_filename)[0])
+    os.makedirs(output_dir, exist_ok=True)
+    playlist = hls.PlaylistWriter(os.path.join(output_dir, "index.m3u8"), target_duration=HLS_OUTPUT_SEGMENT_SECONDS)
+
+    clip_downloads = start_clip_downloads(index_id, clip_keys)
+    task = asyncio.ensure_future(render_progressive(clip_downloads, clip_keys, playlist, encode_profile, render_key))
+    # The event loop only keeps weak references to tasks.
+    _render_tasks.add(task)
+    task.add_done_callback(_render_tasks.discard)
+    if render_key is not None:
+        _progressive_renders[render_key] = playlist.path
+        task.add_done_callback(lambda _: _progressive_renders.pop(render_key, None))
+    return playlist.path
+
+
+async def get_combined_render_key(
+    index_id: str, clip_keys: List[Tuple[str, float, float]], encode_profile: str, output_mode: str = COMBINE_OUTPUT_MODE
+) -> Union[str, None]:
+    """Render cache key for combining clips, or None if a source video's metadata can't be fetched to tell its version."""
+    video_ids = list(dict.fromkeys(video_id for video_id, _, _ in clip_keys))
+    # The clips are downloaded right after this, which needs the HLS urls from the same metadata.
+    videos = await asyncio.gather(*[get_video_metadata(index_id=index_id, video_id=video_id, max_age=HLS_URL_TTL) for video_id in video_ids])
+    if any("error" in video for video in videos):
+        return None
+
+    source_versions = {video_id: str(video.get("updated_at") or video.get("indexed_at") or "") for video_id, video in zip(video_ids, videos)}
+    return get_render_key(index_id, clip_keys, encode_profile, source_versions, output_mode)
+
+
+async def render_combined(index_id: str, clip_keys: List[Tuple[str, float, float]], output_filepath: str, encode_profile: str) -> str:
+    """Download clips and join them into `output_filepath`, stream copying them when their layouts match.
+
+    Raises:
+        JockeyError: If any clip fails to download.
+
+    Returns:
+        str: `output_filepath`. The reel is written atomically, so a partial reel never ends up there.
+    """
+    video_filepaths = await download_clips(index_id, clip_keys)
+
+    failures = {clip_key: result for clip_key, result in video_filepaths.items() if isinstance(result, dict)}
+    if failures:
+        details = "; ".join(f"Video ID {video_id} from {start}s to {end}s: {result['error']}" for (video_id, start, end), result in failures.items())
+        raise JockeyError.create(
+            node=NodeType.WORKER,
+            error_type=ErrorType.VIDEO,
+            function_name=WorkerFunction.DOWNLOAD_VIDEO,
+            details=f"Failed to download {len(failures)} of {len(video_filepaths)} clips. {details}",
+        )
+
+    ordered_filepaths = [video_filepaths[clip_key] for clip_key in clip_keys]
+    duration = sum(end - start for _, start, end in clip_keys)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_filepath), prefix=".render_") as work_dir:
+        partial_filepath = os.path.join(work_dir, os.path.basename(output_filepath))
+
+        # Clips cut from the same source usually share a layout and can be joined without re-encoding, unless the
+        # profile scales them down.
+        stream_copied = False
+        if await can_stream_copy(ordered_filepaths, encode_profiles.get_max_height(encode_profile)):
+            try:
+                await concat_stream_copy(ordered_filepaths, partial_filepath, duration)
+                stream_copied = True
+            except ffmpeg.Error as error:
+                print(f"[WARNING] Stream copy concat failed, re-encoding the clips instead: {error}")
+
+        if not stream_copied:
+            await concat_reencode(ordered_filepaths, partial_filepath, duration, encode_profile)
+
+        os.replace(partial_filepath, output_filepath)
+    return output_filepath
+
+
+async def render_preview(index_id: str, clip_keys: List[Tuple[str, float, float]], output_filepath: str) -> str:
+    """Render a low resolution, low frame rate proxy of the combined clips straight from a small HLS rendition,
+    without downloading or cutting the clips at full quality first.
+
+    Returns:
+        str: `output_filepath`. The preview is written atomically, so a partial preview never ends up there.
+    """
+    sources = await asyncio.gather(*[get_preview_source(index_id, *clip_key) for clip_key in clip_keys])
+    input_streams = []
+
+    for (_, start, end), (source_uri, source_start) in zip(clip_keys, sources):
+        clip_input = ffmpeg.input(source_uri, ss=start - source_start, t=end - start, loglevel="error")
+        clip_video_input_stream = (
+            clip_input.video.filter("fps", PREVIEW_FPS)
+            .filter("scale", PREVIEW_WIDTH, PREVIEW_HEIGHT, force_original_aspect_ratio="decrease")
+            .filter("pad", PREVIEW_WIDTH, PREVIEW_HEIGHT, "(ow-iw)/2", "(oh-ih)/2")
+            .filter("setsar", 1)
+            .filter("setpts", "PTS-STARTPTS")
+        )
+        clip_audio_input_stream = clip_input.audio.filter("asetpts", "PTS-STARTPTS")
+
+        input_streams.extend([clip_video_input_stream, clip_audio_input_stream])
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_filepath), prefix=".render_") as work_dir:
+        partial_filepath = os.path.join(work_dir, os.path.basename(output_filepath))
+        joined = ffmpeg.concat(*input_streams, v=1, a=1).node
+        stream = ffmpeg.output(
+            joined[0],
+            joined[1],
+            partial_filepath,
+            vcodec="libx264",
+            preset="ultrafast",
+            crf=32,
+            acodec="aac",
+            audio_bitrate="64k",
+            movflags="+faststart",
+        )
+        duration = sum(end - start for _, start, end in clip_keys)
+        await ffmpeg_runner.run_ffmpeg(stream, task=f"Rendering a preview of {os.path.basename(output_filepath)}", duration=duration)
+        os.replace(partial_filepath, output_filepath)
+    return output_filepath
+
+
+async def get_combined_output(
+    index_id: str, output_filename: str, clip_keys: List[Tuple[str, float, float]], encode_profile: str, thread_id: str, preview: bool = False
+) -> str:
+    """Combine clips, serving the reel from the render cache when the same one was rendered before.
+
+    Args:
+        index_id (str): Index ID the clips belong to.
+        output_filename (str): Name asked for. The render key, or a random UUID when it can't be cached, is appended.
+        clip_keys (List[Tuple[str, float, float]]): (video_id, start, end) of every clip, in order.
+        encode_profile (str): Name of the encode profile. Previews don't use one.
+        thread_id (str): Session the reel is for. It holds a reference so the reel isn't evicted while it may use it.
+        preview (bool, optional): Render a low resolution proxy with `render_preview` instead. Defaults to False.
+
+    Returns:
+        str: Path of the reel, or of a playlist that grows as clips are ready when `JOCKEY_COMBINE_OUTPUT` is hls.
+    """
+    output_mode = "preview" if preview else COMBINE_OUTPUT_MODE
+    render_key = await get_combined_render_key(index_id, clip_keys, "" if preview else encode_profile, output_mode)
+    output_path = None
+    if render_key is not None:
+        output_path = render_cache.get(render_key) or _progressive_renders.get(render_key)
+
+    if output_path is None:
+        # Renders are named after their key so identical requests share a file, or a random UUID when uncached.
+        output_name = f"{os.path.splitext(output_filename)[0]}_{(render_key or uuid.uuid4().hex)[:16]}"
+        if output_mode == "hls":
+            output_path = start_progressive_render(index_id, output_name, clip_keys, encode_profile, render_key)
+        else:
+            output_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, f"{output_name}.mp4")
+            if preview:
+                render = functools.partial(render_preview, index_id, clip_keys, output_filepath)
+            else:
+                render = functools.partial(render_combined, index_id, clip_keys, output_filepath, encode_profile)
+            output_path = await (render_flight.do(render_key, render) if render_key is not None else render())
+            if render_key is not None:
+                render_cache.add(render_key, output_path)
+
+    if render_key is not None:
+        # Keeps the render from being evicted while this session may still point to it.
+        render_cache.reference(render_key, thread_id)
+    return output_path
+
+
+def start_turn(thread_id: str) -> None:
+    """Mark a session's turn as streaming, so full quality renders that finish during it are sent as events."""
+    streaming_turns.add(thread_id)
+
+
+def finish_turn(thread_id: str) -> None:
+    """Mark a session's turn as over. Call it before the turn's run ends, while events sent during the turn can still
+    reach the client. Renders sent as events during the turn are then not announced again on the next turn."""
+    streaming_turns.discard(thread_id)
+    renders = [(render, sent) for render, sent in finished_renders.get(thread_id, []) if not sent]
+    if renders:
+        finished_renders.set(thread_id, renders)
+    else:
+        finished_renders.invalidate(thread_id)
+
+
+def pop_finished_renders(thread_id: str) -> List[Dict]:
+    """Take the full quality renders that finished for a session after their previews were returned, and weren't
+    already delivered as events during a turn that finished."""
+    renders = finished_renders.get(thread_id, [])
+    finished_renders.invalidate(thread_id)
+    return [render for render, _ in renders]
+
+
+async def deliver_full_render(
+    index_id: str,
+    output_filename: str,
+    clip_keys: List[Tuple[str, float, float]],
+    encode_profile: str,
+    thread_id: str,
+    preview_path: str,
+    config: RunnableConfig,
+) -> None:
+    """Render the full quality reel behind a preview and deliver its path to the session: as a `full_render_ready`
+    custom event if the turn is still streaming, and through `pop_finished_renders` at the start of its next turn unless
+    the turn it was sent in finished."""
+    try:
+        output_path = await get_combined_output(index_id, output_filename, clip_keys, encode_profile, thread_id)
+        result = {"preview_path": preview_path, "output_path": output_path}
+    except Exception as error:
+        print(f"[ERROR] Full render behind preview {preview_path} failed: {error}")
+        result = {"preview_path": preview_path, "error": str(error)}
+
+    sent = False
+    # Once the turn's run is over, dispatching doesn't fail, the event just never reaches anyone.
+    if thread_id in streaming_turns:
+        with contextlib.suppress(RuntimeError):
+            await adispatch_custom_event(FULL_RENDER_EVENT, result, config=config)
+            sent = True
+
+    # Sent renders stay queued until their turn finishes, in case it fails before the client gets the event.
+    finished_renders.set(thread_id, [*finished_renders.get(thread_id, []), (result, sent)])
+
 
 @tool("combine-clips", args_schema=CombineClipsInput)
-async def combine_clips(clips: List[Clip], output_filename: str, index_id: str) -> Union[str, Dict]:
+async def combine_clips(
+    clips: List[Clip],
+    output_filename: str,
+    index_id: str,
+    config: RunnableConfig,
+    encode_profile: Optional[str] = None,
+    preview: Optional[bool] = None,
+) -> Union[str, Dict]:
     # """Combine or edit multiple clips together based on their start and end times and video IDs.
     # The full filepath for the combined clips is returned. Return a Union str if successful, or a Dict if an error occurs."""
 
-    # Add a random UUID to the output filename to avoid overwriting existing files
-    output_filename += f"_{uuid.uuid4().hex}.mp4"
-
     try:
         # Input validation first
         for clip in clips:
             if clip.start < 0:
                 raise ValueError(f"Invalid start time: {clip.start}. Start time cannot be negative.")
+        # Fail before any downloads start if the configured default is misspelled.
+        encode_profile = encode_profiles.get_encode_profile(encode_profile)["name"]
 
-        input_streams = []
-        video_filepaths = []
+        clip_keys = [(clip.video_id, clip.start, clip.end) for clip in clips]
+        thread_id = str(config.get("configurable", {}).get("thread_id") or session_id)
 
-        for clip in clips:
-            video_id = clip.video_id
-            start = clip.start
-            end = clip.end
-            video_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, f"{video_id}_{start}_{end}.mp4")
-            video_filepaths.append(video_filepath)
-            if os.path.isfile(video_filepath) is False:
-                try:
-                    download_video(video_id=video_id, index_id=index_id, start=start, end=end)
-                except AssertionError as error:
-                    error_response = {
-                        "message": f"There was an error retrieving the video metadata for Video ID: {video_id} in Index ID: {index_id}. "
-                        "Double check that the Video ID and Index ID are valid and correct.",
-                        "error": str(error),
-                    }
-                    continue
-
-            clip_video_input_stream = ffmpeg.input(filename=video_filepath, loglevel="error").video
-            clip_audio_input_stream = ffmpeg.input(filename=video_filepath, loglevel="error").audio
-            clip_video_input_stream = clip_video_input_stream.filter("setpts", "PTS-STARTPTS")
-            clip_audio_input_stream = clip_audio_input_stream.filter("asetpts", "PTS-STARTPTS")
-
-            input_streams.extend([clip_video_input_stream, clip_audio_input_stream])
-
-        output_filepath = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id, output_filename)
-        ffmpeg.concat(*input_streams, v=1, a=1).output(
-            output_filepath, vcodec="libx264", acodec="libmp3lame", video_bitrate="1M", audio_bitrate="192k"
-        ).overwrite_output().run()
-
-        return output_filepath
+        if not preview:
+            return await get_combined_output(index_id, output_filename, clip_keys, encode_profile, thread_id)
+
+        preview_filename = f"{os.path.splitext(output_filename)[0]}_preview"
+        preview_path = await get_combined_output(index_id, preview_filename, clip_keys, encode_profile, thread_id, preview=True)
+        if PREVIEW_FULL_RENDER:
+            task = asyncio.ensure_future(deliver_full_render(index_id, output_filename, clip_keys, encode_profile, thread_id, preview_path, config))
+            # The event loop only keeps weak references to tasks.
+            _render_tasks.add(task)
+            task.add_done_callback(_render_tasks.discard)
+        return preview_path
 
     except JockeyError:
         # propagate JockeyError as is
@@ -125,12 +516,7 @@ async def combine_clips(clips: List[Clip], output_filename: str, index_id: str)
 
     except Exception as error:
         # other errors
-        jockey_error = JockeyError.create(
-            node=NodeType.WORKER,
-            error_type=ErrorType.VIDEO,
-            function_name=WorkerFunction.COMBINE_CLIPS,
-            details=f"Error: {str(error)}",
-        )
+        jockey_error = JockeyError.from_exception(error, node=NodeType.WORKER, error_type=ErrorType.VIDEO, function_name=WorkerFunction.COMBINE_CLIPS)
         raise jockey_error
 
 
@@ -1,18 +1,32 @@
-import requests
-import json
-import urllib
 import os
+import json
+import asyncio
 from pydantic import BaseModel, Field
 from langchain.tools import tool
-from typing import Dict, List, Union, Literal
+from typing import AsyncIterator, Dict, List, Union, Literal
 from enum import Enum
 from jockey.stirrups.errors import ErrorType, JockeyError, NodeType, WorkerFunction, create_jockey_error_event
-from jockey.video_utils import get_video_metadata
+from jockey import tl_client
+from jockey.tl_client import SEARCH_URL
+from jockey.cache import TTLCache
+from jockey.single_flight import SingleFlight
+from jockey.video_utils import get_video_metadata, HLS_URL_TTL
 from jockey.prompts import DEFAULT_VIDEO_SEARCH_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
-SEARCH_URL = urllib.parse.urljoin(TL_BASE_URL, "search")
+# Upper bound on concurrent metadata requests made while enriching a single search.
+METADATA_CONCURRENCY = int(os.environ.get("TL_METADATA_CONCURRENCY", 8))
+
+SEARCH_CACHE_SIZE = int(os.environ.get("TL_SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL = float(os.environ.get("TL_SEARCH_CACHE_TTL", 300))
+
+# Largest page the search API returns. Requests for more results are served by following page tokens.
+SEARCH_PAGE_LIMIT = 50
+
+# Keyed by the normalized search payload (see _search_cache_key). Values are (top_n, search_data).
+search_cache = TTLCache(max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Identical searches that miss the cache at the same time share a single request.
+search_flight = SingleFlight()
 
 
 class GroupByEnum(str, Enum):
@@ -35,7 +49,7 @@ class MarengoSearchInput(BaseModel):
     )
     index_id: str = Field(description="parse the <active_plan> to determine the index_id")
     top_n: int = Field(
-        description="parse the <active_plan> to determine the top_n (default: 3, lt: 50)",
+        description="parse the <active_plan> to determine the top_n (default: 3)",
     )
     group_by: Literal["clip"] = Field(
         description="group videos by clip",
@@ -46,25 +60,97 @@ class MarengoSearchInput(BaseModel):
     video_filter: Union[List[str], None] = Field(
         description="Filter search results to only include results from video IDs in this list. If <video_filter> is not provided, return None",
     )
+    min_score: Union[float, None] = Field(
+        default=None,
+        description="Only return results scoring at least this much if the <active_plan> asks for only good matches. Otherwise return None",
+    )
 
 
-async def _base_video_search(
-    query: str,
-    index_id: str,
-    top_n: int = 3,
-    group_by: GroupByEnum = GroupByEnum.CLIP,
-    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
-    video_filter: Union[List[str], None] = None,
-) -> Union[List[Dict], List]:
-    headers = {"x-api-key": os.environ["TWELVE_LABS_API_KEY"], "accept": "application/json", "Content-Type": "application/json"}
+class MarengoBatchSearchInput(BaseModel):
+    """Create a valid input for the batched-video-search api when the <active_plan> asks for several different searches at once"""
+
+    queries: List[str] = Field(
+        description=(
+            "One query text per distinct search in the <active_plan> and <tool_call>. Example: ['A man dunking', 'A three-pointer', 'A block']"
+        ),
+    )
+    index_id: str = Field(description="parse the <active_plan> to determine the index_id")
+    top_n: int = Field(
+        description="parse the <active_plan> to determine the top_n for each query (default: 3)",
+    )
+    group_by: Literal["clip"] = Field(
+        description="group videos by clip",
+    )
+    search_options: List[Literal["visual", "conversation", "text_in_video", "logo"]] = Field(
+        description="Determine which modalities would be suitable given the <active_plan>",
+    )
+    video_filter: Union[List[str], None] = Field(
+        description="Filter search results to only include results from video IDs in this list. If <video_filter> is not provided, return None",
+    )
+    min_score: Union[float, None] = Field(
+        default=None,
+        description="Only return results scoring at least this much if the <active_plan> asks for only good matches. Otherwise return None",
+    )
+
+
+def _search_cache_key(payload: Dict) -> tuple:
+    """Normalize a search payload into a cache key. `page_limit` is left out so larger cached pages can serve smaller requests."""
+
+    def normalize(value):
+        value = getattr(value, "value", value)
+        if isinstance(value, str):
+            return " ".join(value.lower().split())
+        if isinstance(value, (list, tuple)):
+            return tuple(sorted(normalize(item) for item in value))
+        if isinstance(value, dict):
+            return json.dumps(value, sort_keys=True, default=str)
+        return value
+
+    return (
+        payload["index_id"],
+        normalize(payload["query"]),
+        normalize(payload["search_options"]),
+        normalize(payload["group_by"]),
+        normalize(payload.get("filter", {}).get("id")),
+        payload["threshold"],
+        payload["sort_option"],
+        payload["conversation_option"],
+    )
+
+
+def invalidate_search_cache(index_id: str) -> int:
+    """Drop every cached search for an index, e.g. after videos were added to or removed from it.
+
+    Returns:
+        int: The number of cached searches removed.
+    """
+    return search_cache.invalidate_where(lambda cache_key: cache_key[0] == index_id)
+
+
+class SearchRequestError(Exception):
+    """Raised while paging through a search when the API returns an error. Carries the same error response dict
+    that `_base_video_search` returns to its callers."""
+
+    def __init__(self, error_response: Dict):
+        super().__init__(error_response["message"])
+        self.error_response = error_response
 
+
+def _build_search_payload(
+    query: Union[str, dict],
+    index_id: str,
+    top_n: int,
+    group_by: GroupByEnum,
+    search_options: List[SearchOptionsEnum],
+    video_filter: Union[List[str], None],
+) -> Dict:
     payload = {
         "search_options": search_options,
         "group_by": group_by,
         "threshold": "low",
         "sort_option": "score",
         "conversation_option": "semantic",
-        "page_limit": top_n,
+        "page_limit": min(top_n, SEARCH_PAGE_LIMIT),
         "index_id": index_id,
         "query": query,
     }
@@ -72,38 +158,80 @@ async def _base_video_search(
     if video_filter is not None:
         payload["filter"] = {"id": video_filter}
 
-    video_metadata = requests.post(SEARCH_URL, json=payload, headers=headers)
+    return payload
+
+
+async def _iter_search_pages(payload: Dict, max_results: int) -> AsyncIterator[List[Dict]]:
+    """Yield raw pages of search results, lazily following `next_page_token` until `max_results` results
+    have been yielded or the API has no more pages.
+
+    Raises:
+        SearchRequestError: If the first search or any following page request fails.
+    """
+    url = SEARCH_URL
+    response = await tl_client.post(url, json=payload)
+    results_seen = 0
+
+    while True:
+        if response.status_code != 200:
+            print(f"[ERROR] API request failed with status {response.status_code}: {response.text}")
+            error_response = {
+                "message": "There was an API error when searching the index.",
+                "url": url,
+                "json_payload": payload,
+                "response": response.text,
+            }
+            raise SearchRequestError(error_response)
+
+        search_page = response.json()
+        page = search_page["data"][: max_results - results_seen]
+        results_seen += len(page)
+        yield page
+
+        next_page_token = search_page.get("page_info", {}).get("next_page_token")
+        if results_seen >= max_results or not page or not next_page_token:
+            return
+
+        url = f"{SEARCH_URL}/{next_page_token}"
+        response = await tl_client.get(url)
 
-    if video_metadata.status_code != 200:
-        print(f"[ERROR] API request failed with status {video_metadata.status_code}: {video_metadata.text}")
-        error_response = {
-            "message": "There was an API error when searching the index.",
-            "url": SEARCH_URL,
-            "headers": headers,
-            "json_payload": payload,
-            "response": video_metadata.text,
-        }
-        return error_response
 
+def _to_results(search_data: List[Dict], group_by: GroupByEnum) -> List[Dict]:
+    # Results are copied before enrichment so cached pages are never mutated.
     if group_by == "video":
-        top_n_results = [{"video_id": video["id"]} for video in video_metadata.json()["data"][:top_n]]
-    else:
-        top_n_results = video_metadata.json()["data"][:top_n]
+        return [{"video_id": video["id"]} for video in search_data]
+    return [dict(result) for result in search_data]
 
-    for result in top_n_results:
-        video_id = result["video_id"]
 
-        video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
+async def _enrich_results(results: List[Dict], index_id: str, group_by: GroupByEnum) -> None:
+    """Add `video_url`, `video_title` and, for videos, `thumbnail_url` to search results in place.
 
-        if isinstance(video_metadata, dict) and "error" in video_metadata:
+    Raises:
+        SearchRequestError: If the metadata for any of the videos can't be retrieved.
+    """
+    # Clips grouped by clip frequently share a video_id, so each video's metadata is only requested once.
+    unique_video_ids = list(dict.fromkeys(result["video_id"] for result in results))
+    semaphore = asyncio.Semaphore(METADATA_CONCURRENCY)
+
+    async def fetch_video_data(video_id: str):
+        async with semaphore:
+            return video_id, await get_video_metadata(video_id=video_id, index_id=index_id, max_age=HLS_URL_TTL)
+
+    video_data_by_id = {}
+    for video_id, video_metadata in await asyncio.gather(*[fetch_video_data(video_id) for video_id in unique_video_ids]):
+        if "error" in video_metadata:
             error_response = {
                 "message": "There was an API error when retrieving video metadata.",
                 "video_id": video_id,
                 "response": video_metadata["error"],
             }
-            return error_response
+            raise SearchRequestError(error_response)
 
-        video_data = video_metadata.json()
+        video_data_by_id[video_id] = video_metadata
+
+    # results are already in score order so enriching in place preserves the ranking.
+    for result in results:
+        video_data = video_data_by_id[result["video_id"]]
 
         if "video_url" not in result or not result["video_url"]:
             result["video_url"] = video_data["hls"]["video_url"]
@@ -113,6 +241,83 @@ async def _base_video_search(
         if group_by == "video":
             result["thumbnail_url"] = video_data["hls"]["thumbnail_urls"][0]
 
+
+async def _iter_cached_pages(search_data: List[Dict]) -> AsyncIterator[List[Dict]]:
+    yield search_data
+
+
+async def iter_video_search(
+    query: Union[str, dict],
+    index_id: str,
+    top_n: int = 3,
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
+    video_filter: Union[List[str], None] = None,
+    min_score: Union[float, None] = None,
+) -> AsyncIterator[Dict]:
+    """Stream enriched search results as each page arrives instead of waiting for the whole result set.
+
+    Args:
+        top_n (int): Stop once this many results have been yielded. Can be larger than a single page.
+        min_score (Union[float, None], optional): Stop at the first result scoring below this floor.
+            Results are sorted by score so nothing after it would qualify. Defaults to None.
+
+    Raises:
+        SearchRequestError: If searching or retrieving video metadata fails.
+
+    Yields:
+        Dict: Search results in score order, with `video_url`, `video_title` and, for videos, `thumbnail_url` added.
+    """
+    payload = _build_search_payload(query, index_id, top_n, group_by, search_options, video_filter)
+
+    # A cached search can serve any request for the same search that asks for as many results or fewer.
+    cache_key = _search_cache_key(payload)
+    cached_search = search_cache.get(cache_key)
+    from_cache = cached_search is not None and cached_search[0] >= top_n
+    pages = _iter_cached_pages(cached_search[1][:top_n]) if from_cache else _iter_search_pages(payload, top_n)
+
+    search_data = []
+    reached_score_floor = False
+    async for page in pages:
+        search_data.extend(page)
+        results = _to_results(page, group_by)
+
+        if min_score is not None:
+            above_floor = [result for result in results if result.get("score", min_score) >= min_score]
+            reached_score_floor = len(above_floor) < len(results)
+            results = above_floor
+
+        await _enrich_results(results, index_id, group_by)
+        for result in results:
+            yield result
+
+        if reached_score_floor:
+            await pages.aclose()
+            break
+
+    if not from_cache:
+        # A search cut short by the score floor only fetched a prefix of the results, which can still serve smaller requests.
+        search_cache.set(cache_key, (len(search_data) if reached_score_floor else top_n, search_data))
+
+
+async def _base_video_search(
+    query: str,
+    index_id: str,
+    top_n: int = 3,
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
+    video_filter: Union[List[str], None] = None,
+    min_score: Union[float, None] = None,
+) -> Union[List[Dict], List]:
+    async def collect_results() -> List[Dict]:
+        return [result async for result in iter_video_search(query, index_id, top_n, group_by, search_options, video_filter, min_score)]
+
+    try:
+        cache_key = _search_cache_key(_build_search_payload(query, index_id, top_n, group_by, search_options, video_filter))
+        top_n_results = await search_flight.do((*cache_key, top_n, min_score), collect_results)
+    except SearchRequestError as error:
+        return error.error_response
+
     top_n_results = json.dumps(top_n_results)
 
     return top_n_results
@@ -135,9 +340,10 @@ async def simple_video_search(
     group_by: GroupByEnum = GroupByEnum.CLIP,
     search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
     video_filter: Union[List[str], None] = None,
+    min_score: Union[float, None] = None,
 ) -> Union[List[Dict], List]:
     try:
-        search_results = await _base_video_search(query, index_id, top_n, group_by, search_options, video_filter)
+        search_results = await _base_video_search(query, index_id, top_n, group_by, search_options, video_filter, min_score)
 
         if isinstance(search_results, list):
             try:
@@ -160,18 +366,63 @@ async def simple_video_search(
 
     except Exception as error:
         print(f"[ERROR] Search operation failed: {str(error)}")
-        jockey_error = JockeyError.create(
-            node=NodeType.WORKER,
-            error_type=ErrorType.SEARCH,
-            function_name=WorkerFunction.VIDEO_SEARCH,
-            details=f"Error: {str(error)}",
+        jockey_error = JockeyError.from_exception(error, node=NodeType.WORKER, error_type=ErrorType.SEARCH, function_name=WorkerFunction.VIDEO_SEARCH)
+        raise jockey_error
+
+
+@tool("batched-video-search", args_schema=MarengoBatchSearchInput, return_direct=True)
+async def batched_video_search(
+    queries: List[str],
+    index_id: str,
+    top_n: int = 3,
+    group_by: GroupByEnum = GroupByEnum.CLIP,
+    search_options: List[SearchOptionsEnum] = [SearchOptionsEnum.VISUAL, SearchOptionsEnum.CONVERSATION],
+    video_filter: Union[List[str], None] = None,
+    min_score: Union[float, None] = None,
+) -> Union[str, Dict]:
+    """Run several searches against the same index concurrently. Returns a JSON object with the clips of each query
+    under `results` and the error response of each query that failed under `errors`."""
+    try:
+        # Repeated queries in one batch are only searched once.
+        queries = list(dict.fromkeys(queries))
+        search_results = await asyncio.gather(*[
+            _base_video_search(query, index_id, top_n, group_by, search_options, video_filter, min_score) for query in queries
+        ])
+
+        # One failed query doesn't throw away the clips every other query found.
+        errors_by_query = {query: search_result for query, search_result in zip(queries, search_results) if isinstance(search_result, dict)}
+
+        # A clip matched by several queries is only kept under the query it scored highest for.
+        def clip_key(clip: Dict) -> tuple:
+            return (clip["video_id"], clip.get("start"), clip.get("end"))
+
+        clips_by_query = {
+            query: json.loads(search_result) for query, search_result in zip(queries, search_results) if query not in errors_by_query
+        }
+        best_query_by_clip = {}
+        for query, clips in clips_by_query.items():
+            for clip in clips:
+                best_query = best_query_by_clip.get(clip_key(clip))
+                if best_query is None or clip.get("score", 0) > best_query[1]:
+                    best_query_by_clip[clip_key(clip)] = (query, clip.get("score", 0))
+
+        merged_results = {
+            query: [clip for clip in clips if best_query_by_clip[clip_key(clip)][0] == query] for query, clips in clips_by_query.items()
+        }
+
+        return json.dumps({"results": merged_results, "errors": errors_by_query})
+
+    except Exception as error:
+        print(f"[ERROR] Batched search operation failed: {str(error)}")
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.SEARCH, function_name=WorkerFunction.BATCHED_VIDEO_SEARCH
         )
         raise jockey_error
 
 
 # Construct a valid worker for a Jockey instance.
 video_search_worker_config = {
-    "tools": [simple_video_search],
+    "tools": [simple_video_search, batched_video_search],
     "worker_prompt_file_path": DEFAULT_VIDEO_SEARCH_FILE_PATH,
     "worker_name": "video-search",
 }
@@ -1,21 +1,28 @@
-import requests
-import json
-import urllib
 import os
+import json
+import asyncio
 from pydantic import BaseModel, Field
 from langchain.tools import tool
-from typing import Dict, List, Union
+from typing import Awaitable, Callable, Dict, List, Union
 from enum import Enum
-from jockey.video_utils import get_video_metadata
+from jockey import tl_client
+from jockey.tl_client import GIST_URL, SUMMARIZE_URL, GENERATE_URL
+from jockey.video_utils import get_video_metadata, HLS_URL_TTL
 from jockey.prompts import DEFAULT_VIDEO_TEXT_GENERATION_FILE_PATH
 from jockey.stirrups.stirrup import Stirrup
 from jockey.stirrups.errors import ErrorType, JockeyError, NodeType, WorkerFunction, create_jockey_error_event
+from jockey.cache import DiskCache, DEFAULT_CACHE_DIR
+from jockey.single_flight import SingleFlight
 
+# Upper bound on concurrent Pegasus requests made by a single multi-video tool call.
+TEXT_GENERATION_CONCURRENCY = int(os.environ.get("TL_TEXT_GENERATION_CONCURRENCY", 4))
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
-GIST_URL = urllib.parse.urljoin(TL_BASE_URL, "gist/")
-SUMMARIZE_URL = urllib.parse.urljoin(TL_BASE_URL, "summarize/")
-GENERATE_URL = urllib.parse.urljoin(TL_BASE_URL, "generate/")
+# Gist and summarize outputs are effectively deterministic per (video_id, type, prompt), so they are kept on disk
+# and shared across conversations and restarts. Freeform generation is open ended and is never cached.
+PEGASUS_CACHE_MAX_BYTES = int(os.environ.get("PEGASUS_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+pegasus_cache = DiskCache(path=os.path.join(DEFAULT_CACHE_DIR, "pegasus.sqlite3"), max_bytes=PEGASUS_CACHE_MAX_BYTES)
+# Identical generation requests that are in flight at the same time share a single request.
+text_generation_flight = SingleFlight()
 
 
 class GistEndpointsEnum(str, Enum):
@@ -40,6 +47,10 @@ class PegasusGistInput(BaseModel):
     video_id: str = Field(description="The ID of the video to generate text from.")
     index_id: str = Field(description="Index ID which contains a collection of videos.")
     endpoint_options: List[GistEndpointsEnum] = Field(description="Determines what outputs to generate.")
+    bypass_cache: bool = Field(
+        default=False,
+        description="Regenerate instead of reusing a previously generated output. Only use when the user explicitly asks to regenerate.",
+    )
 
 
 class PegasusSummarizeInput(BaseModel):
@@ -52,6 +63,10 @@ class PegasusSummarizeInput(BaseModel):
         description="Instructions on how summaries, highlights, and chapters are generated. " "Always use when additional context is provided.",
         max_length=300,
     )
+    bypass_cache: bool = Field(
+        default=False,
+        description="Regenerate instead of reusing a previously generated output. Only use when the user explicitly asks to regenerate.",
+    )
 
 
 class PegasusFreeformInput(BaseModel):
@@ -65,53 +80,165 @@ class PegasusFreeformInput(BaseModel):
     )
 
 
+class PegasusMultiGistInput(BaseModel):
+    """Help to ensure the video-text-generation worker provides valid arguments when generating text for several videos."""
+
+    video_ids: List[str] = Field(
+        description="The IDs of the videos to generate text from. If none are given, the clips from the last search are used.",
+    )
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    endpoint_options: List[GistEndpointsEnum] = Field(description="Determines what outputs to generate.")
+    bypass_cache: bool = Field(
+        default=False,
+        description="Regenerate instead of reusing a previously generated output. Only use when the user explicitly asks to regenerate.",
+    )
+
+
+class PegasusMultiSummarizeInput(BaseModel):
+    """Help to ensure the video-text-generation worker provides valid arguments when generating text for several videos."""
+
+    video_ids: List[str] = Field(
+        description="The IDs of the videos to generate text from. If none are given, the clips from the last search are used.",
+    )
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    endpoint_option: SummarizeEndpointEnum = Field(description="Determines what output to generate.")
+    prompt: Union[str, None] = Field(
+        description="Instructions on how summaries, highlights, and chapters are generated. " "Always use when additional context is provided.",
+        max_length=300,
+    )
+    bypass_cache: bool = Field(
+        default=False,
+        description="Regenerate instead of reusing a previously generated output. Only use when the user explicitly asks to regenerate.",
+    )
+
+
+class PegasusMultiFreeformInput(BaseModel):
+    """Help to ensure the video-text-generation worker provides valid arguments when generating text for several videos."""
+
+    video_ids: List[str] = Field(
+        description="The IDs of the videos to generate text from. If none are given, the clips from the last search are used.",
+    )
+    index_id: str = Field(description="Index ID which contains a collection of videos.")
+    prompt: str = Field(
+        description="Instructions on what text output to generate. Can be anything. " "Always use when additional context is provided.",
+        max_length=300,
+    )
+
+
+async def _generate_text(url: str, payload: Dict, video_id: str, index_id: str, cacheable: bool = False, bypass_cache: bool = False) -> Dict:
+    """Call a Pegasus endpoint for a single video and attach the video's HLS url to the response.
+
+    Args:
+        cacheable (bool, optional): Whether the output is deterministic enough to be served from `pegasus_cache`. Defaults to False.
+        bypass_cache (bool, optional): Skip the cache lookup and regenerate. The fresh output still replaces the cached one.
+            Defaults to False.
+
+    Raises:
+        ValueError: If the endpoint returns a non-200 status code.
+    """
+    # The HLS url expires so it is never part of the cached output.
+    request_key = json.dumps({"url": url, **payload}, sort_keys=True)
+    cached_response = pegasus_cache.get(request_key) if cacheable and not bypass_cache else None
+
+    if cached_response is not None:
+        video_metadata = await get_video_metadata(video_id=video_id, index_id=index_id, max_age=HLS_URL_TTL)
+        response = json.loads(cached_response)
+    else:
+        video_metadata, response = await asyncio.gather(
+            get_video_metadata(video_id=video_id, index_id=index_id, max_age=HLS_URL_TTL),
+            text_generation_flight.do(request_key, lambda: _post_text_generation(url, payload)),
+        )
+        # The response may be shared with coalesced callers, so copy it before adding to it.
+        response = dict(response)
+        if cacheable:
+            pegasus_cache.set(request_key, json.dumps(response))
+
+    response["video_url"] = video_metadata["hls"]["video_url"]
+    return response
+
+
+async def _post_text_generation(url: str, payload: Dict) -> Dict:
+    response = await tl_client.post(url, json=payload)
+
+    if response.status_code != 200:
+        raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
+
+    return response.json()
+
+
+async def _generate_gist(video_id: str, index_id: str, endpoint_options: List[GistEndpointsEnum], bypass_cache: bool = False) -> Dict:
+    payload = {"video_id": video_id, "types": sorted(endpoint_options)}
+    return await _generate_text(GIST_URL, payload, video_id, index_id, cacheable=True, bypass_cache=bypass_cache)
+
+
+async def _generate_summary(
+    video_id: str, index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None, bypass_cache: bool = False
+) -> Dict:
+    payload = {
+        "video_id": video_id,
+        "type": endpoint_option,
+    }
+    if prompt is not None:
+        payload["prompt"] = prompt
+
+    return await _generate_text(SUMMARIZE_URL, payload, video_id, index_id, cacheable=True, bypass_cache=bypass_cache)
+
+
+async def _generate_freeform(video_id: str, index_id: str, prompt: str) -> Dict:
+    payload = {
+        "video_id": video_id,
+        "prompt": prompt,
+    }
+    return await _generate_text(GENERATE_URL, payload, video_id, index_id)
+
+
+async def _generate_for_videos(video_ids: List[str], generate: Callable[[str], Awaitable[Dict]]) -> Dict[str, Dict]:
+    """Run `generate` for every video with bounded concurrency.
+
+    Returns:
+        Dict[str, Dict]: A result per Video ID. Failures are reported per video instead of failing the whole batch.
+    """
+    semaphore = asyncio.Semaphore(TEXT_GENERATION_CONCURRENCY)
+
+    async def generate_for_video(video_id: str) -> Dict:
+        async with semaphore:
+            try:
+                return {"success": True, "result": await generate(video_id)}
+            except Exception as error:
+                print(f"[ERROR] Text generation failed for Video ID {video_id}: {str(error)}")
+                return {"success": False, "error": str(error)}
+
+    video_ids = list(dict.fromkeys(video_ids))
+    results = await asyncio.gather(*[generate_for_video(video_id) for video_id in video_ids])
+    return dict(zip(video_ids, results))
+
+
 @tool("gist-text-generation", args_schema=PegasusGistInput)
-async def gist_text_generation(video_id: str, index_id: str, endpoint_options: List[GistEndpointsEnum]) -> Dict:
+async def gist_text_generation(video_id: str, index_id: str, endpoint_options: List[GistEndpointsEnum], bypass_cache: bool = False) -> Dict:
     """Generate `gist` output for a single video. This can include any combination of: topics, hashtags, and a title"""
     try:
-        headers = {"accept": "application/json", "x-api-key": os.environ["TWELVE_LABS_API_KEY"], "Content-Type": "application/json"}
-        payload = {"video_id": video_id, "types": endpoint_options}
-
-        video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-        response = requests.post(GIST_URL, json=payload, headers=headers)
-        response = response.json()
-        response["video_url"] = video_metadata.json()["hls"]["video_url"]
+        response = await _generate_gist(video_id, index_id, endpoint_options, bypass_cache)
         return json.dumps(response)
 
     except Exception as error:
-        jockey_error = JockeyError.create(
-            node=NodeType.WORKER,
-            error_type=ErrorType.TEXT_GENERATION,
-            function_name=WorkerFunction.GIST_TEXT_GENERATION,
-            details=f"Error: {str(error)}",
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.GIST_TEXT_GENERATION
         )
         raise jockey_error
 
 
 @tool("summarize-text-generation", args_schema=PegasusSummarizeInput)
-async def summarize_text_generation(video_id: str, index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None) -> Dict:
+async def summarize_text_generation(
+    video_id: str, index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None, bypass_cache: bool = False
+) -> Dict:
     """Generate `summary` `highlight` or `chapter` for a single video. This can include any combination of: topics, hashtags, and a title"""
     try:
-        headers = {"accept": "application/json", "x-api-key": os.environ["TWELVE_LABS_API_KEY"], "Content-Type": "application/json"}
-        payload = {
-            "video_id": video_id,
-            "type": endpoint_option,
-        }
-        if prompt is not None:
-            payload["prompt"] = prompt
-
-        video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-        response = requests.post(SUMMARIZE_URL, json=payload, headers=headers)
-        response = response.json()
-        response["video_url"] = video_metadata.json()["hls"]["video_url"]
+        response = await _generate_summary(video_id, index_id, endpoint_option, prompt, bypass_cache)
         return json.dumps(response)
 
     except Exception as error:
-        jockey_error = JockeyError.create(
-            node=NodeType.WORKER,
-            error_type=ErrorType.TEXT_GENERATION,
-            function_name=WorkerFunction.SUMMARIZE_TEXT_GENERATION,
-            details=f"Error: {str(error)}",
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.SUMMARIZE_TEXT_GENERATION
         )
         raise jockey_error
 
@@ -121,31 +248,72 @@ async def freeform_text_generation(video_id: str, index_id: str, prompt: str) ->
     """Generate any type of text output for a single video.
     Useful for answering specific questions, understanding fine grained details, and anything else that doesn't fall neatly into the other tools."""
     try:
-        headers = {"accept": "application/json", "x-api-key": os.environ["TWELVE_LABS_API_KEY"], "Content-Type": "application/json"}
-        payload = {
-            "video_id": video_id,
-            "prompt": prompt,
-        }
-
-        video_metadata = get_video_metadata(video_id=video_id, index_id=index_id)
-        response = requests.post(GENERATE_URL, json=payload, headers=headers)
-        response = response.json()
-        response["video_url"] = video_metadata.json()["hls"]["video_url"]
+        response = await _generate_freeform(video_id, index_id, prompt)
         return json.dumps(response)
 
     except Exception as error:
-        jockey_error = JockeyError.create(
-            node=NodeType.WORKER,
-            error_type=ErrorType.TEXT_GENERATION,
-            function_name=WorkerFunction.FREEFORM_TEXT_GENERATION,
-            details=f"Error: {str(error)}",
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.FREEFORM_TEXT_GENERATION
+        )
+        raise jockey_error
+
+
+@tool("multi-gist-text-generation", args_schema=PegasusMultiGistInput)
+async def multi_gist_text_generation(
+    video_ids: List[str], index_id: str, endpoint_options: List[GistEndpointsEnum], bypass_cache: bool = False
+) -> Dict:
+    """Generate `gist` output for several videos at once. Returns a result per Video ID."""
+    try:
+        results = await _generate_for_videos(video_ids, lambda video_id: _generate_gist(video_id, index_id, endpoint_options, bypass_cache))
+        return json.dumps(results)
+
+    except Exception as error:
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.MULTI_VIDEO_TEXT_GENERATION
+        )
+        raise jockey_error
+
+
+@tool("multi-summarize-text-generation", args_schema=PegasusMultiSummarizeInput)
+async def multi_summarize_text_generation(
+    video_ids: List[str], index_id: str, endpoint_option: SummarizeEndpointEnum, prompt: Union[str, None] = None, bypass_cache: bool = False
+) -> Dict:
+    """Generate `summary` `highlight` or `chapter` for several videos at once. Returns a result per Video ID."""
+    try:
+        results = await _generate_for_videos(video_ids, lambda video_id: _generate_summary(video_id, index_id, endpoint_option, prompt, bypass_cache))
+        return json.dumps(results)
+
+    except Exception as error:
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.MULTI_VIDEO_TEXT_GENERATION
+        )
+        raise jockey_error
+
+
+@tool("multi-freeform-text-generation", args_schema=PegasusMultiFreeformInput)
+async def multi_freeform_text_generation(video_ids: List[str], index_id: str, prompt: str) -> Dict:
+    """Generate any type of text output for several videos at once, using the same prompt for each. Returns a result per Video ID."""
+    try:
+        results = await _generate_for_videos(video_ids, lambda video_id: _generate_freeform(video_id, index_id, prompt))
+        return json.dumps(results)
+
+    except Exception as error:
+        jockey_error = JockeyError.from_exception(
+            error, node=NodeType.WORKER, error_type=ErrorType.TEXT_GENERATION, function_name=WorkerFunction.MULTI_VIDEO_TEXT_GENERATION
         )
         raise jockey_error
 
 
 # Construct a valid worker for a Jockey instance.
 video_text_generation_worker_config = {
-    "tools": [gist_text_generation, summarize_text_generation, freeform_text_generation],
+    "tools": [
+        gist_text_generation,
+        summarize_text_generation,
+        freeform_text_generation,
+        multi_gist_text_generation,
+        multi_summarize_text_generation,
+        multi_freeform_text_generation,
+    ],
     "worker_prompt_file_path": DEFAULT_VIDEO_TEXT_GENERATION_FILE_PATH,
     "worker_name": "video-text-generation",
 }
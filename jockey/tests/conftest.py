@@ -0,0 +1,29 @@
+import pytest
+from unittest.mock import MagicMock
+
+
+@pytest.fixture
+def make_response():
+    """Build a mocked Twelve Labs API response."""
+
+    def make(status_code, json_data=None, text=""):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = json_data
+        response.text = text
+        return response
+
+    return make
+
+
+@pytest.fixture
+def make_video_metadata():
+    """Build the metadata the Twelve Labs API returns for an indexed video."""
+
+    def make(video_id):
+        return {
+            "hls": {"video_url": f"https://mock.hls/{video_id}.m3u8", "thumbnail_urls": [f"https://mock.hls/{video_id}.jpg"]},
+            "metadata": {"filename": f"{video_id}.mp4"},
+        }
+
+    return make
@@ -0,0 +1,45 @@
+import pytest
+import httpx
+
+# testing benchmarks/runner.py
+from jockey import circuit_breaker, hls, rate_limit, tl_client
+from jockey.benchmarks import runner
+from jockey.benchmarks.runner import run_scenario, summarize
+from jockey.clip_cache import ClipCache
+from jockey.render_cache import RenderCache
+from jockey.stand_in import create_app
+
+
+@pytest.fixture
+def stand_in(monkeypatch, tmp_path):
+    """route TwelveLabs requests to the stand-in server"""
+    monkeypatch.setattr(runner, "clip_cache", ClipCache(index_path=str(tmp_path / "clips.sqlite3"), max_bytes=1024))
+    monkeypatch.setattr(runner, "render_cache", RenderCache(index_path=str(tmp_path / "renders.sqlite3"), max_bytes=1024))
+    monkeypatch.setattr(hls, "segment_cache", hls.SegmentCache(directory=str(tmp_path / "segments"), max_bytes=1024))
+    monkeypatch.setenv("TWELVE_LABS_API_KEY", "mock-api-key")
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    monkeypatch.setattr(rate_limit, "_rate_limiters", {})
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_run_scenario_times_each_node(stand_in):
+    results = await run_scenario("search", repeats=2, llm_latency=0.0, token_delay=0.0)
+
+    assert len(results["runs"]) == 2
+    turn = results["runs"][0][0]
+    assert "error" not in turn
+    assert set(turn["nodes"]) == {"supervisor", "planner", "worker", "reflect"}
+    assert 0 < turn["time_to_first_token"] <= turn["total"]
+
+    summary = results["summary"][0]
+    assert summary["errors"] == 0
+    assert summary["nodes"]["worker"]["p50"] > 0
+    await stand_in.aclose()
+
+
+def test_summarize():
+    assert summarize([]) is None
+    assert summarize([3.0, 1.0, 2.0]) == {"mean": 2.0, "p50": 2.0, "p95": 3.0, "min": 1.0, "max": 3.0}
@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import patch
+
+# testing cache.py
+from jockey.cache import TTLCache, DiskCache
+
+
+@pytest.fixture
+def mock_clock():
+    with patch("jockey.cache.time.monotonic") as mock:
+        mock.return_value = 1000.0
+        yield mock
+
+
+def test_ttl_cache_hit_and_miss_counters(mock_clock):
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_ttl_cache_expires_entries(mock_clock):
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    mock_clock.return_value += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    # max_age lets a caller demand a younger entry than the TTL allows
+    assert cache.get("a", max_age=5) is None
+
+    mock_clock.return_value += 60
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_evicts_least_recently_used(mock_clock):
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_invalidate_where(mock_clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set(("index1", "video1"), 1)
+    cache.set(("index1", "video2"), 2)
+    cache.set(("index2", "video1"), 3)
+
+    assert cache.invalidate_where(lambda key: key[0] == "index1") == 2
+    assert len(cache) == 1
+
+
+def test_disk_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "test.sqlite3")
+    DiskCache(path=path, max_bytes=1024).set("a", "value")
+
+    cache = DiskCache(path=path, max_bytes=1024)
+    assert cache.get("a") == "value"
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 1, "bytes": 5, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_disk_cache_evicts_least_recently_accessed(tmp_path):
+    cache = DiskCache(path=str(tmp_path / "test.sqlite3"), max_bytes=10)
+
+    with patch("jockey.cache.time.time") as mock_time:
+        mock_time.return_value = 1.0
+        cache.set("a", "aaaa")
+        mock_time.return_value = 2.0
+        cache.set("b", "bbbb")
+        mock_time.return_value = 3.0
+        cache.get("a")
+        mock_time.return_value = 4.0
+        cache.set("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.evictions == 1
@@ -0,0 +1,104 @@
+import pytest
+import httpx
+
+# testing circuit_breaker.py
+from jockey import circuit_breaker, rate_limit, tl_client
+from jockey.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from jockey.stirrups.errors import ErrorType, JockeyError, NodeType, WorkerFunction
+
+
+@pytest.fixture
+def mock_environment(monkeypatch):
+    """setup mock environment variables for testing"""
+    monkeypatch.setenv("TWELVE_LABS_API_KEY", "mock-api-key")
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    monkeypatch.setattr(rate_limit, "_rate_limiters", {})
+    monkeypatch.setattr(tl_client, "TL_MAX_RETRIES", 0)
+
+
+def test_circuit_opens_once_failure_rate_is_crossed():
+    breaker = CircuitBreaker("search", failure_rate=0.5, min_requests=4, recovery_timeout=30)
+
+    for failed in [False, True, False]:
+        breaker.allow()
+        breaker.record_failure() if failed else breaker.record_success()
+    assert breaker.state == CLOSED
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_closes_or_reopens_circuit():
+    breaker = CircuitBreaker("generate", failure_rate=0.5, min_requests=1, recovery_timeout=0, half_open_requests=1)
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    # the first request after the cool-down is a probe and only one probe is allowed at a time
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_guard_only_counts_matching_errors():
+    breaker = CircuitBreaker("llm:planner", failure_rate=0.5, min_requests=1)
+
+    with pytest.raises(ValueError):
+        with breaker.guard(is_failure=lambda error: isinstance(error, ConnectionError)):
+            raise ValueError("bad request")
+    assert breaker.state == CLOSED
+
+    with pytest.raises(ConnectionError):
+        with breaker.guard(is_failure=lambda error: isinstance(error, ConnectionError)):
+            raise ConnectionError("endpoint down")
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_request_fails_fast_once_backend_circuit_is_open(mock_environment, monkeypatch):
+    seen_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_requests.append(request)
+        return httpx.Response(503, json={"message": "Service unavailable"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+
+    for _ in range(circuit_breaker.CIRCUIT_BREAKER_MIN_REQUESTS):
+        response = await tl_client.post(tl_client.SEARCH_URL, json={"query": "dunks"})
+        assert response.status_code == 503
+
+    with pytest.raises(CircuitOpenError):
+        await tl_client.post(tl_client.SEARCH_URL, json={"query": "dunks"})
+    assert len(seen_requests) == circuit_breaker.CIRCUIT_BREAKER_MIN_REQUESTS
+
+    # other backends keep their own circuit
+    assert (await tl_client.get(tl_client.INDEX_URL)).status_code == 503
+    await client.aclose()
+
+
+def test_open_circuit_is_reported_as_retryable_jockey_error():
+    error = JockeyError.from_exception(
+        CircuitOpenError("search", 10), node=NodeType.WORKER, error_type=ErrorType.SEARCH, function_name=WorkerFunction.VIDEO_SEARCH
+    )
+    assert error.error_data.error_type == ErrorType.CIRCUIT_OPEN
+    assert error.error_data.retryable is True
+
+    error = JockeyError.from_exception(ValueError("bad input"), node=NodeType.WORKER, error_type=ErrorType.SEARCH)
+    assert error.error_data.error_type == ErrorType.SEARCH
+    assert error.error_data.retryable is False
@@ -0,0 +1,63 @@
+import os
+import pytest
+from unittest.mock import patch
+
+# testing clip_cache.py
+from jockey.clip_cache import ClipCache, get_clip_key
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOST_PUBLIC_DIR", str(tmp_path / "public"))
+    return ClipCache(index_path=str(tmp_path / "clips.sqlite3"), max_bytes=10, grace_period=0)
+
+
+def write_clip(cache, video_id, start, end, size):
+    path = cache.get_path("index1", video_id, start, end)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as clip:
+        clip.write(b"x" * size)
+    cache.add("index1", video_id, start, end)
+    return path
+
+
+def test_clip_key_is_canonical():
+    assert get_clip_key("index1", "video1", 10, 20) == get_clip_key("index1", "video1", 10.0, 20.0001)
+    assert get_clip_key("index1", "video1", 10, 20) != get_clip_key("index1", "video1", 10, 20.5)
+
+
+def test_clip_cache_hit_and_miss(cache):
+    assert cache.get("index1", "video1", 0, 5) is None
+
+    path = write_clip(cache, "video1", 0, 5, size=4)
+
+    assert cache.get("index1", "video1", 0.0, 5.0) == path
+    assert cache.stats() == {"size": 1, "bytes": 4, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_clip_cache_evicts_least_recently_accessed(cache):
+    with patch("jockey.clip_cache.time.time") as mock_time:
+        mock_time.return_value = 1.0
+        first = write_clip(cache, "video1", 0, 5, size=4)
+        mock_time.return_value = 2.0
+        second = write_clip(cache, "video2", 0, 5, size=4)
+        mock_time.return_value = 3.0
+        cache.get("index1", "video1", 0, 5)
+        mock_time.return_value = 4.0
+        write_clip(cache, "video3", 0, 5, size=4)
+
+    assert os.path.isfile(first)
+    assert not os.path.isfile(second)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_clip_cache_removes_leftovers_on_first_use(monkeypatch, tmp_path):
+    index_dir = tmp_path / "public" / "index1"
+    (index_dir / ".cut_abc").mkdir(parents=True)
+    (index_dir / "video1_0_5_trimmed.mp4").write_bytes(b"x")
+    (index_dir / "combined.mp4").write_bytes(b"x")
+    monkeypatch.setenv("HOST_PUBLIC_DIR", str(tmp_path / "public"))
+
+    ClipCache(index_path=str(tmp_path / "clips.sqlite3"), max_bytes=10, grace_period=0).stats()
+
+    assert sorted(os.listdir(index_dir)) == ["combined.mp4"]
@@ -0,0 +1,91 @@
+import asyncio
+import contextlib
+import pytest
+from unittest.mock import patch
+from langchain_core.runnables import RunnableLambda
+
+# testing deliver_full_render in stirrups/video_editing.py
+from jockey.stirrups.video_editing import (
+    FULL_RENDER_EVENT,
+    deliver_full_render,
+    finish_turn,
+    finished_renders,
+    pop_finished_renders,
+    start_turn,
+    streaming_turns,
+)
+
+RENDER = {"preview_path": "/public/index1/reel_preview.mp4", "output_path": "/public/index1/reel.mp4"}
+
+
+@pytest.fixture(autouse=True)
+def clear_finished_renders():
+    finished_renders.clear()
+    streaming_turns.clear()
+    yield
+    finished_renders.clear()
+    streaming_turns.clear()
+
+
+@pytest.fixture
+def render_done():
+    """The full render finishes once this is set."""
+    render_done = asyncio.Event()
+
+    async def get_combined_output(*args):
+        await render_done.wait()
+        return RENDER["output_path"]
+
+    with patch("jockey.stirrups.video_editing.get_combined_output", side_effect=get_combined_output):
+        yield render_done
+
+
+async def stream_turn(render_done: asyncio.Event, wait_for_render: bool, fail: bool = False):
+    """Stream a turn that returns a preview and starts its full render, like the graph does, and collect its custom events."""
+    renders = []
+
+    async def turn(_, config):
+        start_turn("thread1")
+        full_render = deliver_full_render("index1", "reel.mp4", [("video1", 0, 5)], "balanced", "thread1", RENDER["preview_path"], config)
+        renders.append(asyncio.ensure_future(full_render))
+        if wait_for_render:
+            render_done.set()
+            await renders[0]
+        if fail:
+            raise RuntimeError("reflect failed")
+        finish_turn("thread1")
+        return RENDER["preview_path"]
+
+    events = []
+    with pytest.raises(RuntimeError) if fail else contextlib.nullcontext():
+        async for event in RunnableLambda(turn).astream_events("combine the clips", version="v2"):
+            if event["event"] == "on_custom_event":
+                events.append(event)
+    return events, renders[0]
+
+
+@pytest.mark.asyncio
+async def test_full_render_finishing_during_the_turn_is_streamed_once(render_done):
+    events, _ = await stream_turn(render_done, wait_for_render=True)
+
+    assert [(event["name"], event["data"]) for event in events] == [(FULL_RENDER_EVENT, RENDER)]
+    # a render delivered as an event isn't announced again on the next turn
+    assert pop_finished_renders("thread1") == []
+
+
+@pytest.mark.asyncio
+async def test_full_render_finishing_after_the_turn_waits_for_next_turn(render_done):
+    events, render = await stream_turn(render_done, wait_for_render=False)
+    render_done.set()
+    await render
+
+    assert events == []
+    assert pop_finished_renders("thread1") == [RENDER]
+    assert pop_finished_renders("thread1") == []
+
+
+@pytest.mark.asyncio
+async def test_full_render_sent_during_a_failed_turn_is_announced_again(render_done):
+    await stream_turn(render_done, wait_for_render=True, fail=True)
+
+    assert pop_finished_renders("thread1") == [RENDER]
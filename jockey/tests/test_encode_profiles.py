@@ -0,0 +1,33 @@
+import ffmpeg
+import pytest
+
+# testing encode_profiles.py
+from jockey import encode_profiles
+from jockey.encode_profiles import audio_encode_kwargs, get_encode_profile, scale_video, video_encode_kwargs
+
+
+def test_get_encode_profile_defaults_to_configured_profile(monkeypatch):
+    monkeypatch.setattr(encode_profiles, "DEFAULT_ENCODE_PROFILE", "archival")
+    assert get_encode_profile()["name"] == "archival"
+    assert get_encode_profile("DRAFT")["name"] == "draft"
+
+    with pytest.raises(ValueError, match="Unknown encode profile"):
+        get_encode_profile("lossless")
+
+
+def test_encode_kwargs(monkeypatch):
+    assert video_encode_kwargs("balanced") == {"vcodec": "libx264", "preset": "medium", "video_bitrate": "1M"}
+    assert video_encode_kwargs("archival") == {"vcodec": "libx264", "preset": "slow", "crf": 18}
+    assert video_encode_kwargs(encode_profiles.CLIP_ENCODE_PROFILE) == {"vcodec": "libx264", "preset": "veryfast", "crf": 16}
+    assert audio_encode_kwargs("draft") == {"acodec": "aac", "audio_bitrate": "96k"}
+
+    monkeypatch.setattr(encode_profiles, "ENCODE_THREADS", 2)
+    assert video_encode_kwargs("draft")["threads"] == 2
+
+
+def test_scale_video_only_scales_profiles_with_max_height():
+    video = ffmpeg.input("clip.mp4").video
+    assert scale_video(video, "balanced") is video
+
+    args = ffmpeg.output(scale_video(video, "draft"), "out.mp4").get_args()
+    assert "scale=-2:min(ih\\,480)" in args[args.index("-filter_complex") + 1]
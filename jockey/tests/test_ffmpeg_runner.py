@@ -0,0 +1,78 @@
+import os
+import sys
+import asyncio
+import pytest
+from unittest.mock import patch
+
+# testing ffmpeg_runner.py
+from jockey.ffmpeg_runner import parse_progress_block, probe, run_ffmpeg
+from jockey.video_utils import _run_command
+
+
+def test_parse_progress_block():
+    block = ["frame=120", "fps=59.94", "out_time_us=2500000", "out_time_ms=2500000", "speed=2.5x", "progress=continue"]
+
+    assert parse_progress_block(block, duration=10) == {"percent": 25.0, "out_time": 2.5, "fps": 59.94, "speed": 2.5}
+    assert parse_progress_block(["out_time_us=N/A", "speed=N/A", "progress=continue"], duration=10) == {
+        "percent": None,
+        "out_time": None,
+        "fps": None,
+        "speed": None,
+    }
+    assert parse_progress_block(["progress=end"])["percent"] == 100.0
+
+
+def write_sleeper(tmp_path):
+    """Stands in for a long running command: ignores its arguments, records its pid and sleeps."""
+    pid_file = tmp_path / "pid"
+    sleeper = tmp_path / "sleeper"
+    sleeper.write_text(f"#!{sys.executable}\nimport os, time\nopen({str(pid_file)!r}, 'w').write(str(os.getpid()))\ntime.sleep(60)\n")
+    sleeper.chmod(0o755)
+    return sleeper, pid_file
+
+
+async def cancel_once_started(task, pid_file):
+    for _ in range(100):
+        if pid_file.exists() and pid_file.read_text():
+            break
+        await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_kills_the_process_when_cancelled(tmp_path):
+    fake_ffmpeg, pid_file = write_sleeper(tmp_path)
+
+    with patch("jockey.ffmpeg_runner.ffmpeg.compile", return_value=[str(fake_ffmpeg), "-i", "input.mp4", "output.mp4"]):
+        await cancel_once_started(asyncio.ensure_future(run_ffmpeg(stream_spec=None, task="test")), pid_file)
+
+
+@pytest.mark.asyncio
+async def test_probe_passes_options_before_the_input(tmp_path):
+    # Prints its arguments as the probe result.
+    fake_ffprobe = tmp_path / "ffprobe"
+    fake_ffprobe.write_text(f"#!{sys.executable}\nimport json, sys\nprint(json.dumps(sys.argv[1:]))\n")
+    fake_ffprobe.chmod(0o755)
+
+    args = await probe("clip.mp4", cmd=str(fake_ffprobe), select_streams="v:0", show_entries="frame=pts_time")
+
+    assert args == ["-show_format", "-show_streams", "-of", "json", "-select_streams", "v:0", "-show_entries", "frame=pts_time", "clip.mp4"]
+
+
+@pytest.mark.asyncio
+async def test_probe_kills_ffprobe_when_cancelled(tmp_path):
+    fake_ffprobe, pid_file = write_sleeper(tmp_path)
+
+    await cancel_once_started(asyncio.ensure_future(probe("https://mock.hls/video1.m3u8", cmd=str(fake_ffprobe))), pid_file)
+
+
+@pytest.mark.asyncio
+async def test_run_command_kills_the_process_when_cancelled(tmp_path):
+    fake_yt_dlp, pid_file = write_sleeper(tmp_path)
+
+    await cancel_once_started(asyncio.ensure_future(_run_command(str(fake_yt_dlp), "https://mock.video/video1", "-o", "source.mp4")), pid_file)
@@ -0,0 +1,119 @@
+import os
+import httpx
+import pytest
+
+# testing hls.py
+from jockey import hls, tl_client
+from jockey.hls import (
+    PlaylistWriter,
+    Rendition,
+    Segment,
+    SegmentCache,
+    UnsupportedPlaylistError,
+    fetch_range,
+    parse_master_playlist,
+    parse_media_playlist,
+    segments_for_range,
+    select_rendition,
+)
+
+MASTER_PLAYLIST = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360
+360p/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2800000,RESOLUTION=1280x720
+720p/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080
+1080p/index.m3u8
+"""
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:4
+#EXT-X-PLAYLIST-TYPE:VOD
+#EXTINF:4.000,
+segment_000.ts?token=abc
+#EXTINF:4.000,
+segment_001.ts?token=abc
+#EXTINF:4.000,
+segment_002.ts?token=abc
+#EXTINF:2.500,
+segment_003.ts?token=abc
+#EXT-X-ENDLIST
+"""
+
+
+@pytest.fixture
+def cdn(monkeypatch, tmp_path):
+    """serve a master playlist with three renditions and record every request"""
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path == "/video/index.m3u8":
+            return httpx.Response(200, text=MASTER_PLAYLIST)
+        if request.url.path.endswith("/index.m3u8"):
+            return httpx.Response(200, text=MEDIA_PLAYLIST)
+        return httpx.Response(200, content=request.url.path.encode("utf-8"))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+    monkeypatch.setattr(hls, "segment_cache", SegmentCache(directory=str(tmp_path / "segments"), max_bytes=1024 * 1024))
+    hls.playlist_cache.clear()
+    yield requests
+    hls.playlist_cache.clear()
+
+
+def test_parse_master_playlist_and_select_rendition():
+    renditions = parse_master_playlist(MASTER_PLAYLIST, "https://cdn.test/video/index.m3u8")
+
+    assert [rendition.height for rendition in renditions] == [360, 720, 1080]
+    assert renditions[0].uri == "https://cdn.test/video/360p/index.m3u8"
+    assert select_rendition(renditions, max_height=0).height == 1080
+    assert select_rendition(renditions, max_height=720).height == 720
+    assert select_rendition(renditions, max_height=240).height == 360
+    assert select_rendition([Rendition(uri="a", bandwidth=1), Rendition(uri="b", bandwidth=2)], max_height=720).uri == "b"
+
+
+def test_segments_for_range_picks_covering_segments():
+    playlist = parse_media_playlist(MEDIA_PLAYLIST, "https://cdn.test/video/720p/index.m3u8")
+
+    assert [segment.start for segment in playlist.segments] == [0.0, 4.0, 8.0, 12.0]
+    assert [segment.start for segment in segments_for_range(playlist, 5, 9)] == [4.0, 8.0]
+    assert [segment.start for segment in segments_for_range(playlist, 4, 8)] == [4.0]
+
+
+def test_parse_media_playlist_rejects_encryption():
+    with pytest.raises(UnsupportedPlaylistError):
+        parse_media_playlist('#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="key"\n#EXTINF:4,\na.ts\n', "https://cdn.test/index.m3u8")
+
+
+@pytest.mark.asyncio
+async def test_fetch_range_downloads_only_needed_segments_once(cdn):
+    playlist_path, playlist_start = await fetch_range("https://cdn.test/video/index.m3u8", 5, 9, max_height=720)
+    await fetch_range("https://cdn.test/video/index.m3u8?token=new", 6, 7, max_height=720)
+
+    assert playlist_start == 4.0
+    assert cdn == ["/video/index.m3u8", "/video/720p/index.m3u8", "/video/720p/segment_001.ts", "/video/720p/segment_002.ts"]
+
+    with open(playlist_path) as playlist:
+        segment_paths = [line.strip() for line in playlist if line.strip() and not line.startswith("#")]
+    assert len(segment_paths) == 2
+    assert all(os.path.isfile(path) for path in segment_paths)
+
+
+def test_playlist_writer_grows_until_ended(tmp_path):
+    path = str(tmp_path / "index.m3u8")
+    playlist = PlaylistWriter(path, target_duration=4)
+
+    playlist.append([Segment(uri="clip_000_000.ts", start=0, duration=4), Segment(uri="clip_000_001.ts", start=4, duration=1.5)])
+    partial = parse_media_playlist(open(path).read(), "")
+    assert [segment.uri for segment in partial.segments] == ["clip_000_000.ts", "clip_000_001.ts"]
+    assert "#EXT-X-ENDLIST" not in open(path).read()
+
+    playlist.append([Segment(uri="clip_001_000.ts", start=0, duration=6)], discontinuity=True)
+    playlist.end()
+
+    complete = parse_media_playlist(open(path).read(), "")
+    assert [segment.discontinuity for segment in complete.segments] == [False, False, True]
+    assert complete.target_duration == 6
+    assert open(path).read().rstrip().endswith("#EXT-X-ENDLIST")
@@ -112,3 +112,47 @@
 # #     assert result["chat_history"].name == "unexpected_worker_error"
 # #     assert "An unexpected error occurred" in result["chat_history"].content
 # #     assert "The task may need to be reformulated" in result["chat_history"].content
+
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage
+from jockey.jockey_graph import Jockey
+from jockey.stirrups.video_search import MarengoSearchInput
+
+
+@pytest.mark.asyncio
+async def test_worker_node_falls_back_to_default_tool_when_planner_picks_none():
+    # Arrange
+    state = {
+        "next_worker": "video-search",
+        "tool_call": None,
+        "active_plan": "Search for a man walking a dog",
+        "chat_history": [AIMessage(content="Search for a man walking a dog", name="planner", id="call_1")],
+        "clips_from_search": {},
+        "relevant_clip_keys": [],
+        "index_id": "index1",
+    }
+    worker_inputs = MarengoSearchInput(
+        query="A man walking a dog", index_id="index1", top_n=3, group_by="clip", search_options=["visual"], video_filter=None
+    )
+    mock_jockey = MagicMock(spec=Jockey)
+    mock_jockey.instructor_prompt = "Create the tool inputs"
+    mock_jockey.openai_client = MagicMock()
+    mock_jockey.openai_client.beta.chat.completions.parse.return_value.choices = [MagicMock(message=MagicMock(parsed=worker_inputs))]
+    mock_search_worker = MagicMock()
+    mock_search_worker._call_tools = AsyncMock(return_value=[{"output": json.dumps([])}])
+
+    # Act
+    with patch("jockey.jockey_graph.VideoSearchWorker", mock_search_worker):
+        result = await Jockey._worker_node(mock_jockey, state, MagicMock())
+
+    # Assert
+    parse_kwargs = mock_jockey.openai_client.beta.chat.completions.parse.call_args.kwargs
+    assert parse_kwargs["response_format"] is MarengoSearchInput
+    ai_message = mock_search_worker._call_tools.await_args.args[0]
+    assert ai_message.tool_calls[0]["name"] == "simple-video-search"
+    assert ai_message.tool_calls[0]["args"]["query"] == "A man walking a dog"
+    assert result["clips_from_search"] == {"call_1": []}
+    assert result["next_worker"] == "reflect"
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+import httpx
+
+# testing rate_limit.py
+from jockey import circuit_breaker, rate_limit, tl_client
+from jockey.rate_limit import AdaptiveConcurrencyLimiter, TokenBucket, parse_retry_after
+
+
+@pytest.fixture
+def mock_environment(monkeypatch):
+    """setup mock environment variables for testing"""
+    monkeypatch.setenv("TWELVE_LABS_API_KEY", "mock-api-key")
+    monkeypatch.setattr(rate_limit, "_rate_limiters", {})
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    monkeypatch.setattr(rate_limit, "TL_RETRY_BASE_DELAY", 0)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_adaptive_concurrency_limiter_aimd():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=8)
+
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    limiter.on_success()
+    assert 4 < limiter.limit < 5
+
+    for _ in range(10):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_limiter_caps_in_flight_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=2)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    await asyncio.gather(*[work() for _ in range(6)])
+
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_retry_after():
+    bucket = TokenBucket(rate=1000, capacity=1)
+    bucket.block_for(0.05)
+
+    start = asyncio.get_running_loop().time()
+    await bucket.acquire()
+
+    assert asyncio.get_running_loop().time() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_request_retries_throttled_and_server_errors(mock_environment, monkeypatch):
+    statuses = iter([429, 503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(statuses), headers={"Retry-After": "0"}, json={})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+
+    response = await tl_client.get(tl_client.INDEX_URL)
+
+    assert response.status_code == 200
+    assert rate_limit.get_rate_limiter("mock-api-key").concurrency.limit < rate_limit.TL_MAX_CONCURRENCY
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_request_returns_last_response_after_retries(mock_environment, monkeypatch):
+    seen_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_requests.append(request)
+        return httpx.Response(500, json={"message": "Internal error"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+    monkeypatch.setattr(tl_client, "TL_MAX_RETRIES", 2)
+
+    response = await tl_client.get(tl_client.INDEX_URL)
+
+    assert response.status_code == 500
+    assert len(seen_requests) == 3
+    await client.aclose()
@@ -0,0 +1,60 @@
+import os
+import pytest
+from unittest.mock import patch
+
+# testing render_cache.py
+from jockey.render_cache import RenderCache, get_render_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(index_path=str(tmp_path / "renders.sqlite3"), max_bytes=10, grace_period=0, reference_ttl=100)
+
+
+def write_render(cache, tmp_path, name, size):
+    path = str(tmp_path / name)
+    with open(path, "wb") as render:
+        render.write(b"x" * size)
+    cache.add(name, path)
+    return path
+
+
+def test_render_key_depends_on_clip_order_profile_and_source_versions():
+    clips = [("video1", 0, 5), ("video2", 10, 20)]
+    key = get_render_key("index1", clips, "balanced", {"video1": "v1", "video2": "v1"}, "mp4")
+
+    assert key == get_render_key("index1", [("video1", 0.0, 5.0), ("video2", 10, 20.0001)], "balanced", {"video1": "v1", "video2": "v1"}, "mp4")
+    assert key != get_render_key("index1", clips[::-1], "balanced", {"video1": "v1", "video2": "v1"}, "mp4")
+    assert key != get_render_key("index1", clips, "draft", {"video1": "v1", "video2": "v1"}, "mp4")
+    assert key != get_render_key("index1", clips, "balanced", {"video1": "v2", "video2": "v1"}, "mp4")
+    assert key != get_render_key("index1", clips, "balanced", {"video1": "v1", "video2": "v1"}, "hls")
+
+
+def test_render_cache_hit_and_miss(cache, tmp_path):
+    assert cache.get("reel") is None
+
+    path = write_render(cache, tmp_path, "reel", size=4)
+
+    assert cache.get("reel") == path
+    assert cache.stats() == {"size": 1, "bytes": 4, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_render_cache_keeps_referenced_renders(cache, tmp_path):
+    with patch("jockey.render_cache.time.time") as mock_time:
+        mock_time.return_value = 1.0
+        referenced = write_render(cache, tmp_path, "referenced", size=4)
+        cache.reference("referenced", "session1")
+        mock_time.return_value = 2.0
+        unreferenced = write_render(cache, tmp_path, "unreferenced", size=4)
+        mock_time.return_value = 3.0
+        write_render(cache, tmp_path, "new", size=4)
+
+        assert os.path.isfile(referenced)
+        assert not os.path.isfile(unreferenced)
+
+        # Once the reference expires the render can be evicted like any other.
+        mock_time.return_value = 200.0
+        write_render(cache, tmp_path, "newer", size=4)
+
+    assert not os.path.isfile(referenced)
+    assert cache.stats()["evictions"] == 2
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+
+# testing single_flight.py
+from jockey.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return {"video_id": "video1"}
+
+    results = await asyncio.gather(*[flight.do("video1", fetch) for _ in range(5)])
+
+    assert started == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+    # once the call finished, the next one starts fresh
+    await flight.do("video1", fetch)
+    assert started == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exceptions():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("API request failed")
+
+    results = await asyncio.gather(*[flight.do("search", fetch) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("generate", fetch))
+    second = asyncio.ensure_future(flight.do("generate", fetch))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
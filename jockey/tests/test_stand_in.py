@@ -0,0 +1,85 @@
+import shutil
+import pytest
+import httpx
+
+# testing stand_in/server.py
+from jockey import circuit_breaker, rate_limit, tl_client
+from jockey.stand_in import create_app
+from jockey.stirrups.video_search import _base_video_search, search_cache
+from jockey.video_utils import video_metadata_cache
+
+VIDEO_ID = "6753ec5f1e1aa3e42b2a3f10"
+
+
+@pytest.fixture
+def mock_environment(monkeypatch):
+    """setup mock environment variables for testing"""
+    monkeypatch.setenv("TWELVE_LABS_API_KEY", "mock-api-key")
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    monkeypatch.setattr(rate_limit, "_rate_limiters", {})
+    search_cache.clear()
+    video_metadata_cache.clear()
+    yield
+    search_cache.clear()
+    video_metadata_cache.clear()
+
+
+def stand_in_client(**kwargs) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=create_app(**kwargs))
+    return httpx.AsyncClient(transport=transport, base_url="http://stand-in", headers={"x-api-key": "mock-api-key"})
+
+
+@pytest.mark.asyncio
+async def test_search_pages_through_recorded_results():
+    async with stand_in_client() as client:
+        response = await client.post("/v1.2/search", json={"query": "Dunks", "page_limit": 2, "group_by": "clip"})
+        first_page = response.json()
+        response = await client.get(f"/v1.2/search/{first_page['page_info']['next_page_token']}")
+        second_page = response.json()
+
+    assert [clip["score"] for clip in first_page["data"]] == [86.17, 84.52]
+    assert len(second_page["data"]) == 2
+    assert second_page["page_info"]["next_page_token"] is not None
+
+
+@pytest.mark.asyncio
+async def test_video_metadata_points_hls_at_stand_in():
+    async with stand_in_client() as client:
+        video = (await client.get(f"/v1.2/indexes/index1/videos/{VIDEO_ID}")).json()
+        missing = await client.get("/v1.2/indexes/index1/videos/missing")
+
+    assert video["hls"]["video_url"] == f"http://stand-in/hls/{VIDEO_ID}/index.m3u8"
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_and_missing_api_key():
+    async with stand_in_client(error_rate=1.0, error_status=429, seed=0) as client:
+        throttled = await client.post("/v1.2/gist/", json={"video_id": VIDEO_ID, "types": ["title"]})
+        unauthorized = await client.post("/v1.2/gist/", json={"video_id": VIDEO_ID}, headers={"x-api-key": ""})
+
+    assert throttled.status_code == 429
+    assert throttled.headers["Retry-After"] == "1"
+    assert unauthorized.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_base_video_search_against_stand_in(mock_environment, monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+
+    results = await _base_video_search("three pointers", "index1", top_n=2)
+
+    assert '"video_title": "nba_highlights_game_2.mp4"' in results
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is required to generate HLS playlists")
+async def test_hls_playlist_is_generated_from_synthetic_media(tmp_path):
+    async with stand_in_client(hls_dir=str(tmp_path)) as client:
+        playlist = await client.get("/hls/6753ec5f1e1aa3e42b2a3f12/index.m3u8")
+
+    assert playlist.status_code == 200
+    assert "#EXTM3U" in playlist.text
+    assert "segment_000.ts" in playlist.text
@@ -0,0 +1,147 @@
+import copy
+import ffmpeg
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# testing the stream copy fast path in stirrups/video_editing.py
+from jockey.stirrups.video_editing import can_stream_copy, get_stream_layout, render_combined
+
+VIDEO_STREAM = {
+    "codec_type": "video",
+    "codec_name": "h264",
+    "profile": "High",
+    "width": 1280,
+    "height": 720,
+    "pix_fmt": "yuv420p",
+    "time_base": "1/15360",
+    "r_frame_rate": "30/1",
+    "duration": "5.000000",
+}
+AUDIO_STREAM = {
+    "codec_type": "audio",
+    "codec_name": "aac",
+    "sample_rate": "44100",
+    "channels": 2,
+    "channel_layout": "stereo",
+    "time_base": "1/44100",
+    "duration": "5.000000",
+}
+
+
+def make_probe(video_changes=None, audio_changes=None, audio=True):
+    streams = [{**VIDEO_STREAM, **(video_changes or {})}]
+    if audio:
+        streams.append({**AUDIO_STREAM, **(audio_changes or {})})
+    return {"streams": copy.deepcopy(streams), "format": {"duration": "5.000000"}}
+
+
+def patch_probes(probes):
+    return patch("jockey.stirrups.video_editing.ffmpeg_runner.probe", new_callable=AsyncMock, side_effect=lambda path: probes[path])
+
+
+@pytest.mark.asyncio
+async def test_get_stream_layout_ignores_per_file_properties():
+    with patch_probes({"clip1.mp4": make_probe()}):
+        layout = await get_stream_layout("clip1.mp4")
+
+    assert layout["video"]["width"] == 1280
+    assert layout["audio"]["channel_layout"] == "stereo"
+    assert "duration" not in layout["video"]
+
+
+@pytest.mark.asyncio
+async def test_can_stream_copy_matching_layouts():
+    with patch_probes({"clip1.mp4": make_probe(), "clip2.mp4": make_probe()}):
+        assert await can_stream_copy(["clip1.mp4", "clip2.mp4"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "video_changes,audio_changes",
+    [
+        ({"codec_name": "hevc"}, None),
+        ({"width": 1920, "height": 1080}, None),
+        ({"time_base": "1/90000"}, None),
+        (None, {"channels": 1, "channel_layout": "mono"}),
+        (None, {"sample_rate": "48000"}),
+    ],
+)
+async def test_can_stream_copy_mismatched_layouts(video_changes, audio_changes):
+    with patch_probes({"clip1.mp4": make_probe(), "clip2.mp4": make_probe(video_changes, audio_changes)}):
+        assert not await can_stream_copy(["clip1.mp4", "clip2.mp4"])
+
+
+@pytest.mark.asyncio
+async def test_can_stream_copy_respects_max_height():
+    with patch_probes({"clip1.mp4": make_probe(), "clip2.mp4": make_probe()}):
+        assert await can_stream_copy(["clip1.mp4", "clip2.mp4"], max_height=720)
+        assert not await can_stream_copy(["clip1.mp4", "clip2.mp4"], max_height=480)
+
+
+@pytest.mark.asyncio
+async def test_can_stream_copy_needs_audio():
+    with patch_probes({"clip1.mp4": make_probe(audio=False), "clip2.mp4": make_probe(audio=False)}):
+        assert not await can_stream_copy(["clip1.mp4", "clip2.mp4"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream_copyable,copy_fails", [(True, False), (True, True), (False, False)])
+async def test_render_combined_falls_back_to_reencoding(tmp_path, stream_copyable, copy_fails):
+    # Arrange
+    clip_keys = [("video1", 0, 5), ("video1", 10, 15)]
+    downloads = {clip_key: str(tmp_path / f"clip{i}.mp4") for i, clip_key in enumerate(clip_keys)}
+    output_filepath = str(tmp_path / "reel.mp4")
+
+    def write_output(video_filepaths, output, *args):
+        with open(output, "wb") as reel:
+            reel.write(b"reel")
+
+    concat_stream_copy = AsyncMock(side_effect=ffmpeg.Error("ffmpeg", b"", b"non monotonic DTS") if copy_fails else write_output)
+    concat_reencode = AsyncMock(side_effect=write_output)
+    can_stream_copy = AsyncMock(return_value=stream_copyable)
+
+    # Act
+    with patch.multiple(
+        "jockey.stirrups.video_editing",
+        download_clips=AsyncMock(return_value=downloads),
+        can_stream_copy=can_stream_copy,
+        concat_stream_copy=concat_stream_copy,
+        concat_reencode=concat_reencode,
+    ):
+        result = await render_combined("index1", clip_keys, output_filepath, "balanced")
+
+    # Assert
+    assert result == output_filepath
+    assert open(output_filepath, "rb").read() == b"reel"
+    assert can_stream_copy.await_args.args[1] is None
+    assert concat_stream_copy.await_count == int(stream_copyable)
+    assert concat_reencode.await_count == int(not stream_copyable or copy_fails)
+    if concat_reencode.await_count:
+        assert concat_reencode.await_args.args[0] == list(downloads.values())
+
+
+@pytest.mark.asyncio
+async def test_render_combined_scales_down_for_profiles_with_max_height(tmp_path):
+    clip_keys = [("video1", 0, 5), ("video1", 10, 15)]
+    downloads = {clip_key: str(tmp_path / f"clip{i}.mp4") for i, clip_key in enumerate(clip_keys)}
+    output_filepath = str(tmp_path / "reel.mp4")
+
+    def write_output(video_filepaths, output, *args):
+        with open(output, "wb") as reel:
+            reel.write(b"reel")
+
+    concat_stream_copy = AsyncMock(side_effect=write_output)
+    concat_reencode = AsyncMock(side_effect=write_output)
+
+    # the 720p clips share a layout, but are taller than the draft profile allows
+    with patch_probes({path: make_probe() for path in downloads.values()}):
+        with patch.multiple(
+            "jockey.stirrups.video_editing",
+            download_clips=AsyncMock(return_value=downloads),
+            concat_stream_copy=concat_stream_copy,
+            concat_reencode=concat_reencode,
+        ):
+            await render_combined("index1", clip_keys, output_filepath, "draft")
+
+    assert concat_stream_copy.await_count == 0
+    assert concat_reencode.await_args.args[3] == "draft"
@@ -0,0 +1,42 @@
+import pytest
+import httpx
+
+# testing tl_client.py
+from jockey import tl_client
+
+
+@pytest.fixture
+def mock_environment(monkeypatch):
+    """setup mock environment variables for testing"""
+    monkeypatch.setenv("TWELVE_LABS_API_KEY", "mock-api-key")
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_within_event_loop(mock_environment):
+    client = tl_client.get_client()
+
+    assert tl_client.get_client() is client
+    assert not client.is_closed
+
+    await tl_client.aclose()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_request_sends_api_key_through_pooled_client(mock_environment, monkeypatch):
+    seen_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": []})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tl_client, "get_client", lambda: client)
+
+    response = await tl_client.post(tl_client.SEARCH_URL, json={"query": "a man walking a dog"})
+
+    assert response.status_code == 200
+    assert len(seen_requests) == 1
+    assert seen_requests[0].headers["x-api-key"] == "mock-api-key"
+    assert seen_requests[0].url == tl_client.SEARCH_URL
+    await client.aclose()
@@ -0,0 +1,212 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# testing stirrups/video_search.py
+from jockey.stirrups.video_search import _base_video_search, batched_video_search, iter_video_search, search_cache, invalidate_search_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
+
+@pytest.fixture
+def make_search_response(make_response):
+    def make(clips, next_page_token=None):
+        return make_response(200, {"data": clips, "page_info": {"next_page_token": next_page_token}})
+
+    return make
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_base_video_search_enriches_each_video_once(mock_post, mock_get_video_metadata, make_search_response, make_video_metadata):
+    # Arrange
+    clips = [
+        {"video_id": "video1", "score": 90.0, "start": 0, "end": 10},
+        {"video_id": "video2", "score": 80.0, "start": 5, "end": 15},
+        {"video_id": "video1", "score": 70.0, "start": 20, "end": 30},
+    ]
+    mock_post.return_value = make_search_response(clips)
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    # Act
+    results = json.loads(await _base_video_search("dunks", "index1", top_n=3))
+
+    # Assert
+    assert mock_get_video_metadata.await_count == 2
+    assert [result["score"] for result in results] == [90.0, 80.0, 70.0]
+    assert [result["video_title"] for result in results] == ["video1.mp4", "video2.mp4", "video1.mp4"]
+    assert results[2]["video_url"] == "https://mock.hls/video1.m3u8"
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_base_video_search_metadata_error(mock_post, mock_get_video_metadata, make_search_response):
+    # Arrange
+    mock_post.return_value = make_search_response([{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}])
+    mock_get_video_metadata.return_value = {"message": "There was an error", "error": "Not Found"}
+
+    # Act
+    result = await _base_video_search("dunks", "index1", top_n=1)
+
+    # Assert
+    assert result["video_id"] == "video1"
+    assert result["response"] == "Not Found"
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_base_video_search_serves_smaller_top_n_from_cache(mock_post, mock_get_video_metadata, make_search_response, make_video_metadata):
+    # Arrange
+    clips = [{"video_id": f"video{i}", "score": 90.0 - i, "start": 0, "end": 10} for i in range(5)]
+    mock_post.return_value = make_search_response(clips)
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    # Act
+    await _base_video_search("Find  dunks", "index1", top_n=5)
+    results = json.loads(await _base_video_search("find dunks", "index1", top_n=2))
+
+    # Assert
+    assert mock_post.await_count == 1
+    assert [result["video_id"] for result in results] == ["video0", "video1"]
+    # enrichment must not leak into the cached page
+    assert "video_title" not in clips[0]
+
+    # a larger request than what's cached goes back to the API
+    await _base_video_search("find dunks", "index1", top_n=10)
+    assert mock_post.await_count == 2
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_invalidate_search_cache(mock_post, mock_get_video_metadata, make_search_response, make_video_metadata):
+    mock_post.return_value = make_search_response([{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}])
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    await _base_video_search("dunks", "index1", top_n=1)
+    await _base_video_search("dunks", "index2", top_n=1)
+
+    assert invalidate_search_cache("index1") == 1
+    assert len(search_cache) == 1
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search._base_video_search", new_callable=AsyncMock)
+async def test_batched_video_search_dedupes_clips_across_queries(mock_base_video_search):
+    # Arrange
+    clips_by_query = {
+        "dunks": [{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}, {"video_id": "video2", "score": 60.0, "start": 0, "end": 5}],
+        "blocks": [{"video_id": "video2", "score": 80.0, "start": 0, "end": 5}],
+    }
+    mock_base_video_search.side_effect = lambda query, *args: json.dumps(clips_by_query[query])
+
+    # Act
+    result = await batched_video_search.ainvoke({
+        "queries": ["dunks", "blocks", "dunks"],
+        "index_id": "index1",
+        "top_n": 2,
+        "group_by": "clip",
+        "search_options": ["visual"],
+        "video_filter": None,
+    })
+
+    # Assert
+    results = json.loads(result)["results"]
+    assert mock_base_video_search.await_count == 2
+    assert [clip["video_id"] for clip in results["dunks"]] == ["video1"]
+    assert [clip["video_id"] for clip in results["blocks"]] == ["video2"]
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search._base_video_search", new_callable=AsyncMock)
+async def test_batched_video_search_keeps_results_of_other_queries_on_error(mock_base_video_search):
+    # Arrange
+    error_response = {"message": "There was an API error when searching the index.", "response": "Internal Server Error"}
+    search_results = {"dunks": json.dumps([{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}]), "blocks": error_response}
+    mock_base_video_search.side_effect = lambda query, *args: search_results[query]
+
+    # Act
+    result = await batched_video_search.ainvoke({
+        "queries": ["dunks", "blocks"],
+        "index_id": "index1",
+        "top_n": 1,
+        "group_by": "clip",
+        "search_options": ["visual"],
+        "video_filter": None,
+    })
+
+    # Assert
+    result = json.loads(result)
+    assert [clip["video_id"] for clip in result["results"]["dunks"]] == ["video1"]
+    assert "blocks" not in result["results"]
+    assert result["errors"] == {"blocks": error_response}
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.get", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_iter_video_search_follows_page_tokens(mock_post, mock_get, mock_get_video_metadata, make_search_response, make_video_metadata):
+    # Arrange
+    first_page = [{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}, {"video_id": "video2", "score": 85.0, "start": 0, "end": 10}]
+    second_page = [{"video_id": "video3", "score": 80.0, "start": 0, "end": 10}, {"video_id": "video4", "score": 40.0, "start": 0, "end": 10}]
+    mock_post.return_value = make_search_response(first_page, next_page_token="page-2")
+    mock_get.return_value = make_search_response(second_page, next_page_token="page-3")
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    # Act
+    results = [result async for result in iter_video_search("dunks", "index1", top_n=100, min_score=50.0)]
+
+    # Assert
+    assert [result["video_id"] for result in results] == ["video1", "video2", "video3"]
+    assert mock_get.await_count == 1
+    assert mock_get.await_args.args[0].endswith("search/page-2")
+    assert results[2]["video_title"] == "video3.mp4"
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.get", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_base_video_search_stops_paging_at_top_n(mock_post, mock_get, mock_get_video_metadata, make_search_response, make_video_metadata):
+    mock_post.return_value = make_search_response([{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}], next_page_token="page-2")
+    mock_get.return_value = make_search_response([{"video_id": "video2", "score": 80.0, "start": 0, "end": 10}] * 3, next_page_token="page-3")
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    results = json.loads(await _base_video_search("dunks", "index1", top_n=3))
+
+    assert len(results) == 3
+    assert mock_get.await_count == 1
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_search.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.get", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_search.tl_client.post", new_callable=AsyncMock)
+async def test_base_video_search_stops_paging_at_min_score(mock_post, mock_get, mock_get_video_metadata, make_search_response, make_video_metadata):
+    # Arrange
+    first_page = [{"video_id": "video1", "score": 90.0, "start": 0, "end": 10}]
+    second_page = [{"video_id": "video2", "score": 80.0, "start": 0, "end": 10}, {"video_id": "video3", "score": 40.0, "start": 0, "end": 10}]
+    mock_post.return_value = make_search_response(first_page, next_page_token="page-2")
+    mock_get.return_value = make_search_response(second_page, next_page_token="page-3")
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    # Act
+    results = json.loads(await _base_video_search("dunks", "index1", top_n=100, min_score=50.0))
+
+    # Assert
+    assert [result["video_id"] for result in results] == ["video1", "video2"]
+    assert mock_get.await_count == 1
+
+    # the prefix fetched before the score floor serves smaller requests from the cache
+    results = json.loads(await _base_video_search("dunks", "index1", top_n=3))
+    assert [result["video_id"] for result in results] == ["video1", "video2", "video3"]
+    assert mock_post.await_count == 1
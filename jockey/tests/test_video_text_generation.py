@@ -0,0 +1,83 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# testing stirrups/video_text_generation.py
+from jockey.stirrups.video_text_generation import multi_summarize_text_generation, summarize_text_generation, gist_text_generation
+from jockey.stirrups.errors import JockeyError, ErrorType, NodeType, WorkerFunction
+from jockey.cache import DiskCache
+
+
+@pytest.fixture(autouse=True)
+def mock_pegasus_cache(tmp_path):
+    """keep generated outputs out of the real on-disk cache"""
+    cache = DiskCache(path=str(tmp_path / "pegasus.sqlite3"), max_bytes=1024 * 1024)
+    with patch("jockey.stirrups.video_text_generation.pegasus_cache", cache):
+        yield cache
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_text_generation.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_text_generation.tl_client.post", new_callable=AsyncMock)
+async def test_multi_summarize_reports_failures_per_video(mock_post, mock_get_video_metadata, make_response, make_video_metadata):
+    # Arrange
+    def post(url, json):
+        if json["video_id"] == "video2":
+            return make_response(500, text="internal error")
+        return make_response(200, {"summary": f"summary of {json['video_id']}"})
+
+    mock_post.side_effect = post
+    mock_get_video_metadata.side_effect = lambda video_id, index_id, max_age: make_video_metadata(video_id)
+
+    # Act
+    result = await multi_summarize_text_generation.ainvoke({
+        "video_ids": ["video1", "video2", "video3", "video1"],
+        "index_id": "index1",
+        "endpoint_option": "summary",
+        "prompt": None,
+    })
+
+    # Assert
+    results = json.loads(result)
+    assert list(results.keys()) == ["video1", "video2", "video3"]
+    assert results["video1"] == {"success": True, "result": {"summary": "summary of video1", "video_url": "https://mock.hls/video1.m3u8"}}
+    assert results["video2"]["success"] is False
+    assert "internal error" in results["video2"]["error"]
+    assert results["video3"]["success"] is True
+    assert mock_post.await_count == 3
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_text_generation.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_text_generation.tl_client.post", new_callable=AsyncMock)
+async def test_summarize_raises_jockey_error(mock_post, mock_get_video_metadata, make_response, make_video_metadata):
+    mock_post.return_value = make_response(500, text="internal error")
+    mock_get_video_metadata.return_value = make_video_metadata("video1")
+
+    with pytest.raises(JockeyError) as exc_info:
+        await summarize_text_generation.ainvoke({"video_id": "video1", "index_id": "index1", "endpoint_option": "summary", "prompt": None})
+
+    error = exc_info.value
+    assert error.error_data.node == NodeType.WORKER
+    assert error.error_data.error_type == ErrorType.TEXT_GENERATION
+    assert error.error_data.function_name == WorkerFunction.SUMMARIZE_TEXT_GENERATION
+
+
+@pytest.mark.asyncio
+@patch("jockey.stirrups.video_text_generation.get_video_metadata", new_callable=AsyncMock)
+@patch("jockey.stirrups.video_text_generation.tl_client.post", new_callable=AsyncMock)
+async def test_gist_is_served_from_disk_cache(mock_post, mock_get_video_metadata, mock_pegasus_cache, make_response, make_video_metadata):
+    # Arrange
+    mock_post.return_value = make_response(200, {"title": "Dunk contest"})
+    mock_get_video_metadata.return_value = make_video_metadata("video1")
+    tool_input = {"video_id": "video1", "index_id": "index1", "endpoint_options": ["title", "topic"]}
+
+    # Act
+    first = json.loads(await gist_text_generation.ainvoke(tool_input))
+    second = json.loads(await gist_text_generation.ainvoke({**tool_input, "endpoint_options": ["topic", "title"]}))
+    await gist_text_generation.ainvoke({**tool_input, "bypass_cache": True})
+
+    # Assert
+    assert first == second == {"title": "Dunk contest", "video_url": "https://mock.hls/video1.m3u8"}
+    assert mock_post.await_count == 2
+    assert mock_pegasus_cache.stats()["hits"] == 1
@@ -0,0 +1,273 @@
+import json
+import httpx
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# testing video_utils.py
+from jockey import circuit_breaker, video_utils
+from jockey.clip_cache import ClipCache
+from jockey.video_utils import (
+    _h264_profile,
+    download_clips,
+    download_video,
+    download_m3u8_videos,
+    get_preview_source,
+    get_video_metadata,
+    merge_clip_ranges,
+    plan_smart_cut,
+    video_metadata_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_video_metadata_cache():
+    video_metadata_cache.clear()
+    yield
+    video_metadata_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clip_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOST_PUBLIC_DIR", str(tmp_path / "public"))
+    cache = ClipCache(index_path=str(tmp_path / "clips.sqlite3"), max_bytes=1024 * 1024)
+    monkeypatch.setattr(video_utils, "clip_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_video_metadata_is_cached(mock_get, make_response):
+    mock_get.return_value = make_response(200, {"hls": {"video_url": "https://mock.hls/video1.m3u8"}})
+
+    first = await get_video_metadata(index_id="index1", video_id="video1")
+    second = await get_video_metadata(index_id="index1", video_id="video1")
+
+    assert first == second
+    assert mock_get.await_count == 1
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_video_metadata_caches_not_found(mock_get, make_response):
+    mock_get.return_value = make_response(404, text="video not found")
+
+    first = await get_video_metadata(index_id="index1", video_id="missing")
+    second = await get_video_metadata(index_id="index1", video_id="missing")
+
+    assert first["error"] == "video not found"
+    assert second["error"] == "video not found"
+    assert mock_get.await_count == 1
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_video_metadata_does_not_cache_server_errors(mock_get, make_response):
+    mock_get.return_value = make_response(500, text="internal error")
+
+    await get_video_metadata(index_id="index1", video_id="video1")
+    await get_video_metadata(index_id="index1", video_id="video1")
+
+    assert mock_get.await_count == 2
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_video_metadata_coalesces_concurrent_misses(mock_get, make_response):
+    async def get(url):
+        await asyncio.sleep(0.01)
+        return make_response(200, {"hls": {"video_url": "https://mock.hls/video1.m3u8"}})
+
+    mock_get.side_effect = get
+
+    results = await asyncio.gather(*[get_video_metadata(index_id="index1", video_id="video1") for _ in range(3)])
+
+    assert mock_get.await_count == 1
+    assert results[0] == results[1] == results[2]
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_preview_source_fetches_low_resolution_rendition(mock_get, monkeypatch, make_response):
+    mock_get.return_value = make_response(200, {"hls": {"video_url": "https://mock.hls/video1.m3u8"}})
+    monkeypatch.setattr(video_utils.hls, "HLS_SEGMENT_FETCH", True)
+    fetch_range = AsyncMock(return_value=("/cache/range.m3u8", 8.0))
+    monkeypatch.setattr(video_utils.hls, "fetch_range", fetch_range)
+
+    assert await get_preview_source("index1", "video1", 10, 20) == ("/cache/range.m3u8", 8.0)
+    fetch_range.assert_awaited_once_with("https://mock.hls/video1.m3u8", 10, 20, max_height=video_utils.PREVIEW_MAX_HEIGHT)
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_get_preview_source_reads_low_resolution_rendition_without_segment_fetching(mock_get, monkeypatch, make_response):
+    mock_get.return_value = make_response(200, {"hls": {"video_url": "https://mock.hls/video1.m3u8"}})
+    monkeypatch.setattr(video_utils.hls, "HLS_SEGMENT_FETCH", False)
+    playlist = video_utils.hls.MediaPlaylist(uri="https://mock.hls/360p/video1.m3u8", target_duration=4, segments=[])
+    get_media_playlist = AsyncMock(return_value=playlist)
+    monkeypatch.setattr(video_utils.hls, "get_media_playlist", get_media_playlist)
+
+    assert await get_preview_source("index1", "video1", 10, 20) == ("https://mock.hls/360p/video1.m3u8", 0.0)
+    get_media_playlist.assert_awaited_once_with("https://mock.hls/video1.m3u8", video_utils.PREVIEW_MAX_HEIGHT)
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_download_video_only_counts_hls_outages_against_circuit(mock_get, monkeypatch, make_response):
+    # Arrange
+    mock_get.return_value = make_response(200, {"hls": {"video_url": "https://mock.hls/video1.m3u8"}})
+    monkeypatch.setattr(circuit_breaker, "_circuit_breakers", {})
+    monkeypatch.setattr(video_utils.hls, "HLS_SEGMENT_FETCH", True)
+    fetch_range = AsyncMock(side_effect=ValueError("No HLS segments cover 500s to 510s"))
+    monkeypatch.setattr(video_utils.hls, "fetch_range", fetch_range)
+
+    # Act
+    for _ in range(circuit_breaker.CIRCUIT_BREAKER_MIN_REQUESTS):
+        result = await download_video("video1", "index1", 500, 510)
+
+    # Assert
+    assert "No HLS segments" in result["error"]
+    assert circuit_breaker.get_circuit_breaker("hls").stats()["failures"] == 0
+
+    fetch_range.side_effect = httpx.ConnectError("CDN unreachable")
+    for _ in range(circuit_breaker.CIRCUIT_BREAKER_MIN_REQUESTS):
+        await download_video("video1", "index1", 0, 10)
+    assert circuit_breaker.get_circuit_breaker("hls").state == circuit_breaker.OPEN
+
+
+@pytest.mark.asyncio
+@patch("jockey.video_utils.tl_client.get", new_callable=AsyncMock)
+async def test_download_video_raises_for_unknown_video(mock_get, make_response):
+    mock_get.return_value = make_response(404, text="video not found")
+
+    with pytest.raises(ValueError, match="video not found"):
+        await download_video("missing", "index1", 0, 10)
+
+
+def test_plan_smart_cut_copies_whole_gops_inside_range():
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+    assert plan_smart_cut(keyframes, 1.5, 9.2) == (2.0, 8.0)
+    # Boundaries that land on keyframes need no re-encoded head or tail.
+    assert plan_smart_cut(keyframes, 2.0, 8.0) == (2.0, 8.0)
+
+
+def test_plan_smart_cut_needs_a_whole_gop():
+    assert plan_smart_cut([0.0, 2.0, 4.0], 2.5, 3.9) is None
+    assert plan_smart_cut([0.0, 2.0, 4.0], 1.0, 3.0) is None
+    assert plan_smart_cut([], 0.0, 10.0) is None
+
+
+def test_h264_profile_matches_libx264_names():
+    assert _h264_profile("Constrained Baseline") == "baseline"
+    assert _h264_profile("High") == "high"
+    assert _h264_profile("High 10") == "high10"
+    assert _h264_profile(None) is None
+
+
+@pytest.mark.asyncio
+async def test_download_clips_reports_failures_per_clip():
+    async def fake_download_video(video_id, index_id, start, end):
+        if video_id == "bad":
+            return {"message": "download failed", "error": "boom"}
+        if video_id == "missing":
+            raise AssertionError("video not found")
+        return f"/clips/{video_id}_{start}_{end}.mp4"
+
+    with patch("jockey.video_utils.download_video", side_effect=fake_download_video) as mock_download:
+        results = await download_clips("index1", [("good", 0, 5), ("bad", 0, 5), ("missing", 1, 2), ("good", 0, 5)])
+
+    assert mock_download.await_count == 3
+    assert results[("good", 0, 5)] == "/clips/good_0_5.mp4"
+    assert results[("bad", 0, 5)]["error"] == "boom"
+    assert results[("missing", 1, 2)]["error"] == "video not found"
+
+
+@pytest.mark.asyncio
+async def test_download_clips_bounds_concurrency(monkeypatch):
+    monkeypatch.setattr(video_utils, "CLIP_DOWNLOAD_CONCURRENCY", 2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_download_video(video_id, index_id, start, end):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return video_id
+
+    with patch("jockey.video_utils.download_video", side_effect=fake_download_video):
+        results = await download_clips("index1", [(f"video{i}", 0, 5) for i in range(6)])
+
+    assert len(results) == 6
+    assert max_in_flight == 2
+
+
+def test_merge_clip_ranges_merges_overlapping_and_adjacent_clips():
+    clips = [("video1", 10.5, 15), ("video1", 0, 5), ("video1", 4, 8), ("video1", 8.5, 9), ("video2", 0, 5), ("video1", 30, 35)]
+
+    spans = merge_clip_ranges(clips, max_gap=1.0)
+
+    assert spans == [
+        ("video1", 0, 9, [("video1", 0, 5), ("video1", 4, 8), ("video1", 8.5, 9)]),
+        ("video1", 10.5, 15, [("video1", 10.5, 15)]),
+        ("video1", 30, 35, [("video1", 30, 35)]),
+        ("video2", 0, 5, [("video2", 0, 5)]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_download_clips_fetches_merged_span_once():
+    # Each clip is cut straight from the span's source segments, not from another cut clip.
+    fetch_hls_range = AsyncMock(return_value=("/segments/range.m3u8", 0.0))
+    mock_download_video = AsyncMock()
+
+    async def fake_cut_clip_from_source(index_id, video_id, source_uri, source_start, start, end):
+        return f"{source_uri}:{start - source_start}-{end - source_start}"
+
+    with patch.multiple(
+        "jockey.video_utils",
+        _get_hls_uri=AsyncMock(return_value="https://mock.hls/video1.m3u8"),
+        _fetch_hls_range=fetch_hls_range,
+        cut_clip_from_source=AsyncMock(side_effect=fake_cut_clip_from_source),
+        download_video=mock_download_video,
+    ):
+        results = await download_clips("index1", [("video1", 0, 5), ("video1", 3, 10)])
+
+    fetch_hls_range.assert_awaited_once_with("https://mock.hls/video1.m3u8", 0, 10)
+    mock_download_video.assert_not_awaited()
+    assert results == {("video1", 0, 5): "/segments/range.m3u8:0.0-5.0", ("video1", 3, 10): "/segments/range.m3u8:3.0-10.0"}
+
+
+@pytest.mark.asyncio
+async def test_download_m3u8_videos_downloads_each_source_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    commands = []
+
+    async def fake_run_command(*command):
+        commands.append(command)
+        if command[0] == "ffmpeg" and "-ss" in command and command[command.index("-ss") + 1] == "20":
+            raise RuntimeError("ffmpeg exited with status 1")
+        with open(command[2] if command[0] == "yt-dlp" else command[-1], "w") as output:
+            output.write("video")
+
+    items = [
+        {"video_id": "video1", "video_url": "https://mock.hls/video1.m3u8", "start": 0, "end": 5},
+        {"video_id": "video1", "video_url": "https://mock.hls/video1.m3u8", "start": 10, "end": 15},
+        {"video_id": "video1", "video_url": "https://mock.hls/video1.m3u8", "start": 20, "end": 25},
+        {"video_id": "video2", "video_url": "https://mock.hls/video2.m3u8", "start": 0, "end": None},
+        {"video_id": "video3", "video_url": "https://mock.hls/video3.m3u8", "start": 0, "end": 5},
+    ]
+
+    with patch("jockey.video_utils._run_command", side_effect=fake_run_command):
+        clips = download_m3u8_videos({"data": {"output": json.dumps(items)}})
+        results = await asyncio.gather(*clips.values(), return_exceptions=True)
+
+    assert [command[0] for command in commands].count("yt-dlp") == 3
+    assert results[0].endswith("trimmed-video1-0-5.mp4")
+    assert results[1].endswith("trimmed-video1-10-15.mp4")
+    assert isinstance(results[2], RuntimeError)
+    assert results[3] == "output/source/video2.mp4"
+    # the same range of another video is a different clip
+    assert results[4].endswith("trimmed-video3-0-5.mp4")
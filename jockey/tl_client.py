@@ -0,0 +1,150 @@
+import os
+import asyncio
+import urllib.parse
+from typing import Any, Dict, Union
+import httpx
+from jockey.circuit_breaker import get_circuit_breaker
+from jockey.rate_limit import RETRYABLE_STATUS_CODES, TL_MAX_RETRIES, get_rate_limiter, get_retry_delay, parse_retry_after
+
+# Point this at a local stand-in server (`python -m jockey.stand_in`) to run without touching the real API.
+TL_BASE_URL = os.environ.get("TWELVE_LABS_BASE_URL") or "https://api.twelvelabs.io/v1.2/"
+if not TL_BASE_URL.endswith("/"):
+    TL_BASE_URL += "/"
+INDEX_URL = urllib.parse.urljoin(TL_BASE_URL, "indexes/")
+SEARCH_URL = urllib.parse.urljoin(TL_BASE_URL, "search")
+GIST_URL = urllib.parse.urljoin(TL_BASE_URL, "gist/")
+SUMMARIZE_URL = urllib.parse.urljoin(TL_BASE_URL, "summarize/")
+GENERATE_URL = urllib.parse.urljoin(TL_BASE_URL, "generate/")
+
+# Pool and timeout settings can be tuned per deployment without code changes.
+TL_MAX_CONNECTIONS = int(os.environ.get("TL_MAX_CONNECTIONS", 20))
+TL_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("TL_MAX_KEEPALIVE_CONNECTIONS", 10))
+TL_KEEPALIVE_EXPIRY = float(os.environ.get("TL_KEEPALIVE_EXPIRY", 30.0))
+TL_CONNECT_TIMEOUT = float(os.environ.get("TL_CONNECT_TIMEOUT", 10.0))
+TL_READ_TIMEOUT = float(os.environ.get("TL_READ_TIMEOUT", 60.0))
+
+# httpx.AsyncClient instances are bound to the event loop they were first used on.
+# We keep one pooled client per running loop so the CLI, the LangGraph server and tests can each reuse connections safely.
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_headers() -> Dict[str, str]:
+    """Headers required by every TwelveLabs API request."""
+    return {"x-api-key": os.environ["TWELVE_LABS_API_KEY"], "accept": "application/json", "Content-Type": "application/json"}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the pooled, keep-alive TwelveLabs client for the running event loop.
+
+    Returns:
+        httpx.AsyncClient: A client shared by every TwelveLabs call made on this event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+
+    if client is None or client.is_closed:
+        # Drop clients whose loops have been closed so they don't accumulate.
+        for stale_loop in [stale_loop for stale_loop in _clients if stale_loop.is_closed()]:
+            del _clients[stale_loop]
+
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=TL_MAX_CONNECTIONS,
+                max_keepalive_connections=TL_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=TL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(TL_READ_TIMEOUT, connect=TL_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+
+    return client
+
+
+def _get_backend(url: str) -> str:
+    """Name of the circuit breaker guarding requests to `url`."""
+    if url.startswith(SEARCH_URL):
+        return "search"
+    if url.startswith((GIST_URL, SUMMARIZE_URL, GENERATE_URL)):
+        return "generate"
+    if url.startswith(INDEX_URL):
+        return "metadata"
+    return "twelvelabs"
+
+
+async def request(method: str, url: str, json: Union[Dict[str, Any], None] = None, **kwargs) -> httpx.Response:
+    """Send a request to the TwelveLabs API through the pooled client.
+
+    Requests are paced by the rate limiter for the API key in use. Throttled (429), transient 5xx responses and
+    transport errors are retried with backoff up to `TL_MAX_RETRIES` times. Requests to a backend that keeps
+    failing after retries are rejected straight away by its circuit breaker until it recovers.
+
+    Args:
+        method (str): HTTP method, e.g. "GET" or "POST".
+        url (str): Fully qualified TwelveLabs API url.
+        json (Union[Dict[str, Any], None], optional): JSON payload for the request body. Defaults to None.
+
+    Raises:
+        CircuitOpenError: If the circuit for the backend behind `url` is open.
+        httpx.TransportError: If the request still can't be sent after the last retry.
+
+    Returns:
+        httpx.Response: The raw response. Callers are responsible for checking the status code.
+    """
+    circuit_breaker = get_circuit_breaker(_get_backend(url))
+    circuit_breaker.allow()
+
+    try:
+        response = await _send_with_retries(method, url, json=json, **kwargs)
+    except httpx.TransportError:
+        circuit_breaker.record_failure()
+        raise
+    except BaseException:
+        circuit_breaker.release()
+        raise
+
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        circuit_breaker.record_failure()
+    else:
+        circuit_breaker.record_success()
+
+    return response
+
+
+async def _send_with_retries(method: str, url: str, json: Union[Dict[str, Any], None] = None, **kwargs) -> httpx.Response:
+    headers = {**get_headers(), **kwargs.pop("headers", {})}
+    rate_limiter = get_rate_limiter(headers["x-api-key"])
+
+    for attempt in range(TL_MAX_RETRIES + 1):
+        try:
+            async with rate_limiter.slot():
+                response = await get_client().request(method, url, json=json, headers=headers, **kwargs)
+        except httpx.TransportError as error:
+            if attempt == TL_MAX_RETRIES:
+                raise
+            print(f"[WARNING] TwelveLabs request failed ({type(error).__name__}), retrying: {url}")
+            await asyncio.sleep(get_retry_delay(attempt))
+            continue
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        rate_limiter.record(response.status_code, retry_after)
+
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == TL_MAX_RETRIES:
+            return response
+
+        print(f"[WARNING] TwelveLabs request returned {response.status_code}, retrying: {url}")
+        await asyncio.sleep(get_retry_delay(attempt, retry_after))
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, json: Dict[str, Any], **kwargs) -> httpx.Response:
+    return await request("POST", url, json=json, **kwargs)
+
+
+async def aclose() -> None:
+    """Close the pooled client for the running event loop, e.g. on server shutdown."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -83,6 +83,22 @@ async def parse_langchain_events_terminal(event: dict):
         except (json.decoder.JSONDecodeError, TypeError):
             console.print(Padding(str(event["data"]["output"]), (0, 6)))
 
+    elif event["event"] == "on_custom_event" and event["name"] == "ffmpeg_progress":
+        progress = event["data"]
+        details = []
+        if progress.get("percent") is not None:
+            details.append(f"{progress['percent']:.0f}%")
+        if progress.get("speed") is not None:
+            details.append(f"{progress['speed']}x")
+        console.print(Padding(f"[cyan]🏇 {progress['task']} {', '.join(details)}", (0, 2)))
+
+    elif event["event"] == "on_custom_event" and event["name"] == "full_render_ready":
+        render = event["data"]
+        if "output_path" in render:
+            console.print(Padding(f"[cyan]🏇 Full quality render of {render['preview_path']} is ready: {render['output_path']}", (0, 2)))
+        else:
+            console.print(Padding(f"[red]🏇 Full quality render of {render['preview_path']} failed: {render['error']}", (0, 2)))
+
     elif event["event"] == "on_chat_model_start":
         if "instructor" in event["tags"]:
             console.print(Padding(f"[red]🏇 Instructor: ", (1, 0)), end="")
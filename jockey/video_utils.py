@@ -1,22 +1,81 @@
 import os
-import requests
+import httpx
 import ffmpeg
-import urllib.parse
-import tqdm
+from tqdm import tqdm
 import json
-import subprocess
+import asyncio
+import tempfile
+import functools
+from typing import Awaitable, Dict, List, Set, Tuple, Union
+from jockey import encode_profiles, ffmpeg_runner, hls, tl_client
+from jockey.cache import TTLCache
+from jockey.clip_cache import clip_cache
+from jockey.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from jockey.rate_limit import RETRYABLE_STATUS_CODES
+from jockey.single_flight import SingleFlight
+from jockey.tl_client import INDEX_URL
 from jockey.thread import session_id
 
-TL_BASE_URL = "https://api.twelvelabs.io/v1.2/"
-INDEX_URL = urllib.parse.urljoin(TL_BASE_URL, "indexes/")
+VIDEO_METADATA_CACHE_SIZE = int(os.environ.get("TL_METADATA_CACHE_SIZE", 1024))
+VIDEO_METADATA_TTL = float(os.environ.get("TL_METADATA_CACHE_TTL", 3600))
+# HLS urls can expire well before the rest of a video document changes, so callers that need one ask for a younger entry.
+HLS_URL_TTL = float(os.environ.get("TL_HLS_URL_CACHE_TTL", 600))
+# Missing videos are cached briefly so repeated lookups of a bad Video ID don't each hit the API.
+VIDEO_METADATA_NEGATIVE_TTL = float(os.environ.get("TL_METADATA_NEGATIVE_CACHE_TTL", 60))
 
+# Stream copy whole GOPs when cutting clips and only re-encode the partial GOPs at either end.
+SMART_CUT = os.environ.get("JOCKEY_SMART_CUT", "true").lower() != "false"
+# Head or tail pieces shorter than this many seconds are dropped instead of encoded.
+SMART_CUT_MIN_ENCODE = 0.01
+# Clips downloaded at once when combining clips. Each download runs its own ffmpeg process.
+CLIP_DOWNLOAD_CONCURRENCY = int(os.environ.get("JOCKEY_CLIP_DOWNLOAD_CONCURRENCY", 4))
+# Sources downloaded and clips trimmed at once by `download_m3u8_videos`.
+SOURCE_DOWNLOAD_CONCURRENCY = int(os.environ.get("JOCKEY_SOURCE_DOWNLOAD_CONCURRENCY", 4))
+TRIM_CONCURRENCY = int(os.environ.get("JOCKEY_TRIM_CONCURRENCY") or os.cpu_count() or 4)
+# Clips from the same video less than this many seconds apart are downloaded together as one span.
+CLIP_MERGE_GAP = float(os.environ.get("JOCKEY_CLIP_MERGE_GAP", 1.0))
+# Previews read the best HLS rendition no taller than this, or the smallest one if they're all taller.
+PREVIEW_MAX_HEIGHT = int(os.environ.get("JOCKEY_PREVIEW_MAX_HEIGHT", 360))
+
+# Keyed by (index_id, video_id).
+video_metadata_cache = TTLCache(max_size=VIDEO_METADATA_CACHE_SIZE, ttl=VIDEO_METADATA_TTL)
+# Concurrent cache misses for the same video share a single request.
+video_metadata_flight = SingleFlight()
+# Concurrent downloads of the same source file share one yt-dlp run.
+source_flight = SingleFlight()
+# Concurrent trims of the same clip, e.g. from two tool outputs in one session, share one ffmpeg run.
+trim_flight = SingleFlight()
+# asyncio primitives are bound to the event loop they were first used on.
+_source_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+_trim_semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+_download_tasks: Set[asyncio.Task] = set()
 
-def get_video_metadata(index_id: str, video_id: str) -> dict:
-    video_url = f"{INDEX_URL}{index_id}/videos/{video_id}"
 
-    headers = {"accept": "application/json", "Content-Type": "application/json", "x-api-key": os.environ["TWELVE_LABS_API_KEY"]}
+async def get_video_metadata(index_id: str, video_id: str, max_age: Union[float, None] = None) -> dict:
+    """Get the metadata document for a video, served from `video_metadata_cache` when possible.
 
-    response = requests.get(video_url, headers=headers)
+    Args:
+        index_id (str): Index ID the video belongs to.
+        video_id (str): Video ID to get the metadata for.
+        max_age (Union[float, None], optional): Refetch if the cached document is older than this many seconds.
+            Pass `HLS_URL_TTL` when the HLS url is going to be used. Defaults to None.
+
+    Returns:
+        dict: The video document, or an error response with an `error` key. Treat it as read-only since it is shared.
+    """
+    cache_key = (index_id, video_id)
+    video_metadata = video_metadata_cache.get(cache_key, max_age=max_age)
+    if video_metadata is not None:
+        return video_metadata
+
+    return await video_metadata_flight.do(cache_key, lambda: _fetch_video_metadata(index_id=index_id, video_id=video_id))
+
+
+async def _fetch_video_metadata(index_id: str, video_id: str) -> dict:
+    cache_key = (index_id, video_id)
+    video_url = f"{INDEX_URL}{index_id}/videos/{video_id}"
+
+    response = await tl_client.get(video_url)
 
     try:
         assert response.status_code == 200
@@ -26,101 +85,452 @@ def get_video_metadata(index_id: str, video_id: str) -> dict:
             "Double check that the Video ID and Index ID are valid and correct.",
             "error": response.text,
         }
+        if response.status_code == 404:
+            video_metadata_cache.set(cache_key, error_response, ttl=VIDEO_METADATA_NEGATIVE_TTL)
         return error_response
 
-    return response
+    video_metadata = response.json()
+    video_metadata_cache.set(cache_key, video_metadata)
+    return video_metadata
+
+
+async def _probe_source(source_uri: str) -> Dict:
+    probe = await ffmpeg_runner.probe(source_uri)
+    streams = probe["streams"]
+    return {
+        "start_time": float(probe["format"].get("start_time", 0)),
+        "video": next((stream for stream in streams if stream["codec_type"] == "video"), None),
+        "audio": next((stream for stream in streams if stream["codec_type"] == "audio"), None),
+    }
+
+
+async def _keyframe_times(source_uri: str, start: float, end: float) -> List[float]:
+    """Timestamps of the video keyframes between `start` and `end`, in the source's own timestamps."""
+    probe = await ffmpeg_runner.probe(
+        source_uri, select_streams="v:0", skip_frame="nokey", show_entries="frame=pts_time", read_intervals=f"{start}%{end}"
+    )
+    return sorted(float(frame["pts_time"]) for frame in probe.get("frames", []) if frame.get("pts_time") not in (None, "N/A"))
+
+
+def plan_smart_cut(keyframes: List[float], start: float, end: float) -> Union[Tuple[float, float], None]:
+    """Pick the span of whole GOPs inside `start`-`end` that can be stream copied.
+
+    Returns:
+        Union[Tuple[float, float], None]: The first and last keyframe inside the range, or None if no whole GOP fits.
+    """
+    inside = [keyframe for keyframe in keyframes if start <= keyframe <= end]
+    if len(inside) < 2:
+        return None
+    return inside[0], inside[-1]
+
+
+def _h264_profile(profile: Union[str, None]) -> Union[str, None]:
+    """Translate an ffprobe profile name such as "Constrained Baseline" or "High 10" into a libx264 profile."""
+    if not profile:
+        return None
+    return profile.lower().replace("constrained ", "").replace(" ", "")
+
+
+def _encode_kwargs(source: Dict) -> Dict:
+    """Encoder settings matching the source streams so re-encoded GOPs can be joined with stream copied ones.
+    `CLIP_ENCODE_PROFILE` only decides speed and quality."""
+    video, audio = source["video"], source["audio"]
+    profile = encode_profiles.CLIP_ENCODE_PROFILE
+    kwargs = {**encode_profiles.video_encode_kwargs(profile), "pix_fmt": video.get("pix_fmt", "yuv420p"), "r": video.get("r_frame_rate")}
+    if _h264_profile(video.get("profile")):
+        kwargs["profile:v"] = _h264_profile(video.get("profile"))
+    if audio:
+        kwargs.update(encode_profiles.audio_encode_kwargs(profile), ar=audio.get("sample_rate"), ac=audio.get("channels"))
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+async def cut_clip(source_uri: str, output_path: str, start: float, end: float) -> None:
+    """Cut `start`-`end` out of a video into an mp4 with frame-accurate boundaries.
+
+    Whole GOPs inside the range are stream copied and only the partial GOPs at the head and tail are re-encoded
+    (smart cut), so most of a clip costs no encoding at all. Sources that can't be smart cut, such as non-H.264
+    video or clips shorter than a GOP, are re-encoded in a single pass instead. Re-encoded parts use
+    `CLIP_ENCODE_PROFILE` whatever profile the clip is combined with, so cut clips can be shared by every profile.
+
+    Args:
+        source_uri (str): HLS url or path of the source video.
+        output_path (str): Where to write the clip. Written atomically, so a partial clip never ends up there.
+        start (float): Start time of the clip in seconds.
+        end (float): End time of the clip in seconds.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".cut_") as work_dir:
+        partial_path = os.path.join(work_dir, "clip.mp4")
+        try:
+            await _smart_cut(source_uri, partial_path, work_dir, start, end)
+        except (ffmpeg.Error, KeyError, ValueError) as error:
+            print(f"[WARNING] Smart cut failed, re-encoding the clip instead: {error}")
+            await _reencode_cut(source_uri, partial_path, start, end)
+        os.replace(partial_path, output_path)
+
+
+async def _reencode_cut(source_uri: str, output_path: str, start: float, end: float) -> None:
+    # Input seeking while re-encoding decodes from the previous keyframe and drops everything before `start`,
+    # so one pass is already frame accurate.
+    stream = ffmpeg.input(source_uri, ss=start, t=end - start, strict="experimental", loglevel="error").output(
+        output_path,
+        avoid_negative_ts="make_zero",
+        movflags="+faststart",
+        **encode_profiles.video_encode_kwargs(encode_profiles.CLIP_ENCODE_PROFILE),
+        **encode_profiles.audio_encode_kwargs(encode_profiles.CLIP_ENCODE_PROFILE),
+    )
+    await ffmpeg_runner.run_ffmpeg(stream, task=f"Cutting {os.path.basename(output_path)}", duration=end - start)
+
+
+async def _smart_cut(source_uri: str, output_path: str, work_dir: str, start: float, end: float) -> None:
+    source = await _probe_source(source_uri)
+    if not SMART_CUT or source["video"] is None or source["video"].get("codec_name") != "h264":
+        await _reencode_cut(source_uri, output_path, start, end)
+        return
+
+    # Keyframes and the concat demuxer's in and out points use the source's timestamps, which don't necessarily start at 0.
+    offset = source["start_time"]
+    gop_span = plan_smart_cut(await _keyframe_times(source_uri, offset + start, offset + end), offset + start, offset + end)
+    if gop_span is None:
+        await _reencode_cut(source_uri, output_path, start, end)
+        return
+
+    copy_start, copy_end = gop_span[0] - offset, gop_span[1] - offset
+    encode_kwargs = _encode_kwargs(source)
+    concat_entries = [f"file '{source_uri}'", f"inpoint {gop_span[0]}", f"outpoint {gop_span[1]}"]
+    encodes = []
+
+    if copy_start - start > SMART_CUT_MIN_ENCODE:
+        head_path = os.path.join(work_dir, "head.ts")
+        head = ffmpeg.input(source_uri, ss=start, t=copy_start - start, loglevel="error").output(head_path, f="mpegts", **encode_kwargs)
+        encodes.append(ffmpeg_runner.run_ffmpeg(head, task=f"Encoding the start of {os.path.basename(output_path)}", duration=copy_start - start))
+        concat_entries.insert(0, f"file '{head_path}'")
+
+    if end - copy_end > SMART_CUT_MIN_ENCODE:
+        tail_path = os.path.join(work_dir, "tail.ts")
+        tail = ffmpeg.input(source_uri, ss=copy_end, t=end - copy_end, loglevel="error").output(tail_path, f="mpegts", **encode_kwargs)
+        encodes.append(ffmpeg_runner.run_ffmpeg(tail, task=f"Encoding the end of {os.path.basename(output_path)}", duration=end - copy_end))
+        concat_entries.append(f"file '{tail_path}'")
+
+    # The head and tail are independent, so they are encoded at the same time.
+    await asyncio.gather(*encodes)
+
+    concat_list_path = os.path.join(work_dir, "concat.txt")
+    with open(concat_list_path, "w") as concat_list:
+        concat_list.write("\n".join(concat_entries) + "\n")
 
+    # The copied GOPs are read straight from the source, so the only full-size write is the output itself.
+    stream = ffmpeg.input(concat_list_path, f="concat", safe=0, protocol_whitelist="file,http,https,tcp,tls,crypto", loglevel="error").output(
+        output_path, c="copy", avoid_negative_ts="make_zero", movflags="+faststart", **{"bsf:a": "aac_adtstoasc"}
+    )
+    await ffmpeg_runner.run_ffmpeg(stream, task=f"Joining {os.path.basename(output_path)}", duration=end - start)
 
-def download_video(video_id: str, index_id: str, start: float, end: float) -> str:
+
+def _is_hls_outage(error: BaseException) -> bool:
+    """Only errors that say the HLS CDN itself is struggling count towards opening its circuit, not bad clip ranges."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+async def _fetch_hls_range(hls_uri: str, start: float, end: float, max_height: int = hls.HLS_MAX_HEIGHT) -> Tuple[str, float]:
+    """Fetch the segments covering `start`-`end` through the "hls" circuit breaker. When segment fetching is off,
+    ffmpeg reads the media playlist of the rendition that fits `max_height` instead. Falls back to the HLS url itself,
+    which ffmpeg can read directly, when the playlist isn't supported.
+
+    Raises:
+        CircuitOpenError: If the circuit for the HLS CDN is open.
+
+    Returns:
+        Tuple[str, float]: Source ffmpeg can read the range from, and the time in the video where that source starts.
+    """
+    try:
+        with get_circuit_breaker("hls").guard(is_failure=_is_hls_outage):
+            if not hls.HLS_SEGMENT_FETCH:
+                return (await hls.get_media_playlist(hls_uri, max_height)).uri, 0.0
+            return await hls.fetch_range(hls_uri, start, end, max_height=max_height)
+    except hls.UnsupportedPlaylistError as error:
+        print(f"[WARNING] {error}, letting ffmpeg read the HLS url instead")
+        return hls_uri, 0.0
+
+
+async def _get_hls_uri(index_id: str, video_id: str) -> str:
+    video_metadata = await get_video_metadata(index_id=index_id, video_id=video_id, max_age=HLS_URL_TTL)
+    if "error" in video_metadata:
+        raise ValueError(f"Could not get metadata for Video ID: {video_id} in Index ID: {index_id}: {video_metadata['error']}")
+    return video_metadata["hls"]["video_url"]
+
+
+async def download_video(video_id: str, index_id: str, start: float, end: float) -> str:
     """Download a video for a given video in a given index and get the filepath.
-    Should only be used when the user explicitly requests video editing functionalities."""
-    headers = {"x-api-key": os.environ["TWELVE_LABS_API_KEY"], "accept": "application/json", "Content-Type": "application/json"}
+    Should only be used when the user explicitly requests video editing functionalities.
+
+    Raises:
+        ValueError: If the video's metadata can't be fetched, e.g. for an unknown Video ID or Index ID.
+    """
+    cached_path = clip_cache.get(index_id, video_id, start, end)
+    if cached_path is not None:
+        return cached_path
+
+    hls_uri = await _get_hls_uri(index_id, video_id)
 
-    video_url = f"https://api.twelvelabs.io/v1.2/indexes/{index_id}/videos/{video_id}"
+    try:
+        source_uri, source_start = await _fetch_hls_range(hls_uri, start, end)
+        return await cut_clip_from_source(index_id, video_id, source_uri, source_start, start, end)
+    except CircuitOpenError:
+        raise
+    except Exception as error:
+        error_response = {
+            "message": f"There was an error downloading the video with Video ID: {video_id} in Index ID: {index_id}. "
+            "Double check that the Video ID and Index ID are valid and correct.",
+            "error": str(error),
+        }
+        return error_response
 
-    response = requests.get(video_url, headers=headers)
 
-    assert response.status_code == 200
+async def get_preview_source(index_id: str, video_id: str, start: float, end: float) -> Tuple[str, float]:
+    """Fetch the segments covering a clip from a low resolution HLS rendition, for previews that don't need a full
+    quality download.
 
-    hls_uri = response.json()["hls"]["video_url"]
+    Returns:
+        Tuple[str, float]: Source ffmpeg can read the clip from, and the time in the video where that source starts.
+    """
+    video_metadata = await get_video_metadata(index_id=index_id, video_id=video_id, max_age=HLS_URL_TTL)
+    if "error" in video_metadata:
+        raise RuntimeError(video_metadata["error"])
+
+    return await _fetch_hls_range(video_metadata["hls"]["video_url"], start, end, max_height=PREVIEW_MAX_HEIGHT)
+
+
+def merge_clip_ranges(
+    clips: List[Tuple[str, float, float]], max_gap: float = CLIP_MERGE_GAP
+) -> List[Tuple[str, float, float, List[Tuple[str, float, float]]]]:
+    """Merge clips from the same video whose ranges overlap or are less than `max_gap` seconds apart into spans.
+
+    Returns:
+        List[Tuple[str, float, float, List[Tuple[str, float, float]]]]: (video_id, start, end, clips) of every span.
+    """
+    spans = []
+    for clip in sorted(set(clips), key=lambda clip: (clip[0], clip[1], clip[2])):
+        video_id, start, end = clip
+        if spans and spans[-1][0] == video_id and start <= spans[-1][2] + max_gap:
+            spans[-1][2] = max(spans[-1][2], end)
+            spans[-1][3].append(clip)
+        else:
+            spans.append([video_id, start, end, [clip]])
+    return [tuple(span) for span in spans]
 
-    video_dir = os.path.join(os.environ["HOST_PUBLIC_DIR"], index_id)
 
-    if os.path.isdir(video_dir) is False:
-        os.mkdir(video_dir)
+async def cut_clip_from_source(
+    index_id: str, video_id: str, source_uri: str, source_start: float, start: float, end: float
+) -> str:
+    """Cut a clip out of source segments that were already fetched for it, e.g. those covering a whole span of clips
+    from the same video. Every clip is cut from the original GOPs, so no frame is re-encoded twice.
 
-    video_filename = f"{video_id}_{start}_{end}.mp4"
-    video_path = os.path.join(video_dir, video_filename)
+    Args:
+        index_id (str): Index ID the video belongs to.
+        video_id (str): Video ID of the clip.
+        source_uri (str): Source ffmpeg can read the clip from, as returned by `_fetch_hls_range`.
+        source_start (float): Time in the video where `source_uri` starts.
+        start (float): Start time of the clip in the video in seconds.
+        end (float): End time of the clip in the video in seconds.
 
-    if os.path.isfile(video_path) is False:
+    Returns:
+        str: Filepath of the cached clip.
+    """
+    cached_path = clip_cache.get(index_id, video_id, start, end)
+    if cached_path is not None:
+        return cached_path
+
+    video_path = clip_cache.get_path(index_id, video_id, start, end)
+    os.makedirs(os.path.dirname(video_path), exist_ok=True)
+    await cut_clip(source_uri, video_path, start - source_start, end - source_start)
+    clip_cache.add(index_id, video_id, start, end)
+    return video_path
+
+
+def start_clip_downloads(index_id: str, clips: List[Tuple[str, float, float]]) -> Dict[Tuple[str, float, float], asyncio.Future]:
+    """Start downloading clips with at most `CLIP_DOWNLOAD_CONCURRENCY` downloads running at once. Must be called
+    from a running event loop.
+
+    Clips from the same video that overlap or nearly touch share the HLS segments fetched once for their whole span,
+    and each clip is then cut from those segments locally, so dense highlight reels don't transfer the same footage
+    several times.
+
+    Args:
+        index_id (str): Index ID the clips belong to.
+        clips (List[Tuple[str, float, float]]): (video_id, start, end) of every clip. Duplicates are downloaded once.
+
+    Returns:
+        Dict[Tuple[str, float, float], asyncio.Future]: A future per unique clip that resolves to its filepath, or to an
+            error response with an `error` key. A failed clip doesn't stop the others. Futures raise `CircuitOpenError`
+            if HLS downloads are failing fast.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(CLIP_DOWNLOAD_CONCURRENCY)
+    clips = list(dict.fromkeys(clips))
+    futures = {clip: loop.create_future() for clip in clips}
+    finished = 0
+
+    def finish(clip: Tuple[str, float, float], result: Union[str, Dict]) -> None:
+        nonlocal finished
+        finished += 1
+        futures[clip].set_result(result)
+        status = "failed" if isinstance(result, dict) else "ready"
+        print(f"[INFO] Clip {finished}/{len(clips)} {status}: Video ID {clip[0]} from {clip[1]}s to {clip[2]}s")
+
+    async def run(download: Awaitable[str]) -> Union[str, Dict]:
         try:
-            duration = end - start
-            buffer = 1  # Add a 1-second buffer on each side
-            ffmpeg.input(filename=hls_uri, strict="experimental", loglevel="quiet", ss=max(0, start - buffer), t=duration + 2 * buffer).output(
-                video_path, vcodec="libx264", acodec="aac", avoid_negative_ts="make_zero", fflags="+genpts"
-            ).run()
-
-            # Then trim the video more precisely
-            output_trimmed = f"{os.path.splitext(video_path)[0]}_trimmed.mp4"
-            ffmpeg.input(video_path, ss=buffer, t=duration).output(output_trimmed, vcodec="copy", acodec="copy").run()
-
-            # Replace the original file with the trimmed version
-            os.replace(output_trimmed, video_path)
+            return await download
+        except CircuitOpenError:
+            raise
         except Exception as error:
-            error_response = {
-                "message": f"There was an error downloading the video with Video ID: {video_id} in Index ID: {index_id}. "
-                "Double check that the Video ID and Index ID are valid and correct.",
-                "error": str(error),
-            }
-            return error_response
+            return {"message": f"There was an error downloading a clip in Index ID: {index_id}.", "error": str(error)}
 
-    return video_path
+    async def fetch_span_source(video_id: str, start: float, end: float) -> Tuple[str, float]:
+        return await _fetch_hls_range(await _get_hls_uri(index_id, video_id), start, end)
 
+    async def download_span(video_id: str, start: float, end: float, span_clips: List[Tuple[str, float, float]]) -> None:
+        try:
+            async with semaphore:
+                if len(span_clips) == 1:
+                    finish(span_clips[0], await run(download_video(video_id=video_id, index_id=index_id, start=start, end=end)))
+                    return
+
+                source = await run(fetch_span_source(video_id, start, end))
+                for clip in span_clips:
+                    if isinstance(source, dict):
+                        finish(clip, source)
+                    else:
+                        finish(clip, await run(cut_clip_from_source(index_id, video_id, *source, clip[1], clip[2])))
+        except BaseException as error:
+            for clip in span_clips:
+                if not futures[clip].done():
+                    futures[clip].set_exception(error)
+            if not isinstance(error, Exception):
+                raise
+
+    # Clips that are already cached don't need their span downloaded.
+    for clip in clips:
+        cached_path = clip_cache.get(index_id, *clip)
+        if cached_path is not None:
+            finish(clip, cached_path)
+
+    for span in merge_clip_ranges([clip for clip in clips if not futures[clip].done()]):
+        task = asyncio.ensure_future(download_span(*span))
+        # The event loop only keeps weak references to tasks.
+        _download_tasks.add(task)
+        task.add_done_callback(_download_tasks.discard)
+
+    return futures
+
+
+async def download_clips(index_id: str, clips: List[Tuple[str, float, float]]) -> Dict[Tuple[str, float, float], Union[str, Dict]]:
+    """Download clips and wait for all of them. See `start_clip_downloads`.
 
-def download_m3u8_videos(event):
-    """Download and trim M3U8 videos into mp4 files with caching and progress display.
+    Raises:
+        CircuitOpenError: If HLS downloads are failing fast.
 
-    mp4 files are sorted by start time, then trimmed by end time. they are put into filepath output/{session_id}
+    Returns:
+        Dict[Tuple[str, float, float], Union[str, Dict]]: The filepath of each clip, or an error response with an `error` key.
+            A failed clip doesn't stop the others.
+    """
+    futures = start_clip_downloads(index_id, clips)
+    results = await asyncio.gather(*futures.values(), return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return dict(zip(futures, results))
+
+
+async def _run_command(*command: str) -> None:
+    process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+    try:
+        _, stderr = await process.communicate()
+    except BaseException:
+        # Don't leave yt-dlp or ffmpeg running when the awaiting task is cancelled.
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"{command[0]} exited with status {process.returncode}: {stderr.decode('utf-8', errors='replace').strip()}")
+
+
+async def _download_source(video_url: str, source_file: str) -> str:
+    if os.path.isfile(source_file):
+        return source_file
+
+    async with _source_semaphores.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(SOURCE_DOWNLOAD_CONCURRENCY)):
+        # yt-dlp writes to a .part file and renames it when done, so an existing source file is complete.
+        await _run_command("yt-dlp", "-o", source_file, video_url, "--quiet", "--no-progress")
+    return source_file
+
+
+async def _trim_source(source_file: str, trimmed_file: str, start: float, end: float) -> str:
+    if os.path.isfile(trimmed_file):
+        return trimmed_file
+
+    partial_file = f"{os.path.splitext(trimmed_file)[0]}.partial.mp4"
+    async with _trim_semaphores.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(TRIM_CONCURRENCY)):
+        await _run_command(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", str(start), "-i", source_file, "-t", str(end - start), "-c", "copy", partial_file,
+        )
+    os.replace(partial_file, trimmed_file)
+    return trimmed_file
+
+
+def download_m3u8_videos(event) -> Dict[Tuple[str, float, Union[float, None]], asyncio.Task]:
+    """Download the videos in a tool's output and trim them into mp4 files under output/{session_id}.
+
+    Each unique source is downloaded once with yt-dlp, at most `SOURCE_DOWNLOAD_CONCURRENCY` at a time, and is reused
+    if it was downloaded before. Clips are trimmed as soon as their source is ready. Must be called from a running
+    event loop.
+
+    Returns:
+        Dict[Tuple[str, float, Union[float, None]], asyncio.Task]: A task per (video_id, start, end) that resolves to the
+            clip's filepath, or to the source's when the item has no end time. A failed clip raises only from its own task.
     """
-    # Create session directory if it doesn't exist
     trimmed_filepath = "output/" + str(session_id)
     source_filepath = "output/source"
     os.makedirs(trimmed_filepath, exist_ok=True)
     os.makedirs(source_filepath, exist_ok=True)
-    downloaded_videos = set()  # Cache of downloaded video URLs for this function call
 
-    for item in tqdm(json.loads(event["data"]["output"]), desc="Processing Videos"):
-        video_url = item.get("video_url")
-        video_id = item.get("video_id")
+    items = [item for item in json.loads(event["data"]["output"]) if item.get("video_id") and item.get("video_url")]
+    progress = tqdm(total=len(items), desc="Processing Videos")
+    sources: Dict[str, asyncio.Task] = {}
+    clips: Dict[Tuple[str, float, Union[float, None]], asyncio.Task] = {}
+
+    async def process_clip(source: asyncio.Task, video_id: str, start: float, end: Union[float, None]) -> str:
+        try:
+            source_file = await source
+            if end is None:
+                return source_file
+            # Clips of different videos can share a range, so the video ID is part of the name.
+            trimmed_file = os.path.join(trimmed_filepath, f"trimmed-{video_id}-{start}-{end}.mp4")
+            trim = functools.partial(_trim_source, source_file, trimmed_file, start, end)
+            return await trim_flight.do(trimmed_file, trim)
+        finally:
+            progress.update(1)
+            if progress.n >= progress.total:
+                progress.close()
+
+    for item in items:
+        video_id = item["video_id"]
+        start, end = item.get("start", 0), item.get("end")
+        if (video_id, start, end) in clips:
+            progress.total -= 1
+            continue
 
-        if (os.path.exists(os.path.join(source_filepath, f"{video_id}.mp4"))) or (video_id and video_id not in downloaded_videos):
-            start, end = item.get("start", 0), item.get("end")
+        if video_id not in sources:
             source_file = os.path.join(source_filepath, f"{video_id}.mp4")
+            download = functools.partial(_download_source, item["video_url"], source_file)
+            sources[video_id] = asyncio.ensure_future(source_flight.do(source_file, download))
+        clips[(video_id, start, end)] = asyncio.ensure_future(process_clip(sources[video_id], video_id, start, end))
 
-            # Download video showing yt-dlp progress
-            subprocess.run(["yt-dlp", "-o", source_file, video_url, "--progress", "--quiet"])
-            downloaded_videos.add(video_id)
-
-        # Trim the video if end time is provided
-        if item.get("end") is not None:
-            start, end = item.get("start", 0), item.get("end")
-            output_file = os.path.join(source_filepath, f"{video_id}.mp4")
-            trimmed_file = os.path.join(trimmed_filepath, f"trimmed-{start}-{end}.mp4")
-            duration = end - start
-
-            # Run ffmpeg silently
-            subprocess.run([
-                "ffmpeg",
-                "-hide_banner",
-                "-loglevel",
-                "error",  # Only show errors
-                "-ss",
-                str(start),
-                "-i",
-                output_file,
-                "-t",
-                str(duration),
-                "-c",
-                "copy",
-                trimmed_file,
-            ])
+    if not clips:
+        progress.close()
+    return clips